@@ -0,0 +1,34 @@
+# app/api/batch.py
+# Shared parsing of id lists for the batch read endpoints.
+
+from fastapi import HTTPException, Query, status
+from typing import List, Optional
+
+from app.crud.batch import MAX_BATCH_SIZE
+
+
+def parse_ids(values: Optional[List[str]], name: str) -> Optional[List[int]]:
+    """
+    Parses ids given as comma-separated lists, repeated parameters, or both, in request order.
+    Returns None when the parameter is absent. Raises a 400 for non-integer ids or too many ids.
+    """
+    if values is None:
+        return None
+    try:
+        ids = [int(part) for value in values for part in value.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"{name} must be comma-separated integers")
+    if not ids:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"{name} must name at least one id")
+    if len(ids) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"{name} accepts at most {MAX_BATCH_SIZE} ids")
+    return ids
+
+def batch_ids(
+    # Optional in the signature only: FastAPI fails to report a missing required list parameter
+    ids: Optional[List[str]] = Query(None, description=f"Comma-separated ids, at most {MAX_BATCH_SIZE}; may be repeated")
+) -> List[int]:
+    """
+    Dependency returning the required `ids` of a batch read endpoint.
+    """
+    return parse_ids(ids or [], "ids")
@@ -0,0 +1,37 @@
+# app/api/conditional.py
+# Conditional GET support: strong ETags derived from the inventory change version.
+
+import zlib
+from fastapi import Depends, HTTPException, Request, Response, status
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from app.crud import changes
+from app.db.session import get_db
+
+
+def _matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Implements the weak comparison RFC 9110 prescribes for If-None-Match.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+def etag_guard(request: Request, response: Response, db: Session = Depends(get_db)) -> str:
+    """
+    Route dependency that answers 304 Not Modified when the client already holds the current
+    representation, before the endpoint loads anything. Otherwise sets the ETag header.
+    The tag combines the inventory version with a checksum of the URL, since query
+    parameters (depth, view, fields, cursors) select different representations.
+    """
+    epoch, version = changes.get_version(db)
+    etag = f'"{epoch}-{version}-{zlib.crc32(str(request.url).encode()):08x}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"} # no-cache: always revalidate, never serve stale
+    if _matches(request.headers.get("if-none-match"), etag):
+        raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return etag
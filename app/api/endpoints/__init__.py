@@ -1,4 +1,4 @@
 # app/api/endpoints/__init__.py
 # This file imports all individual API routers.
 
-from . import item, folder, image, counts
\ No newline at end of file
+from . import item, folder, image, counts, export, imports, events, changes, search, tags, suggest
\ No newline at end of file
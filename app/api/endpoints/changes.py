@@ -0,0 +1,40 @@
+# app/api/endpoints/changes.py
+# FastAPI router for delta sync (changes since a sequence number).
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.orm import Session
+
+from app.api.conditional import etag_guard
+from app.core.fastjson import dumps
+from app.crud.pagination import MAX_PAGE_SIZE
+from app.crud.sync import ChangesCompacted, get_changes
+from app.db.session import get_db
+from app.schemas.sync import ChangeFeed
+
+router = APIRouter(
+    tags=["Changes"],
+)
+
+# Also served without the trailing slash: the static mount at "/" would otherwise answer /changes
+@router.get("", response_model=ChangeFeed, summary="Get the changes since a sequence number", dependencies=[Depends(etag_guard)])
+@router.get("/", response_model=ChangeFeed, include_in_schema=False, dependencies=[Depends(etag_guard)])
+def read_changes(
+    response: Response,
+    since: int = Query(0, ge=0, description="`next_since` of the last page applied; 0 for a full sync"),
+    limit: int = Query(MAX_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of changes to return"),
+    db: Session = Depends(get_db)
+):
+    """
+    Returns the folders, items and images created, changed or deleted after `since`, in the
+    order of their latest change, with the current columns of each row or a tombstone.
+    Follow `next_since` while `has_more` is true. Responds 410 Gone when tombstones after
+    `since` were already compacted; the client must then sync again from since=0.
+    """
+    try:
+        feed = get_changes(db, since=since, limit=limit)
+    except ChangesCompacted as e:
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail=str(e))
+    # Item quantity is the only float column
+    items = (change["data"] for change in feed["changes"] if change["entity"] == "item" and change["data"])
+    quantities = (item["quantity"] for item in items if isinstance(item["quantity"], float))
+    return Response(content=dumps(feed, floats=quantities), media_type="application/json", headers=dict(response.headers))
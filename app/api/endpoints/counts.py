@@ -8,12 +8,13 @@ from sqlalchemy.orm import Session
 from app.crud.counts import get_realtime_counts # Direct import of function
 from app.schemas.counts import CountsResponse
 from app.db.session import get_db
+from app.api.conditional import etag_guard
 
 router = APIRouter(
     tags=["Counts"],
 )
 
-@router.get("/", response_model=CountsResponse, summary="Get real-time application counts")
+@router.get("/", response_model=CountsResponse, summary="Get real-time application counts", dependencies=[Depends(etag_guard)])
 def get_counts(db: Session = Depends(get_db)):
     """
     Retrieves real-time counts for total folders, items, and their total quantity.
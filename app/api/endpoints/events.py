@@ -0,0 +1,54 @@
+# app/api/endpoints/events.py
+# FastAPI router for the live change feed (Server-Sent Events).
+
+import asyncio
+import json
+from fastapi import APIRouter, Request
+from fastapi.responses import StreamingResponse
+
+from app.core.events import broker
+
+router = APIRouter(
+    tags=["Events"],
+)
+
+KEEPALIVE_SECONDS = 15 # Comment lines sent while idle, so proxies keep the connection open
+RETRY_MILLISECONDS = 3000 # Reconnection delay suggested to EventSource clients
+
+
+def _format_event(message: dict) -> str:
+    lines = ["event: change"]
+    if message.get("version"):
+        lines.append(f"id: {message['version']}")
+    lines.append(f"data: {json.dumps(message, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+async def _stream(request: Request, queue: asyncio.Queue):
+    try:
+        yield f"retry: {RETRY_MILLISECONDS}\n\n"
+        while not await request.is_disconnected():
+            try:
+                message = await asyncio.wait_for(queue.get(), timeout=KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            yield _format_event(message)
+    finally:
+        broker.unsubscribe(queue)
+
+# Also served without the trailing slash: the static mount at "/" would otherwise answer /events
+@router.get("", summary="Stream change events", response_class=StreamingResponse)
+@router.get("/", response_class=StreamingResponse, include_in_schema=False)
+async def stream_events(request: Request):
+    """
+    Streams one `change` event per committed write as Server-Sent Events. The data holds the
+    new inventory `version` and `counts`, and either `changes`, a list of
+    {entity, op, id, folder_id} describing what changed, or `reload: true` when the write was
+    too broad to describe (imports, repairs) and clients should refetch their view.
+    Only writes handled by the same server process are reported.
+    """
+    return StreamingResponse(
+        _stream(request, broker.subscribe()),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,41 @@
+# app/api/endpoints/export.py
+# FastAPI router for exporting the whole inventory.
+
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
+from typing import Literal
+
+from app.crud.export import export_ndjson
+from app.db.session import SessionLocal
+
+router = APIRouter(
+    tags=["Export"],
+)
+
+def _stream(folder_paths: bool):
+    # The stream outlives the endpoint call, so it owns its session instead of using get_db()
+    db = SessionLocal()
+    try:
+        yield from export_ndjson(db, folder_paths=folder_paths)
+    finally:
+        db.close()
+
+# Also served without the trailing slash: the static mount at "/" would otherwise answer /export
+@router.get("", summary="Export all folders, items and images", response_class=StreamingResponse)
+@router.get("/", response_class=StreamingResponse, include_in_schema=False)
+def export_inventory(
+    format: Literal["ndjson"] = Query("ndjson", description="Export format; one JSON record per line"),
+    folder_paths: bool = Query(False, description="Add each item's folder path (folder names joined by '/')"),
+):
+    """
+    Streams every folder, item and image record as newline-delimited JSON, in that order.
+    Each record has a "type" of "folder", "item" or "image" plus the record's columns.
+    Rows are read and sent in batches, each read in its own short transaction, so memory use
+    does not grow with the inventory size and a slow client does not hold up writes. The export
+    is therefore not a point-in-time snapshot of a database that is being written to.
+    """
+    return StreamingResponse(
+        _stream(folder_paths),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="inventory.ndjson"'},
+    )
@@ -2,29 +2,37 @@
 # FastAPI router for Folder operations.
 
 
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Response, Form
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Response, Form, Query
 from pydantic import BaseModel
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy.orm import Session
 from sqlalchemy import func
-from typing import List, Optional
-import os # Import os for file path manipulation
+from typing import List, Literal, Optional, Union
 import logging # Import logging for debugging
 
 # Import specific crud functions and schemas directly
 from app.crud.folder import ( # Direct import of functions
-    create_folder, get_folder, get_all_folders, update_folder, delete_folder,
-    clone_folder, move_folder, calculate_folder_quantity
+    create_folder, get_folder, get_folder_fields, get_folder_to_depth, get_folders_by_ids, get_subfolders, get_all_folders, update_folder, delete_folder,
+    clone_folder, move_folder, bulk_move_folders, calculate_folder_quantity, get_folder_stats, get_folder_tree
 )
-from app.crud.image import create_image as crud_create_image # Import image CRUD
-from app.schemas.folder import FolderCreate, FolderUpdate, FolderResponse
+from app.crud.item import get_items as crud_get_items
+from app.crud.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, InvalidCursor
+from app.crud import aggregates as crud_aggregates
+from app.schemas.folder import FolderCreate, FolderUpdate, FolderResponse, FolderCloneResponse, DeleteSummary, FolderStatsResponse, FolderSummary, FolderTreeNode
+from app.schemas.bulk import FolderBulkMove, BulkResponse, FolderBatchResponse
 from app.schemas.item import ItemResponse # Needed for read_folder_items response
-from app.schemas.image import ImageCreate, ImageResponse # Needed for _post_process_folder_response and image upload
+from app.schemas.image import ImageResponse # Needed for _post_process_folder_response and image upload
 # REMOVED: from app.models import Folder, Item, Image # No longer needed here
 from app.db.session import get_db
+from app.api.conditional import etag_guard
+from app.api.batch import batch_ids
+from app.api.fields import dict_response, fast_folders, folder_fields, item_fields, row_fields
+from app.api.uploads import UploadLimitRoute, create_image_record, store_upload
+from app.core.uploads import discard_upload
 
 router = APIRouter(
     tags=["Folders"],
     responses={404: {"description": "Not found"}},
+    route_class=UploadLimitRoute,
 )
 
 logging.basicConfig(level=logging.INFO) # Configure basic logging
@@ -35,29 +43,74 @@ class FolderClone(BaseModel):
 class FolderMove(BaseModel):
     new_parent_id: Optional[int] = None
 
-def _post_process_folder_response(folder_model) -> FolderResponse: # Removed type hint for folder_model to avoid direct model import
+FolderView = Literal["summary", "full"]
+FolderSort = Literal["id", "name"]
+ItemSort = Literal["id", "name", "acquired_date", "quantity"]
+_FOLDER_FIELDS = ("id", "name", "description", "notes", "tags", "parent_id")
+
+def _post_process_folder_response(folder_model, depth: int = 1) -> FolderResponse: # Removed type hint for folder_model to avoid direct model import
     """
-    Helper to ensure relationship attributes are lists (not None) before Pydantic serialization.
-    This also recursively processes subfolders to ensure they are Pydantic schemas.
+    Builds a FolderResponse from a folder model, expanding subfolders, items and images
+    only for folders less than `depth` levels below `folder_model`.
+    Deeper relationships are never touched, so they are neither loaded nor validated.
     """
-    # Convert SQLAlchemy model to a dictionary first
-    folder_dict = folder_model.__dict__.copy()
+    folder_dict = {field: getattr(folder_model, field) for field in _FOLDER_FIELDS}
 
-    # Explicitly ensure list types for relationships AND recursively process subfolders
-    folder_dict['subfolders'] = [
-        _post_process_folder_response(sf)
-        for sf in folder_model.subfolders
-    ] if folder_model.subfolders is not None else []
+    if depth > 0:
+        # Explicitly ensure list types for relationships AND recursively process subfolders
+        folder_dict['subfolders'] = [
+            _post_process_folder_response(sf, depth - 1)
+            for sf in folder_model.subfolders
+        ] if folder_model.subfolders is not None else []
+        folder_dict['items'] = folder_model.items if folder_model.items is not None else []
+        folder_dict['images'] = folder_model.images if folder_model.images is not None else []
 
-    folder_dict['items'] = folder_model.items if folder_model.items is not None else []
-    folder_dict['images'] = folder_model.images if folder_model.images is not None else []
-    
     # Use Pydantic's model_validate to create the response schema from the processed dictionary
     return FolderResponse.model_validate(folder_dict)
 
+def _collect_folder_ids(folder_models, depth: int) -> List[int]:
+    """
+    Returns the ids of the given folders and of their subfolders down to `depth` levels.
+    """
+    ids = []
+    level = list(folder_models)
+    for remaining in range(depth, -1, -1):
+        ids.extend(f.id for f in level)
+        if remaining == 0:
+            break
+        level = [sf for f in level for sf in f.subfolders]
+    return ids
+
+def _folder_summary_response(folder_model, depth: int, counts: dict) -> FolderSummary:
+    """
+    Builds a FolderSummary from a folder model loaded without images.
+    `counts` maps folder ids to their (item_count, subfolder_count).
+    """
+    item_count, subfolder_count = counts.get(folder_model.id, (0, 0))
+    summary = {
+        "id": folder_model.id,
+        "name": folder_model.name,
+        "parent_id": folder_model.parent_id,
+        "item_count": item_count,
+        "subfolder_count": subfolder_count,
+    }
+    if depth > 0:
+        summary["subfolders"] = [_folder_summary_response(sf, depth - 1, counts) for sf in folder_model.subfolders]
+        summary["items"] = folder_model.items
+    return FolderSummary.model_validate(summary)
+
+def _folder_read_responses(db: Session, folder_models, depth: int, view: FolderView) -> list:
+    """
+    Serializes folders loaded with crud folder_load_options(depth) in the requested view.
+    """
+    if view == "summary":
+        counts = crud_aggregates.get_direct_counts(db, _collect_folder_ids(folder_models, depth))
+        return [_folder_summary_response(f, depth, counts) for f in folder_models]
+    return [_post_process_folder_response(f, depth) for f in folder_models]
+
 
 @router.post("/", response_model=FolderResponse, status_code=status.HTTP_201_CREATED, summary="Create a new folder")
-async def create_new_folder(
+def create_new_folder(
     db: Session = Depends(get_db),
     name: str = Form(...),
     description: Optional[str] = Form(None),
@@ -68,32 +121,21 @@ async def create_new_folder(
 ):
     """
     Create a new inventory folder with the provided details and an optional image.
+    An image over the upload size limit is rejected with a 413 before anything is created.
     """
-    # Step 1: Create the folder schema from form data
+    # Step 1: Store the image, if provided, so that a rejected upload creates nothing
+    stored_image = store_upload(image) if image and image.filename else None
+
+    # Step 2: Create the folder schema from form data
     folder_schema = FolderCreate(name=name, description=description, notes=notes, tags=tags, parent_id=parent_id)
     
-    # Step 2: Create the folder in the database
+    # Step 3: Create the folder in the database
     db_folder = create_folder(db=db, folder=folder_schema)
 
-    # Step 3: Handle the image upload, if provided
-    if image and image.filename:
-        UPLOAD_DIRECTORY = "/app/static/images"
-        os.makedirs(UPLOAD_DIRECTORY, exist_ok=True)
-        file_path = os.path.join(UPLOAD_DIRECTORY, image.filename)
-        
+    # Step 4: Record the image, if provided
+    if stored_image:
         try:
-            with open(file_path, "wb") as image_file:
-                content = await image.read()
-                image_file.write(content)
-            
-            image_schema = ImageCreate(
-                filename=image.filename,
-                filepath=f"/static_images/{image.filename}",
-                description=f"Image for folder {db_folder.name}",
-                folder_id=db_folder.id
-            )
-            crud_create_image(db=db, image=image_schema)
-
+            create_image_record(db, stored_image, description=f"Image for folder {db_folder.name}", folder_id=db_folder.id)
         except Exception as e:
             # If image processing fails, the folder is already created.
             # Depending on desired behavior, you might want to delete the created folder.
@@ -106,28 +148,104 @@ async def create_new_folder(
     return _post_process_folder_response(db_folder)
 
 
-@router.get("/{folder_id}", response_model=FolderResponse, summary="Get a folder by ID")
-def read_folder(folder_id: int, db: Session = Depends(get_db)):
+# Declared before "/{folder_id}" so that "tree" is not parsed as a folder ID
+@router.get("/tree", response_model=FolderTreeNode, summary="Get the folder hierarchy with items as one tree", dependencies=[Depends(etag_guard)])
+def read_folder_tree(
+    root_id: Optional[int] = None,
+    max_depth: Optional[int] = Query(None, ge=1, description="Number of folder levels to expand below the root (all if omitted)"),
+    db: Session = Depends(get_db)
+):
     """
-    Retrieve a single folder by its unique ID, including its nested items and subfolders.
+    Retrieve a folder (or the whole inventory when `root_id` is omitted) with its nested
+    subfolders and items, loaded with two flat queries.
+    The inventory root is returned as a synthetic folder with `id` set to null.
     """
-    db_folder = get_folder(db=db, folder_id=folder_id) # Direct call
-    if db_folder is None:
+    tree = get_folder_tree(db, root_id=root_id, max_depth=max_depth)
+    if tree is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Folder not found")
-    return _post_process_folder_response(db_folder)
-
+    return tree
+
+
+# Declared before "/{folder_id}" so that "batch" is not parsed as a folder ID
+@router.get("/batch", response_model=FolderBatchResponse, summary="Get many folders by ID", dependencies=[Depends(etag_guard)])
+def read_folders_batch(
+    response: Response,
+    ids: List[int] = Depends(batch_ids),
+    depth: int = Query(1, ge=0, description="Number of levels of subfolders and items to include"),
+    view: FolderView = Query("full", description="'summary' for names and counts only, 'full' for every field and images"),
+    fields: Optional[List[str]] = Depends(folder_fields),
+    db: Session = Depends(get_db)
+):
+    """
+    Retrieve many folders by ID in one request, in the order of `ids`, shaped like GET /folders/{folder_id}.
+    Ids that do not exist are listed in `missing` instead of failing the request.
+    """
+    as_dicts = fast_folders(fields, view, depth)
+    folders, missing = get_folders_by_ids(
+        db, ids, depth=depth, with_images=(view == "full"), fields=fields, as_dicts=as_dicts
+    )
+    if fields is not None or as_dicts:
+        return dict_response({"folders": folders, "missing": missing}, response)
+    return {"folders": _folder_read_responses(db, folders, depth, view), "missing": missing}
 
-@router.get("/", response_model=List[FolderResponse], summary="Get all folders")
-def read_all_folders(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+@router.get("/{folder_id}", response_model=Union[FolderResponse, FolderSummary], summary="Get a folder by ID", dependencies=[Depends(etag_guard)])
+def read_folder(
+    folder_id: int,
+    response: Response,
+    depth: int = Query(1, ge=0, description="Number of levels of subfolders and items to include"),
+    view: FolderView = Query("full", description="'summary' for names and counts only, 'full' for every field and images"),
+    fields: Optional[List[str]] = Depends(folder_fields),
+    db: Session = Depends(get_db)
+):
     """
-    Retrieve a list of all folders.
+    Retrieve a single folder by its unique ID, including its nested items and subfolders down to `depth` levels.
+    With `fields`, only those fields are returned and `depth` and `view` are ignored.
     """
-    folders = get_all_folders(db=db, skip=skip, limit=limit)
-    return folders
+    if fields is not None:
+        sparse_folder = get_folder_fields(db, folder_id, fields)
+        if sparse_folder is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Folder not found")
+        return dict_response(sparse_folder, response)
+    db_folder = get_folder_to_depth(db, folder_id, depth=depth, with_images=(view == "full"))
+    if db_folder is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Folder not found")
+    return _folder_read_responses(db, [db_folder], depth, view)[0]
+
+
+@router.get("/", response_model=Union[List[FolderResponse], List[FolderSummary]], summary="Get all folders", dependencies=[Depends(etag_guard)])
+def read_all_folders(
+    response: Response,
+    skip: int = Query(0, ge=0, deprecated=True, description="Offset paging, use `after` instead"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of folders to return"),
+    after: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+    sort: FolderSort = Query("id", description="Sort order; ties are broken by id"),
+    depth: int = Query(1, ge=0, description="Number of levels of subfolders and items to include"),
+    view: FolderView = Query("full", description="'summary' for names and counts only, 'full' for every field and images"),
+    fields: Optional[List[str]] = Depends(folder_fields),
+    db: Session = Depends(get_db)
+):
+    """
+    Retrieve one page of all folders. When more folders follow, the X-Next-Cursor
+    response header holds the `after` value for the next page.
+    With `fields`, only those fields are returned and `depth` and `view` are ignored.
+    """
+    as_dicts = fast_folders(fields, view, depth)
+    try:
+        folders, next_cursor = get_all_folders(
+            db=db, skip=skip, limit=limit, after=after, sort=sort, depth=depth, with_images=(view == "full"),
+            fields=fields, as_dicts=as_dicts
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    if fields is not None or as_dicts:
+        return dict_response(folders, response)
+    return _folder_read_responses(db, folders, depth, view)
 
 
 @router.put("/{folder_id}", response_model=FolderResponse, summary="Update a folder by ID")
-async def update_existing_folder(
+def update_existing_folder(
     folder_id: int,
     db: Session = Depends(get_db),
     name: str = Form(...),
@@ -153,24 +271,17 @@ async def update_existing_folder(
         parent_id=parent_id
     )
 
+    stored_image = store_upload(image) if image and image.filename else None
+
     updated_folder = update_folder(db=db, folder_id=folder_id, folder=folder_update_schema)
+    if updated_folder is None:
+        if stored_image:
+            discard_upload(stored_image)
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid parent folder")
 
-    if image and image.filename:
-        UPLOAD_DIRECTORY = "/app/static/images"
-        os.makedirs(UPLOAD_DIRECTORY, exist_ok=True)
-        file_path = os.path.join(UPLOAD_DIRECTORY, image.filename)
+    if stored_image:
         try:
-            with open(file_path, "wb") as buffer:
-                content = await image.read()
-                buffer.write(content)
-            
-            image_schema = ImageCreate(
-                filename=image.filename,
-                filepath=f"/static_images/{image.filename}",
-                description=f"Image for folder {updated_folder.name}",
-                folder_id=updated_folder.id
-            )
-            crud_create_image(db=db, image=image_schema)
+            create_image_record(db, stored_image, description=f"Image for folder {updated_folder.name}", folder_id=updated_folder.id)
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Folder updated, but failed to upload new image: {e}")
 
@@ -178,27 +289,31 @@ async def update_existing_folder(
     return _post_process_folder_response(updated_folder)
 
 
-@router.delete("/{folder_id}", status_code=status.HTTP_204_NO_CONTENT, summary="Delete a folder by ID")
+@router.delete("/{folder_id}", response_model=DeleteSummary, summary="Delete a folder by ID")
 def delete_existing_folder(folder_id: int, db: Session = Depends(get_db)):
     """
     Delete a folder by its ID. This will recursively delete all its subfolders, items, and associated images.
+    Responds with the number of deleted folders, items and images.
     """
-    db_folder = delete_folder(db=db, folder_id=folder_id)
-    if db_folder is None:
+    deleted = delete_folder(db=db, folder_id=folder_id)
+    if deleted is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Folder not found")
-    return Response(status_code=status.HTTP_204_NO_CONTENT)
+    return deleted
 
 
-@router.post("/{folder_id}/clone", response_model=FolderResponse, summary="Clone a folder by ID")
+@router.post("/{folder_id}/clone", response_model=FolderCloneResponse, summary="Clone a folder by ID")
 def clone_existing_folder(folder_id: int, clone_data: FolderClone, db: Session = Depends(get_db)):
     """
     Create a clone of an existing folder, including all its subfolders, items, and images recursively.
     Optionally specify a `new_parent_id` to place the cloned folder.
+    The response also reports how many folders, items and images were copied.
     """
-    cloned_folder = clone_folder(db=db, folder_id=folder_id, new_parent_id=clone_data.new_parent_id) # Direct call
-    if cloned_folder is None:
+    result = clone_folder(db=db, folder_id=folder_id, new_parent_id=clone_data.new_parent_id) # Direct call
+    if result is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Folder not found or target parent invalid")
-    return _post_process_folder_response(cloned_folder)
+    cloned_folder, copied = result
+    response = _post_process_folder_response(cloned_folder)
+    return FolderCloneResponse(**response.model_dump(), copied=copied)
 
 
 @router.put("/{folder_id}/move", response_model=FolderResponse, summary="Move a folder to a different parent folder")
@@ -212,74 +327,95 @@ def move_folder_to_parent(folder_id: int, move_data: FolderMove, db: Session = D
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Folder not found or invalid target parent")
     return _post_process_folder_response(db_folder)
 
+@router.post("/bulk-move", response_model=BulkResponse, summary="Move many folders to the same parent folder")
+def bulk_move_folders_to_parent(move_data: FolderBulkMove, db: Session = Depends(get_db)):
+    """
+    Move several folders under `new_parent_id` (`None` for root folders) in a single transaction.
+    Folders that do not exist or would end up inside themselves are skipped and reported per id.
+    """
+    return bulk_move_folders(db=db, folder_ids=move_data.ids, new_parent_id=move_data.new_parent_id)
 
-# Endpoint to get count of items in a specific folder (corrected to use direct count)
+
+# Endpoint to get count of items in a specific folder (read from the materialized counters)
 @router.get("/{folder_id}/items/count", summary="Get count of items in a specific folder")
 def get_items_count_in_folder(folder_id: int, db: Session = Depends(get_db)):
     """
     Retrieves the total number of items directly within a specific folder.
     """
-    # Ensure folder exists
-    from app import models # Temporarily import models here for the query
-    folder_obj = get_folder(db, folder_id) # Use get_folder from this module
-    if not folder_obj:
+    stats = crud_aggregates.get_folder_stats(db, folder_id)
+    if stats is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Folder not found")
-    
-    # Use direct SQL count to avoid NoneType errors and load entire collection
-    count = db.query(func.count(models.Item.id)).filter(models.Item.folder_id == folder_id).scalar() # Use imported models.Item
-    return {"folder_id": folder_id, "item_count": count if count is not None else 0}
+    return {"folder_id": folder_id, "item_count": stats.direct_item_count}
 
 
-# Endpoint to get count of subfolders in a specific folder (corrected to use direct count)
+# Endpoint to get count of subfolders in a specific folder (read from the materialized counters)
 @router.get("/{folder_id}/subfolders/count", summary="Get count of subfolders in a specific folder")
 def get_subfolders_count_in_folder(folder_id: int, db: Session = Depends(get_db)):
     """
     Retrieves the total number of direct subfolders within a specific folder.
     """
-    # Ensure folder exists
-    from app import models # Temporarily import models here for the query
-    folder_obj = get_folder(db, folder_id) # Use get_folder from this module
-    if not folder_obj:
+    stats = crud_aggregates.get_folder_stats(db, folder_id)
+    if stats is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Folder not found")
-    
-    # Use direct SQL count to avoid NoneType errors and load entire collection
-    count = db.query(func.count(models.Folder.id)).filter(models.Folder.parent_id == folder_id).scalar() # Use imported models.Folder
-    return {"folder_id": folder_id, "subfolder_count": count if count is not None else 0}
+    return {"folder_id": folder_id, "subfolder_count": stats.direct_subfolder_count}
 
 
 # NEW: Endpoint to get direct subfolders of a folder
-@router.get("/{folder_id}/folders", response_model=List[FolderResponse], summary="Get direct subfolders of a folder")
-def read_sub_folders(folder_id: int, db: Session = Depends(get_db)):
+@router.get("/{folder_id}/folders", response_model=Union[List[FolderResponse], List[FolderSummary]], summary="Get direct subfolders of a folder", dependencies=[Depends(etag_guard)])
+def read_sub_folders(
+    folder_id: int,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of subfolders to return"),
+    after: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+    sort: FolderSort = Query("id", description="Sort order; ties are broken by id"),
+    depth: int = Query(1, ge=0, description="Number of levels of subfolders and items to include below each subfolder"),
+    view: FolderView = Query("full", description="'summary' for names and counts only, 'full' for every field and images"),
+    fields: Optional[List[str]] = Depends(folder_fields),
+    db: Session = Depends(get_db)
+):
     """
-    Retrieves a list of direct subfolders within a specific folder.
+    Retrieves one page of the direct subfolders within a specific folder.
+    With `fields`, only those fields are returned and `depth` and `view` are ignored.
     """
-    # Ensure the parent folder exists
-    from app import models # Temporarily import models here for the query
-    get_folder(db, folder_id) # This will raise 404 if not found
-
-    subfolders = db.query(models.Folder).options( # Use models.Folder
-        joinedload(models.Folder.items).joinedload(models.Item.images), # Use models.Folder.items, models.Item.images
-        joinedload(models.Folder.subfolders), # Use models.Folder.subfolders
-        joinedload(models.Folder.images) # Use models.Folder.images
-    ).filter(models.Folder.parent_id == folder_id).all()
-    
-    # Apply post-processing to each subfolder
-    return [_post_process_folder_response(f) for f in subfolders]
+    as_dicts = fast_folders(fields, view, depth)
+    try:
+        subfolders, next_cursor = get_subfolders(
+            db, folder_id, depth=depth, with_images=(view == "full"), limit=limit, after=after, sort=sort,
+            fields=fields, as_dicts=as_dicts
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    if fields is not None or as_dicts:
+        return dict_response(subfolders, response)
+    return _folder_read_responses(db, subfolders, depth, view)
 
 
 # NEW: Endpoint to get items directly within a folder
-@router.get("/{folder_id}/items", response_model=List[ItemResponse], summary="Get items in a folder")
-def read_folder_items(folder_id: int, db: Session = Depends(get_db)):
+@router.get("/{folder_id}/items", response_model=List[ItemResponse], summary="Get items in a folder", dependencies=[Depends(etag_guard)])
+def read_folder_items(
+    folder_id: int,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of items to return"),
+    after: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+    sort: ItemSort = Query("id", description="Sort order; ties are broken by id"),
+    fields: Optional[List[str]] = Depends(item_fields),
+    db: Session = Depends(get_db)
+):
     """
-    Retrieves a list of items directly contained within a specific folder.
+    Retrieves one page of the items directly contained within a specific folder.
+    With `fields`, only those fields are returned.
     """
-    # Ensure the folder exists
-    from app import models # Temporarily import models here for the query
-    get_folder(db, folder_id) # This will raise 404 if not found
-
-    items = db.query(models.Item).options( # Use models.Item
-        joinedload(models.Item.images) # Eagerly load item images
-    ).filter(models.Item.folder_id == folder_id).all()
+    fields = row_fields(fields)
+    try:
+        items, next_cursor = crud_get_items(db, limit=limit, folder_id=folder_id, after=after, sort=sort, fields=fields)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    if fields is not None:
+        return dict_response(items, response)
     return items
 
 
@@ -290,11 +426,23 @@ def get_folder_total_quantity(folder_id: int, db: Session = Depends(get_db)):
     Calculates the total quantity of items within a specified folder,
     including items in its subfolders recursively.
     """
-    from app import models # Temporarily import models here for the query
-    get_folder(db, folder_id) # Ensure folder exists
-    # Direct call to the imported function
-    total_quantity = calculate_folder_quantity(db, folder_id)
-    return {"quantity": total_quantity}
+    # The rollup query also tells us whether the folder exists
+    stats = get_folder_stats(db, folder_id)
+    if stats is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Folder not found")
+    return {"quantity": stats.total_quantity}
+
+
+@router.get("/{folder_id}/stats", response_model=FolderStatsResponse, summary="Get subtree rollups for a folder")
+def get_folder_subtree_stats(folder_id: int, db: Session = Depends(get_db)):
+    """
+    Retrieves the total quantity, item count, subfolder count and max depth
+    for a folder and everything below it.
+    """
+    stats = get_folder_stats(db, folder_id)
+    if stats is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Folder not found")
+    return stats
 
 
 @router.get("/{folder_id}/parent", response_model=Optional[FolderResponse], summary="Get the parent of a folder")
@@ -314,44 +462,23 @@ def get_folder_parent(folder_id: int, db: Session = Depends(get_db)):
 
 # NEW: Endpoint to upload an image for a folder
 @router.post("/{folder_id}/images/", response_model=ImageResponse, summary="Upload an image for a folder")
-async def upload_image_for_folder(folder_id: int, file: UploadFile = File(...), db: Session = Depends(get_db)):
+def upload_image_for_folder(folder_id: int, file: UploadFile = File(...), db: Session = Depends(get_db)):
     """
     Uploads an image file and associates it with a folder.
-    The image file will be saved to `/app/static/images/`.
+    The image file will be saved to `static/images/`; files over the upload size limit are rejected with a 413.
     """
     db_folder = get_folder(db, folder_id) # Use the existing get_folder function
     if db_folder is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Folder not found")
 
-    # Define the directory to save images
-    # This path must match the volume mount in docker-compose.yml
-    UPLOAD_DIRECTORY = "/app/static/images"
-    os.makedirs(UPLOAD_DIRECTORY, exist_ok=True) # Ensure directory exists
-
-    file_path = os.path.join(UPLOAD_DIRECTORY, file.filename)
-    logging.info(f"Attempting to save file to: {file_path}")
+    stored_image = store_upload(file)
+    logging.info(f"Received {stored_image['size']} bytes with SHA-256 {stored_image['sha256']}")
 
     try:
-        # Save the file to the static directory
-        with open(file_path, "wb") as image_file:
-            image_data = await file.read()
-            logging.info(f"File size: {len(image_data)} bytes")
-            image_file.write(image_data)
-
         # Create a database record for the image
-        # Use the ImageCreate schema to validate and pass data to CRUD
-        image_create_data = ImageCreate(
-            filename=file.filename,
-            filepath=f"/static_images/{file.filename}", # Use /static_images/ prefix for frontend
-            description=f"Image for folder {db_folder.name}",
-            folder_id=folder_id,
-            item_id=None # Ensure item_id is None for folder images
-        )
-        db_image = crud_create_image(db=db, image=image_create_data) # Use image CRUD function
-
-        return db_image
+        return create_image_record(db, stored_image, description=f"Image for folder {db_folder.name}", folder_id=folder_id)
 
     except Exception as e:
-        logging.error(f"Error saving file or creating image record for folder: {e}")
+        logging.error(f"Error creating image record for folder: {e}")
         db.rollback() # Rollback if image record creation fails after file save
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error saving file or creating image record: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Error creating image record: {e}")
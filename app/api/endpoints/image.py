@@ -1,30 +1,25 @@
 # app/api/endpoints/image.py
 # FastAPI router for Image operations, now with file upload support.
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
-import os
-import shutil
 
 # Import specific crud functions and schemas directly
 from app.crud.image import (
-    create_image, get_image, get_images, update_image, delete_image
+    create_image, get_image, get_images, get_images_for_owners, update_image, delete_image
 )
+from app.crud.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, InvalidCursor
 from app.schemas.image import ImageCreate, ImageUpdate, ImageResponse
+from app.schemas.bulk import ImageBatchResponse
 from app.db.session import get_db
+from app.api.batch import parse_ids
+from app.api.fields import dict_response
+from app.core.fastjson import FAST_JSON_ENABLED
 
 router = APIRouter(
     tags=["Images"],
 )
 
-# Define the directory where images will be stored.
-# This must match the directory mounted in main.py
-IMAGE_DIR = "static/images"
-os.makedirs(IMAGE_DIR, exist_ok=True)
-
-
-
-
 
 @router.post("/", response_model=ImageResponse, status_code=status.HTTP_201_CREATED, summary="Create a new image record")
 def create_new_image(image: ImageCreate, db: Session = Depends(get_db)):
@@ -46,6 +41,31 @@ def create_new_image(image: ImageCreate, db: Session = Depends(get_db)):
     db_image = create_image(db=db, image=image)
     return db_image
 
+# Declared before "/{image_id}" so that "batch" is not parsed as an image ID
+@router.get("/batch", response_model=ImageBatchResponse, summary="Get the images of many items or folders")
+def read_images_batch(
+    response: Response,
+    item_ids: Optional[List[str]] = Query(None, description="Comma-separated item ids; may be repeated"),
+    folder_ids: Optional[List[str]] = Query(None, description="Comma-separated folder ids; may be repeated"),
+    db: Session = Depends(get_db)
+):
+    """
+    Retrieve every image of many items, or of many folders, in one response, grouped in the
+    order of the ids. Owner ids that do not exist are listed in `missing` instead of failing the request.
+    """
+    if (item_ids is None) == (folder_ids is None):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Exactly one of item_ids and folder_ids is required."
+        )
+    images, missing = get_images_for_owners(
+        db, item_ids=parse_ids(item_ids, "item_ids"), folder_ids=parse_ids(folder_ids, "folder_ids")
+    )
+    batch = {"images": images, "missing": missing}
+    if FAST_JSON_ENABLED:
+        return dict_response(batch, response)
+    return batch
+
 @router.get("/{image_id}", response_model=ImageResponse, summary="Get an image by ID")
 def read_image(image_id: int, db: Session = Depends(get_db)):
     """
@@ -58,26 +78,32 @@ def read_image(image_id: int, db: Session = Depends(get_db)):
 
 @router.get("/", response_model=List[ImageResponse], summary="Get all images or filter by item/folder")
 def read_images(
-    skip: int = 0,
-    limit: int = 100,
+    response: Response,
+    skip: int = Query(0, ge=0, deprecated=True, description="Offset paging, use `after` instead"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of images to return"),
+    after: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
     item_id: Optional[int] = None,
     folder_id: Optional[int] = None,
     db: Session = Depends(get_db)
 ):
     """
-    Retrieve a list of all image records, with optional pagination and filtering
-    by associated item ID or folder ID.
+    Retrieve one page of image records, ordered by id, with optional filtering
+    by associated item ID or folder ID. When more images follow, the X-Next-Cursor
+    response header holds the `after` value for the next page.
+    Use /images/batch to read the images of many items or folders at once.
     """
     if item_id is not None and folder_id is not None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Cannot filter images by both item_id and folder_id simultaneously."
         )
-    
-    images = get_images(db=db, skip=skip, limit=limit, item_id=item_id, folder_id=folder_id)
-    if not images:
-        return []
-        
+
+    try:
+        images, next_cursor = get_images(db=db, skip=skip, limit=limit, item_id=item_id, folder_id=folder_id, after=after)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return images
 
 @router.put("/{image_id}", response_model=ImageResponse, summary="Update an image by ID")
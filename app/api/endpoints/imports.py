@@ -0,0 +1,61 @@
+# app/api/endpoints/imports.py
+# FastAPI router for bulk imports of items from CSV or NDJSON files.
+
+import io
+from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, status
+from sqlalchemy.orm import Session
+from typing import Literal, Optional
+
+from app.api.uploads import UploadLimitRoute
+from app.crud.imports import MAX_IMPORT_BYTES, InvalidImport, import_format, import_items, read_records
+from app.db.session import get_db
+from app.schemas.imports import ImportKey, ImportReport
+
+
+class ImportLimitRoute(UploadLimitRoute):
+    """
+    Turns away import files over MAX_IMPORT_BYTES by their Content-Length, before they are spooled to disk.
+    """
+    max_bytes = MAX_IMPORT_BYTES
+
+
+router = APIRouter(
+    tags=["Import"],
+    route_class=ImportLimitRoute,
+)
+
+# Also served without the trailing slash: the static mount at "/" would otherwise answer /import
+@router.post("", response_model=ImportReport, summary="Import items from a CSV or NDJSON file")
+@router.post("/", response_model=ImportReport, include_in_schema=False)
+def import_inventory(
+    file: UploadFile = File(..., description="CSV file with a header line, or one JSON object per line"),
+    format: Optional[Literal["csv", "ndjson"]] = Form(None, description="File format; defaults to the file extension"),
+    key: Optional[ImportKey] = Form(None, description="Update existing items matching by 'id' or by 'name' within the same folder instead of creating new ones"),
+    dry_run: bool = Form(False, description="Validate and report without writing anything"),
+    db: Session = Depends(get_db),
+):
+    """
+    Creates items from the rows of an uploaded file. Rows take the item fields plus an optional
+    `folder_path` (folder names from the root joined by '/'); missing folders are created.
+    An NDJSON file from GET /export brings its own folders, which are re-created and used for its items.
+    Rows are written in chunks, each in its own transaction. Invalid rows are rejected and
+    reported by line number without stopping the import. Files over MAX_IMPORT_BYTES are
+    rejected with a 413.
+    """
+    if file.size is not None and file.size > MAX_IMPORT_BYTES: # Requests sent without a Content-Length
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File is larger than the limit of {MAX_IMPORT_BYTES} bytes",
+        )
+    try:
+        file_format = import_format(format, file.filename)
+    except InvalidImport as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        return import_items(db, read_records(stream, file_format), key=key, dry_run=dry_run)
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File is not UTF-8 encoded; rows before the invalid data may have been imported",
+        )
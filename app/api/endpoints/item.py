@@ -1,20 +1,20 @@
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, status, Response, Form
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, status, Response, Form, Query
 from pydantic import BaseModel
 from sqlalchemy.orm import Session
-import os
-import shutil
 
 from app.db.session import get_db
+from app.api.conditional import etag_guard
+from app.api.batch import batch_ids
+from app.api.fields import dict_response, item_fields, row_fields
+from app.api.uploads import UploadLimitRoute, create_image_record, store_upload
 from app.crud import item as crud_item
-from app.crud import image as crud_image
+from app.crud.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, InvalidCursor
 from app.schemas.item import ItemCreate, ItemResponse, ItemUpdate
-from app.schemas.image import ImageCreate, ImageResponse
+from app.schemas.image import ImageResponse
+from app.schemas.bulk import ItemBulkMove, ItemBulkPatch, BulkResponse, ItemBatchResponse
 
-router = APIRouter()
-
-IMAGE_DIR = "static/images"
-os.makedirs(IMAGE_DIR, exist_ok=True)
+router = APIRouter(route_class=UploadLimitRoute)
 
 class ItemClone(BaseModel):
     new_folder_id: Optional[int] = None
@@ -22,45 +22,79 @@ class ItemClone(BaseModel):
 class ItemMove(BaseModel):
     new_folder_id: Optional[int] = None
 
-@router.get("/", response_model=List[ItemResponse])
-def read_all_items(db: Session = Depends(get_db)):
-    return crud_item.get_items(db)
-
-@router.get("/{item_id}", response_model=ItemResponse)
-def read_item(item_id: int, db: Session = Depends(get_db)):
+ItemSort = Literal["id", "name", "acquired_date", "quantity"]
+
+@router.get("/", response_model=List[ItemResponse], dependencies=[Depends(etag_guard)])
+def read_all_items(
+    response: Response,
+    after: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of items to return"),
+    sort: ItemSort = Query("id", description="Sort order; ties are broken by id"),
+    tag: Optional[List[str]] = Query(None, description="Only items carrying this tag; repeat to require several tags"),
+    fields: Optional[List[str]] = Depends(item_fields),
+    db: Session = Depends(get_db)
+):
+    """
+    Retrieve one page of items. When more items follow, the X-Next-Cursor response header
+    holds the `after` value for the next page. With `fields`, only those fields are returned.
+    Tags are matched case-insensitively, e.g. `?tag=tools&tag=garage`.
+    """
+    fields = row_fields(fields)
+    try:
+        items, next_cursor = crud_item.get_items(db, limit=limit, after=after, sort=sort, fields=fields, tag_names=tag)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    if fields is not None:
+        return dict_response(items, response)
+    return items
+
+# Declared before "/{item_id}" so that "batch" is not parsed as an item ID
+@router.get("/batch", response_model=ItemBatchResponse, summary="Get many items by ID", dependencies=[Depends(etag_guard)])
+def read_items_batch(
+    response: Response,
+    ids: List[int] = Depends(batch_ids),
+    fields: Optional[List[str]] = Depends(item_fields),
+    db: Session = Depends(get_db)
+):
+    """
+    Retrieve many items by ID in one request, in the order of `ids`.
+    Ids that do not exist are listed in `missing` instead of failing the request.
+    With `fields`, only those fields are returned for each item.
+    """
+    fields = row_fields(fields)
+    items, missing = crud_item.get_items_by_ids(db, ids, fields=fields)
+    batch = {"items": items, "missing": missing}
+    if fields is not None:
+        return dict_response(batch, response)
+    return batch
+
+@router.get("/{item_id}", response_model=ItemResponse, dependencies=[Depends(etag_guard)])
+def read_item(item_id: int, response: Response, fields: Optional[List[str]] = Depends(item_fields), db: Session = Depends(get_db)):
+    if fields is not None:
+        sparse_item = crud_item.get_item_fields(db, item_id, fields)
+        if sparse_item is None:
+            raise HTTPException(status_code=404, detail="Item not found")
+        return dict_response(sparse_item, response)
     db_item = crud_item.get_item(db, item_id)
     if db_item is None:
         raise HTTPException(status_code=404, detail="Item not found")
     return db_item
 
 @router.post("/{item_id}/images/", response_model=ImageResponse, summary="Upload an image for an item")
-async def upload_image_for_item(item_id: int, file: UploadFile = File(...), db: Session = Depends(get_db)):
+def upload_image_for_item(item_id: int, file: UploadFile = File(...), db: Session = Depends(get_db)):
     db_item = crud_item.get_item(db, item_id)
     if db_item is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Item not found")
 
-    filename = os.path.basename(file.filename)
-    file_location = os.path.join(IMAGE_DIR, filename)
-
-    try:
-        with open(file_location, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-    except Exception as e:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to save file: {e}")
-
-    image_create_data = ImageCreate(
-        filename=filename,
-        filepath=f"/static_images/{filename}",
-        description=f"Image for item {db_item.name}",
-        item_id=item_id,
-        folder_id=None
-    )
-    db_image = crud_image.create_image(db=db, image=image_create_data)
+    stored_image = store_upload(file)
+    db_image = create_image_record(db, stored_image, description=f"Image for item {db_item.name}", item_id=item_id)
 
     return db_image
 
 @router.post("/", response_model=ItemResponse)
-async def create_item(
+def create_item(
     db: Session = Depends(get_db),
     name: str = Form(...),
     description: Optional[str] = Form(None),
@@ -72,6 +106,9 @@ async def create_item(
     folder_id: Optional[int] = Form(None),
     image: Optional[UploadFile] = File(None)
 ):
+    # Stored first, so that an image over the size limit is rejected before the item is created
+    stored_image = store_upload(image) if image and image.filename else None
+
     item_schema = ItemCreate(
         name=name, 
         description=description, 
@@ -84,20 +121,9 @@ async def create_item(
     )
     db_item = crud_item.create_item(db=db, item=item_schema)
 
-    if image and image.filename:
-        filename = os.path.basename(image.filename)
-        file_location = os.path.join(IMAGE_DIR, filename)
+    if stored_image:
         try:
-            with open(file_location, "wb") as buffer:
-                shutil.copyfileobj(image.file, buffer)
-            
-            image_schema = ImageCreate(
-                filename=filename,
-                filepath=f"/static_images/{filename}",
-                description=f"Image for item {db_item.name}",
-                item_id=db_item.id
-            )
-            crud_image.create_image(db=db, image=image_schema)
+            create_image_record(db, stored_image, description=f"Image for item {db_item.name}", item_id=db_item.id)
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Item created, but failed to upload image: {e}")
 
@@ -105,7 +131,7 @@ async def create_item(
     return db_item
 
 @router.put("/{item_id}", response_model=ItemResponse)
-async def update_item(
+def update_item(
     item_id: int,
     db: Session = Depends(get_db),
     name: str = Form(...),
@@ -133,22 +159,13 @@ async def update_item(
         folder_id=folder_id
     )
     
+    stored_image = store_upload(image) if image and image.filename else None
+
     updated_item = crud_item.update_item(db=db, item_id=item_id, item=item_update_schema)
 
-    if image and image.filename:
-        filename = os.path.basename(image.filename)
-        file_location = os.path.join(IMAGE_DIR, filename)
+    if stored_image:
         try:
-            with open(file_location, "wb") as buffer:
-                shutil.copyfileobj(image.file, buffer)
-            
-            image_schema = ImageCreate(
-                filename=filename,
-                filepath=f"/static_images/{filename}",
-                description=f"Image for item {updated_item.name}",
-                item_id=updated_item.id
-            )
-            crud_image.create_image(db=db, image=image_schema)
+            create_image_record(db, stored_image, description=f"Image for item {updated_item.name}", item_id=updated_item.id)
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Item updated, but failed to upload new image: {e}")
 
@@ -185,3 +202,19 @@ def move_item(item_id: int, move_data: ItemMove, db: Session = Depends(get_db)):
     if db_item is None:
         raise HTTPException(status_code=404, detail="Item not found or target folder invalid")
     return db_item
+
+@router.post("/bulk-move", response_model=BulkResponse)
+def bulk_move_items(move_data: ItemBulkMove, db: Session = Depends(get_db)):
+    """
+    Move several items to the same folder in a single transaction. Set new_folder_id to None to move them to the root.
+    Items that do not exist are skipped and reported per id.
+    """
+    return crud_item.bulk_move_items(db=db, item_ids=move_data.ids, new_folder_id=move_data.new_folder_id)
+
+@router.patch("/bulk", response_model=BulkResponse)
+def bulk_update_items(patch_data: ItemBulkPatch, db: Session = Depends(get_db)):
+    """
+    Apply partial updates to several items in a single transaction. Only the fields present in each patch are changed.
+    Patches for missing items or folders are skipped and reported per id.
+    """
+    return crud_item.bulk_update_items(db=db, patches=patch_data.items)
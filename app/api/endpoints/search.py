@@ -0,0 +1,40 @@
+# app/api/endpoints/search.py
+# FastAPI router for full-text search over items and folders.
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.orm import Session
+from typing import List, Literal, Optional
+
+from app.api.conditional import etag_guard
+from app.crud.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, InvalidCursor
+from app.crud.search import search
+from app.db.session import get_db
+from app.schemas.search import SearchHit
+
+router = APIRouter(
+    tags=["Search"],
+)
+
+# Also served without the trailing slash: the static mount at "/" would otherwise answer /search
+@router.get("", response_model=List[SearchHit], summary="Search items and folders", dependencies=[Depends(etag_guard)])
+@router.get("/", response_model=List[SearchHit], include_in_schema=False, dependencies=[Depends(etag_guard)])
+def search_inventory(
+    response: Response,
+    q: str = Query(..., min_length=1, description="Words to find in names, descriptions, notes and tags; each word also matches as a prefix"),
+    type: Optional[Literal["item", "folder"]] = Query(None, description="Only return items or only folders"),
+    after: Optional[str] = Query(None, description="Cursor from the X-Next-Cursor header of the previous page"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of hits to return"),
+    db: Session = Depends(get_db)
+):
+    """
+    Returns the items and folders containing every word of `q`, best matches first, with the
+    folder path of each hit. When more hits follow, the X-Next-Cursor response header holds
+    the `after` value for the next page.
+    """
+    try:
+        hits, next_cursor = search(db, q, entity=type, limit=limit, after=after)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return hits
@@ -0,0 +1,31 @@
+# app/api/endpoints/suggest.py
+# FastAPI router for as-you-type name suggestions.
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import List, Literal, Optional
+
+from app.api.conditional import etag_guard
+from app.crud.suggest import DEFAULT_SUGGESTIONS, MAX_SUGGESTIONS, suggest
+from app.db.session import get_db
+from app.schemas.suggest import NameSuggestion
+
+router = APIRouter(
+    tags=["Search"],
+)
+
+# Also served without the trailing slash: the static mount at "/" would otherwise answer /suggest
+@router.get("", response_model=List[NameSuggestion], summary="Suggest item and folder names", dependencies=[Depends(etag_guard)])
+@router.get("/", response_model=List[NameSuggestion], include_in_schema=False, dependencies=[Depends(etag_guard)])
+def suggest_names(
+    prefix: str = Query(..., min_length=1, description="Text typed so far; ASCII letters match case-insensitively"),
+    type: Optional[Literal["item", "folder"]] = Query(None, description="Only suggest item names or only folder names"),
+    limit: int = Query(DEFAULT_SUGGESTIONS, ge=1, le=MAX_SUGGESTIONS, description="Maximum number of suggestions"),
+    db: Session = Depends(get_db)
+):
+    """
+    Returns existing names starting with `prefix`, most used first and then most recently used.
+    When fewer than `limit` names match, names starting with `prefix` with one typo corrected
+    (a letter missing, extra, wrong or two letters swapped) follow, marked `fuzzy`.
+    """
+    return suggest(db, prefix, entity=type, limit=limit)
@@ -0,0 +1,30 @@
+# app/api/endpoints/tags.py
+# FastAPI router for the tags in use and their counts.
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from typing import List, Optional
+
+from app.api.conditional import etag_guard
+from app.crud.pagination import MAX_PAGE_SIZE
+from app.crud.tags import get_tags
+from app.db.session import get_db
+from app.schemas.tags import TagUsage
+
+router = APIRouter(
+    tags=["Tags"],
+)
+
+# Also served without the trailing slash: the static mount at "/" would otherwise answer /tags
+@router.get("", response_model=List[TagUsage], summary="List tags with counts", dependencies=[Depends(etag_guard)])
+@router.get("/", response_model=List[TagUsage], include_in_schema=False, dependencies=[Depends(etag_guard)])
+def read_tags(
+    prefix: Optional[str] = Query(None, description="Only tags starting with this text (case-insensitive)"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of tags to return"),
+    db: Session = Depends(get_db)
+):
+    """
+    Returns every tag in use with the number of items and folders carrying it, most used first.
+    Filter items by tag with `GET /items?tag=`.
+    """
+    return get_tags(db, prefix=prefix, limit=limit)
@@ -0,0 +1,63 @@
+# app/api/fields.py
+# Shared handling of the `fields=` query parameter for item and folder read endpoints,
+# and of the fast JSON path that serializes full responses straight from Core rows.
+
+from fastapi import HTTPException, Query, Response, status
+from typing import List, Optional
+
+from app.core.fastjson import FAST_JSON_ENABLED, dumps
+from app.crud.fields import FOLDER_FIELDS, ITEM_FIELDS, ITEM_RESPONSE_FIELDS, InvalidFields, parse_fields
+
+
+def _fields_dependency(allowed):
+    def dependency(
+        fields: Optional[str] = Query(
+            None, description=f"Comma-separated fields to return instead of the full object. One of: {', '.join(allowed)}"
+        )
+    ) -> Optional[List[str]]:
+        try:
+            return parse_fields(fields, allowed)
+        except InvalidFields as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return dependency
+
+# Dependencies returning the parsed fieldset, or None when the full object was requested
+item_fields = _fields_dependency(ITEM_FIELDS)
+folder_fields = _fields_dependency(FOLDER_FIELDS)
+
+def row_fields(fields: Optional[List[str]]) -> Optional[List[str]]:
+    """
+    Returns the item fields to read as Core rows: the requested fieldset, every ItemResponse
+    field on the fast JSON path, or None to read and validate ORM objects.
+    """
+    if fields is None and FAST_JSON_ENABLED:
+        return list(ITEM_RESPONSE_FIELDS)
+    return fields
+
+def fast_folders(fields: Optional[List[str]], view: str, depth: int) -> bool:
+    """
+    Returns True when a full folder listing can be built from Core rows (see crud folder_response_dicts).
+    """
+    return FAST_JSON_ENABLED and fields is None and view == "full" and depth <= 1
+
+def _quantities(content):
+    """
+    Yields the float values of a response built by app/crud/fields.py. Item quantity is the
+    only float column, found on items themselves and on the items nested in folders, either
+    in a list or in a batch envelope ({"items": [...]} or {"folders": [...]}).
+    """
+    entries = content if isinstance(content, list) else [content, *(content.get("folders") or ())]
+    for entry in entries:
+        if isinstance(entry.get("quantity"), float):
+            yield entry["quantity"]
+        for item in entry.get("items") or ():
+            if isinstance(item.get("quantity"), float):
+                yield item["quantity"]
+
+def dict_response(content, response: Response) -> Response:
+    """
+    Returns prebuilt dicts as JSON, bypassing the endpoint's response model.
+    Headers already set on the endpoint's `response` (next cursor, ETag) are carried over.
+    """
+    body = dumps(content, floats=_quantities(content))
+    return Response(content=body, media_type="application/json", headers=dict(response.headers))
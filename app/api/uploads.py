@@ -0,0 +1,116 @@
+# app/api/uploads.py
+# Shared handling of image uploads for the folder, item and image endpoints.
+
+import logging
+import threading
+from concurrent.futures import Future
+from fastapi import HTTPException, Request, UploadFile, params, status
+from fastapi.routing import APIRoute
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from app.core import thumbnails
+from app.core.uploads import MAX_UPLOAD_BYTES, UploadTooLarge, blob_name, discard_upload, receive_upload, store_file
+from app.crud.blobs import record_variants
+from app.crud.image import create_stored_image
+from app.db.session import SessionLocal
+
+MULTIPART_OVERHEAD = 64 * 1024 # Allowance for the boundaries and other form fields of an upload request
+
+_rendering = set() # Hashes of the stored files whose variants are being rendered
+_rendering_lock = threading.Lock()
+
+
+class UploadLimitRoute(APIRoute):
+    """
+    Route class of the routers with image upload endpoints. Rejects a request to an endpoint
+    taking a File() whose Content-Length already exceeds the upload limit with a 413, before
+    the multipart parser spools the body to disk. FastAPI parses the form before dependencies
+    run, so this cannot be a dependency. store_upload() still enforces the exact limit on the
+    received file, also for requests without a Content-Length. Subclasses set another `max_bytes`.
+    """
+    max_bytes = MAX_UPLOAD_BYTES
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        if not any(isinstance(param.field_info, params.File) for param in self.dependant.body_params):
+            return handler
+
+        async def limited_handler(request: Request):
+            content_length = request.headers.get("content-length", "")
+            if content_length.isdigit() and int(content_length) > self.max_bytes + MULTIPART_OVERHEAD:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"File is larger than the limit of {self.max_bytes} bytes",
+                )
+            return await handler(request)
+        return limited_handler
+
+
+def store_upload(upload: UploadFile) -> dict:
+    """
+    Receives an uploaded image with receive_upload(). Raises a 413 for files over the size limit
+    and a 500 if the file cannot be written. Pass the result to create_image_record() or discard_upload().
+    """
+    try:
+        return receive_upload(upload)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except OSError as e:
+        logging.error(f"Failed to save uploaded file {upload.filename!r}: {e}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to save file: {e}")
+
+def create_image_record(db: Session, stored: dict, description: str, item_id: Optional[int] = None,
+                        folder_id: Optional[int] = None):
+    """
+    Creates the Image row of a file received with store_upload() and moves the file into the
+    content-addressed store. The row is committed first, so a stored file always has a blob
+    row referencing it. Uploading a file the item or folder already has returns its existing image.
+    Variants of a new file are rendered in the background and recorded on the image later.
+    """
+    try:
+        db_image, path = create_stored_image(
+            db, stored["sha256"], blob_name(stored["sha256"], stored["filename"]), stored["size"],
+            filename=stored["filename"], description=description, item_id=item_id, folder_id=folder_id,
+        )
+        store_file(stored["temp_path"], path)
+    finally:
+        discard_upload(stored) # Nothing left to remove once the file is stored
+    if db_image.variants is None:
+        schedule_variants(db_image.sha256, path)
+    return db_image
+
+def schedule_variants(sha256: str, path: str):
+    """
+    Submits a stored file to the thumbnail process pool unless it is already being rendered.
+    """
+    with _rendering_lock:
+        if sha256 in _rendering:
+            return
+        _rendering.add(sha256)
+    try:
+        future = thumbnails.submit(path, sha256)
+    except Exception as e:
+        with _rendering_lock:
+            _rendering.discard(sha256)
+        logging.error(f"Could not schedule image variants for {path}: {e}")
+        return
+    future.add_done_callback(lambda done: _record_variants(sha256, done))
+
+def _record_variants(sha256: str, future: Future):
+    # Runs on the pool's result thread once rendering has finished
+    try:
+        if future.cancelled():
+            return
+        variants = future.result()
+        db = SessionLocal()
+        try:
+            record_variants(db, sha256, variants)
+            db.commit()
+        finally:
+            db.close()
+    except Exception as e:
+        logging.error(f"Failed to generate image variants for {sha256}: {e}")
+    finally:
+        with _rendering_lock:
+            _rendering.discard(sha256)
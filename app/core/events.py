@@ -0,0 +1,64 @@
+# app/core/events.py
+# In-process publish/subscribe of change messages for the GET /events stream.
+#
+# Writes are committed from worker threads (sync endpoints run in the threadpool) while each
+# event stream waits on the event loop, so every subscriber owns an asyncio.Queue that is fed
+# with loop.call_soon_threadsafe(). Messages only reach subscribers of the same process.
+
+import asyncio
+import threading
+
+SUBSCRIBER_QUEUE_SIZE = 100 # Messages buffered per subscriber before it is told to reload instead
+
+# Sent in place of the buffered messages to a subscriber that fell behind
+RELOAD_MESSAGE = {"reload": True}
+
+
+class EventBroker:
+    """
+    Fans published messages out to every subscribed queue.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {} # queue -> event loop the queue belongs to
+
+    def has_subscribers(self) -> bool:
+        return bool(self._subscribers)
+
+    def subscribe(self) -> asyncio.Queue:
+        """
+        Returns a new queue receiving every message published from now on. Call from the event loop.
+        """
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers[queue] = asyncio.get_running_loop()
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        with self._lock:
+            self._subscribers.pop(queue, None)
+
+    def publish(self, message: dict):
+        """
+        Queues `message` for every subscriber. Safe to call from any thread.
+        """
+        with self._lock:
+            subscribers = list(self._subscribers.items())
+        for queue, loop in subscribers:
+            try:
+                loop.call_soon_threadsafe(_deliver, queue, message)
+            except RuntimeError: # The subscriber's event loop is closed
+                self.unsubscribe(queue)
+
+
+def _deliver(queue: asyncio.Queue, message: dict):
+    if queue.full():
+        # A slow client cannot catch up message by message; drop the backlog and have it reload
+        while not queue.empty():
+            queue.get_nowait()
+        message = RELOAD_MESSAGE
+    queue.put_nowait(message)
+
+
+broker = EventBroker() # The process-wide broker used by the CRUD write paths and GET /events
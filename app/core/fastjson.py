@@ -0,0 +1,55 @@
+# app/core/fastjson.py
+# Fast JSON encoding for response bodies built directly from database rows.
+#
+# orjson is an optional dependency. When it is installed, bodies are encoded with it; the
+# output is byte-identical to Starlette's JSONResponse (compact separators, UTF-8, no ASCII
+# escaping) except for floats that Python would print in exponent form, which orjson spells
+# differently. Callers pass the floats contained in the body, and bodies holding such floats
+# are encoded with the standard library instead.
+
+import json
+import os
+from datetime import date, datetime
+from typing import Iterable
+
+try:
+    import orjson
+except ImportError: # Optional dependency, fall back to the standard library encoder
+    orjson = None
+
+# Set FAST_JSON=0 to serialize every read through the Pydantic response schemas instead
+FAST_JSON_ENABLED = os.environ.get("FAST_JSON", "1") != "0"
+
+# repr() switches to exponent notation outside this range, where orjson's spelling differs
+_EXACT_FLOAT_MIN = 1e-4
+_EXACT_FLOAT_MAX = 1e16
+
+
+def _default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def _stdlib_dumps(content) -> bytes:
+    # Same settings as starlette.responses.JSONResponse.render()
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":"), default=_default
+    ).encode("utf-8")
+
+def float_encodes_exactly(value: float) -> bool:
+    """
+    Returns True if orjson prints `value` exactly like repr() does (also False for NaN and infinities).
+    """
+    return value == 0 or _EXACT_FLOAT_MIN <= abs(value) < _EXACT_FLOAT_MAX
+
+def dumps(content, floats: Iterable[float] = ()) -> bytes:
+    """
+    Encodes plain dicts/lists (with dates) exactly like JSONResponse would after jsonable_encoder().
+    `floats` must yield every float value in `content`.
+    """
+    if orjson is None or not all(float_encodes_exactly(value) for value in floats):
+        return _stdlib_dumps(content)
+    try:
+        return orjson.dumps(content)
+    except orjson.JSONEncodeError: # e.g. lone surrogates, which the standard library still encodes
+        return _stdlib_dumps(content)
@@ -0,0 +1,175 @@
+# app/core/imagefiles.py
+# Serving of the image directory at IMAGE_URL_PREFIX (mounted by main.py).
+#
+# Files in the content-addressed store ("ab/ab12...ef.jpg") and their variants
+# ("ab/ab12...ef.w160.webp") never change once written, because their name is derived from
+# their content. They are sent with `Cache-Control: immutable` for a year, so browsers stop
+# asking for them, and with their hash as a strong ETag. Files stored under their upload name
+# before the store existed can still be overwritten and are revalidated on every use instead.
+#
+# Responses honour a single byte range (for resumed downloads and media players) and
+# If-Range. The body is handed to the server as a file when it supports the ASGI zero-copy
+# send extension, which uses sendfile(); otherwise it is read in large chunks with pread() in
+# the threadpool.
+
+import os
+import re
+from email.utils import formatdate
+from typing import Optional, Tuple
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Receive, Scope, Send
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+MUTABLE_CACHE_CONTROL = "no-cache" # Cached, but revalidated with the ETag before every use
+ZERO_COPY_EXTENSION = "http.response.zerocopysend"
+
+# A stored file or variant; the first group is its ETag (hash, and size for variants)
+_CONTENT_ADDRESSED = re.compile(r"([0-9a-f]{2})/(\1[0-9a-f]{62}(?:\.w\d+)?)(?:\.[a-z0-9]{1,10})?")
+_RANGE = re.compile(r"bytes=(\d*)-(\d*)")
+
+
+def content_etag(path: str) -> Optional[str]:
+    """
+    Returns the strong ETag of a content-addressed file (path relative to the image directory,
+    with "/" separators), or None for other files.
+    """
+    match = _CONTENT_ADDRESSED.fullmatch(path)
+    return f'"{match.group(2)}"' if match else None
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Returns (offset, length) of a single-range `Range` header for a file of `size` bytes,
+    or None if it should be ignored (multiple ranges, other units, malformed).
+    Raises ValueError if the range lies outside the file.
+    """
+    match = _RANGE.fullmatch(header.strip())
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+    first, last = match.groups()
+    if first == "": # The last `last` bytes
+        length = min(int(last), size)
+        if length == 0:
+            raise ValueError("Empty suffix range")
+        return size - length, length
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError("Range not satisfiable")
+    return start, end - start + 1
+
+def _open_and_read(path: str, offset: int, size: int) -> Tuple[int, bytes]:
+    # One threadpool round trip serves a whole thumbnail
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        return fd, os.pread(fd, size, offset)
+    except BaseException:
+        os.close(fd)
+        raise
+
+def _etag_listed(header: str, etag: str) -> bool:
+    # If-None-Match uses the weak comparison, so W/"x" matches "x"
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+class ImageFileResponse(FileResponse):
+    """
+    A FileResponse for a byte range of a file, sent with zero-copy sendfile when the server supports it.
+    """
+    chunk_size = 256 * 1024 # Fewer threadpool round trips than FileResponse's 64 KiB
+
+    def __init__(self, path: str, stat_result: os.stat_result, method: str, headers: dict,
+                 offset: int = 0, length: Optional[int] = None, status_code: int = 200):
+        self.offset = offset
+        self.length = stat_result.st_size - offset if length is None else length
+        headers = {**headers, "content-length": str(self.length)} # Not the file size for ranges
+        super().__init__(path, status_code=status_code, headers=headers, stat_result=stat_result, method=method)
+
+    def set_stat_headers(self, stat_result: os.stat_result) -> None:
+        # ImageFiles has set the validators already, there is no need to hash an mtime ETag
+        self.headers.setdefault("last-modified", formatdate(stat_result.st_mtime, usegmt=True))
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if self.send_header_only or self.length == 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        elif ZERO_COPY_EXTENSION in scope.get("extensions", {}):
+            file = await anyio.to_thread.run_sync(open, self.path, "rb")
+            try:
+                await send({"type": ZERO_COPY_EXTENSION, "file": file, "offset": self.offset,
+                            "count": self.length, "more_body": False})
+            finally:
+                await anyio.to_thread.run_sync(file.close)
+        else:
+            position, end = self.offset, self.offset + self.length
+            fd, chunk = await anyio.to_thread.run_sync(_open_and_read, self.path, position, min(self.chunk_size, self.length))
+            try:
+                while True:
+                    if not chunk:
+                        raise RuntimeError(f"File at path {self.path} was truncated while it was being sent.")
+                    position += len(chunk)
+                    await send({"type": "http.response.body", "body": chunk, "more_body": position < end})
+                    if position >= end:
+                        break
+                    chunk = await anyio.to_thread.run_sync(os.pread, fd, min(self.chunk_size, end - position), position)
+            finally:
+                os.close(fd)
+        if self.background is not None:
+            await self.background()
+
+
+class ImageFiles(StaticFiles):
+    """
+    StaticFiles for the image directory: long-lived immutable caching and strong ETags for
+    content-addressed files, revalidation for the others, and byte range requests.
+    """
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        etag = content_etag(self.get_path(scope).replace(os.sep, "/"))
+        if etag is None: # Starlette's ETag from the modification time and size
+            etag = f'"{FileResponse(full_path, stat_result=stat_result).headers["etag"]}"'
+            cache_control = MUTABLE_CACHE_CONTROL
+        else:
+            cache_control = IMMUTABLE_CACHE_CONTROL
+        headers = {
+            "accept-ranges": "bytes",
+            "cache-control": cache_control,
+            "etag": etag,
+            "last-modified": formatdate(stat_result.st_mtime, usegmt=True),
+        }
+        if self.is_not_modified(Headers(headers), request_headers):
+            return NotModifiedResponse(Headers(headers))
+
+        offset, length = 0, None
+        range_header = request_headers.get("range")
+        if range_header and status_code == 200 and self._range_applies(request_headers, headers):
+            size = stat_result.st_size
+            try:
+                requested = parse_range(range_header, size)
+            except ValueError:
+                return Response(status_code=416, headers={**headers, "content-range": f"bytes */{size}"})
+            if requested is not None:
+                offset, length = requested
+                headers["content-range"] = f"bytes {offset}-{offset + length - 1}/{size}"
+                status_code = 206
+        return ImageFileResponse(full_path, stat_result, scope["method"], headers, offset, length, status_code)
+
+    def is_not_modified(self, response_headers: Headers, request_headers: Headers) -> bool:
+        if "if-none-match" in request_headers: # Takes precedence over If-Modified-Since
+            return _etag_listed(request_headers["if-none-match"], response_headers["etag"])
+        return super().is_not_modified(response_headers, request_headers)
+
+    @staticmethod
+    def _range_applies(request_headers: Headers, headers: dict) -> bool:
+        # With If-Range, the range is only sent if the client's copy is still current
+        if_range = request_headers.get("if-range")
+        if if_range is None:
+            return True
+        if if_range.startswith('"') or if_range.startswith("W/"):
+            return if_range == headers["etag"] # Strong comparison, a weak tag never matches
+        return if_range == headers["last-modified"]
@@ -0,0 +1,110 @@
+# app/core/thumbnails.py
+# Downscaled variants of stored images, for cards and previews that do not need the original.
+#
+# Each stored file gets one variant per entry of VARIANT_SIZES that is smaller than the
+# original, stored next to it as "ab/ab12...ef.w160.webp" (JPEG when Pillow lacks WebP
+# support). Like the originals they are named after the content hash and never change.
+# Decoding and resizing is CPU-bound, so it runs in a process pool: the upload endpoints
+# submit the file and return straight away, and the variant paths are recorded on the images
+# when rendering has finished (see app/api/uploads.py).
+
+import os
+import tempfile
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import get_context
+
+from PIL import Image, ImageOps, UnidentifiedImageError, features
+
+from app.core.uploads import IMAGE_DIR, TEMP_PREFIX
+
+VARIANT_SIZES = {"thumb": 160, "small": 480, "medium": 1280} # Longest side in pixels
+VARIANT_QUALITY = 80
+THUMBNAIL_WORKERS = int(os.environ.get("THUMBNAIL_WORKERS", 2))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def variant_format() -> str:
+    return "webp" if features.check("webp") else "jpeg"
+
+def variant_name(sha256: str, size: int, file_format: str) -> str:
+    return f"{sha256[:2]}/{sha256}.w{size}.{'jpg' if file_format == 'jpeg' else file_format}"
+
+def _save(image: Image.Image, path: str, file_format: str):
+    """
+    Writes an image to a temporary file next to `path` and renames it into place.
+    """
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=TEMP_PREFIX)
+    try:
+        with os.fdopen(fd, "wb") as temp_file:
+            image.save(temp_file, format=file_format, quality=VARIANT_QUALITY)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+def render_variants(path: str, sha256: str, directory: str = IMAGE_DIR) -> dict:
+    """
+    Renders the variants of the stored file `path` (relative to `directory`) that do not exist
+    yet. Returns {variant name: path relative to `directory`}, empty for files that are not
+    images Pillow can read or that are smaller than every variant.
+    Raises FileNotFoundError if the file is missing. Runs in the worker processes.
+    """
+    file_format = variant_format()
+    try:
+        with Image.open(os.path.join(directory, path)) as original:
+            largest = max(original.size)
+            sizes = {name: size for name, size in VARIANT_SIZES.items() if size < largest}
+            if not sizes:
+                return {}
+            # Lets JPEG decode at a reduced scale that is still larger than every variant
+            original.draft("RGB", (max(sizes.values()),) * 2)
+            image = ImageOps.exif_transpose(original) # Also decodes the image
+    except FileNotFoundError:
+        raise
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, ValueError):
+        return {} # Not an image, or one too large or damaged to decode
+    if image.mode not in ("RGB", "RGBA") or (file_format == "jpeg" and image.mode != "RGB"):
+        image = image.convert("RGBA" if file_format == "webp" and "A" in image.getbands() else "RGB")
+    variants = {}
+    for name, size in sorted(sizes.items(), key=lambda entry: -entry[1]):
+        # Each variant is scaled from the next larger one, which is much cheaper than from the original
+        image = image.copy()
+        image.thumbnail((size, size), Image.Resampling.LANCZOS)
+        variant = variant_name(sha256, size, file_format)
+        target = os.path.join(directory, variant)
+        if not os.path.exists(target):
+            _save(image, target, file_format)
+        variants[name] = variant
+    return variants
+
+def executor() -> ProcessPoolExecutor:
+    """
+    Returns the process pool variants are rendered in, starting it on first use.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # Forking a process that runs server threads is unsafe, so workers start fresh
+            _executor = ProcessPoolExecutor(max_workers=THUMBNAIL_WORKERS, mp_context=get_context("spawn"))
+        return _executor
+
+def submit(path: str, sha256: str) -> Future:
+    """
+    Renders the variants of a stored file in the background. The future's result is that of render_variants().
+    """
+    return executor().submit(render_variants, path, sha256)
+
+def shutdown():
+    """
+    Stops the process pool, dropping variants that have not started rendering.
+    Images without variants are picked up again by the generate-variants maintenance command.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True, cancel_futures=True)
+            _executor = None
@@ -0,0 +1,129 @@
+# app/core/uploads.py
+# The pipeline every image upload endpoint stores its file with, and the layout of the
+# content-addressed image store.
+#
+# The multipart parser has already spooled the upload to a temporary file by the time an
+# endpoint runs; requests whose Content-Length is over the limit are turned away before that
+# (see UploadLimitRoute in app/api/uploads.py). receive_upload() copies the file in fixed-size
+# chunks into a temporary file in the image directory, hashing and counting bytes as it goes.
+# Once the Image row is committed, store_file() renames it to its content-addressed name
+# ("ab/ab12...ef.jpg", named after its SHA-256), or drops it if a file with that content is
+# already stored. Readers never see a partial file, stored files never change, and an upload
+# over the size limit leaves nothing behind. This is blocking I/O, so the upload endpoints are
+# plain `def` functions, which FastAPI runs in its threadpool instead of on the event loop.
+
+import hashlib
+import os
+import re
+import tempfile
+
+from fastapi import UploadFile
+
+IMAGE_DIR = "static/images" # Where uploaded images are stored, served at IMAGE_URL_PREFIX by main.py
+IMAGE_URL_PREFIX = "/static_images"
+UPLOAD_CHUNK_SIZE = 1024 * 1024 # Bytes copied per read
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", 25 * 1024 * 1024))
+TEMP_PREFIX = ".upload-" # Name prefix of files still being written
+MAX_FILENAME_LENGTH = 255 # Longest file name Image.filename accepts
+
+_EXTENSION = re.compile(r"\.[a-z0-9]{1,10}")
+
+
+class UploadTooLarge(ValueError):
+    """
+    Raised when an upload exceeds the size limit.
+    """
+
+
+def upload_filename(filename: str) -> str:
+    """
+    Returns the last component of a client-supplied file name, so that names like
+    "../x.jpg" or "C:\\photos\\x.jpg" are reduced to "x.jpg",
+    shortened to MAX_FILENAME_LENGTH characters.
+    """
+    name = os.path.basename(filename.replace("\\", "/")).strip()
+    if name in ("", ".", ".."):
+        return "upload"
+    root, extension = os.path.splitext(name)
+    return root[:MAX_FILENAME_LENGTH - len(extension)] + extension if len(name) > MAX_FILENAME_LENGTH else name
+
+def blob_name(sha256: str, filename: str) -> str:
+    """
+    Returns the content-addressed name of a file relative to IMAGE_DIR: a two-character
+    shard directory, the hash, and the lower-cased extension of `filename` so that the
+    file is served with the right content type.
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    return f"{sha256[:2]}/{sha256}{extension if _EXTENSION.fullmatch(extension) else ''}"
+
+def image_url(name: str) -> str:
+    return f"{IMAGE_URL_PREFIX}/{name}"
+
+def hash_file(path: str) -> tuple:
+    """
+    Returns (SHA-256 hex digest, size in bytes) of a file, read in chunks.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as file:
+        while chunk := file.read(UPLOAD_CHUNK_SIZE):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+def receive_upload(upload: UploadFile, directory: str = IMAGE_DIR, max_bytes: int = MAX_UPLOAD_BYTES) -> dict:
+    """
+    Copies an uploaded file into a temporary file in `directory`.
+    Returns {filename, temp_path, size, sha256}; pass it to store_file() or discard_upload().
+    Raises UploadTooLarge if the file has more than `max_bytes` bytes, and OSError if it cannot be written.
+    """
+    if upload.size is not None and upload.size > max_bytes:
+        raise UploadTooLarge(f"File is larger than the limit of {max_bytes} bytes")
+    os.makedirs(directory, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    # Created in the destination directory, so the final rename stays on one filesystem
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=TEMP_PREFIX)
+    try:
+        with os.fdopen(fd, "wb") as temp_file:
+            upload.file.seek(0)
+            while chunk := upload.file.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"File is larger than the limit of {max_bytes} bytes")
+                digest.update(chunk)
+                temp_file.write(chunk)
+            temp_file.flush()
+            os.fsync(temp_file.fileno()) # The data is on disk before a rename makes it visible
+        os.chmod(temp_path, 0o644) # mkstemp creates files readable by the owner only
+    except BaseException:
+        _unlink(temp_path)
+        raise
+    return {
+        "filename": upload_filename(upload.filename or ""),
+        "temp_path": temp_path,
+        "size": size,
+        "sha256": digest.hexdigest(),
+    }
+
+def store_file(temp_path: str, name: str, directory: str = IMAGE_DIR) -> str:
+    """
+    Moves a temporary file to its content-addressed `name` in `directory`, or removes it if
+    that file already exists (it has the same content). Returns the path of the stored file.
+    """
+    path = os.path.join(directory, name)
+    if os.path.exists(path):
+        _unlink(temp_path)
+    else:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(temp_path, path)
+    return path
+
+def discard_upload(received: dict):
+    _unlink(received["temp_path"])
+
+def _unlink(path: str):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,364 @@
+# app/crud/aggregates.py
+# Maintains the materialized per-folder and inventory-wide counters.
+#
+# The CRUD write paths call the hooks below in the same transaction as their writes,
+# so counts and stats reads are single-row lookups instead of full-table aggregates.
+# All statements here are Core statements: they run immediately (the session does not
+# autoflush) and never leave stale FolderStats/InventoryTotals objects in the session.
+
+from __future__ import annotations # MUST be the very first import
+
+from sqlalchemy.orm import Session
+from sqlalchemy import bindparam, delete, func, insert, select, update
+from typing import Dict, List, Optional
+
+# Import models from the top-level 'app' package
+from app import models
+from app.crud import changes, hierarchy
+
+TOTALS_ID = 1 # Primary key of the single inventory_totals row
+STAT_COLUMNS = (
+    "direct_item_count", "direct_quantity", "direct_subfolder_count",
+    "item_count", "quantity", "subfolder_count",
+)
+QUANTITY_TOLERANCE = 1e-6 # Incremental float sums may drift slightly from a fresh SUM()
+
+FolderStats = models.FolderStats.__table__
+InventoryTotals = models.InventoryTotals.__table__
+
+
+# --- Incremental updates ---
+
+def _chain_ids(db: Session, folder_id: Optional[int]) -> List[int]:
+    """
+    Returns the folder and all of its ancestors, i.e. every folder whose subtree counters
+    change when something is added directly to `folder_id`.
+    """
+    if folder_id is None:
+        return []
+    path = hierarchy.get_folder_path(db, folder_id)
+    if path is None:
+        return []
+    return hierarchy.ancestor_ids_from_path(path) + [folder_id]
+
+def _apply(db: Session, folder_id: Optional[int], items: int = 0, quantity: float = 0.0, folders: int = 0):
+    """
+    Adds a delta of items, quantity and subfolders below `folder_id` (None for the root level)
+    to the subtree counters of the folder and its ancestors, and to the inventory totals.
+    """
+    chain = _chain_ids(db, folder_id)
+    if chain:
+        db.execute(
+            update(FolderStats).where(FolderStats.c.folder_id.in_(chain)).values(
+                item_count=FolderStats.c.item_count + items,
+                quantity=FolderStats.c.quantity + quantity,
+                subfolder_count=FolderStats.c.subfolder_count + folders,
+            )
+        )
+    db.execute(
+        update(InventoryTotals).where(InventoryTotals.c.id == TOTALS_ID).values(
+            total_items=InventoryTotals.c.total_items + items,
+            total_quantity=InventoryTotals.c.total_quantity + quantity,
+            total_folders=InventoryTotals.c.total_folders + folders,
+        )
+    )
+
+def _apply_direct(db: Session, folder_id: Optional[int], items: int = 0, quantity: float = 0.0, subfolders: int = 0):
+    """
+    Adds a delta to the direct-children counters of a single folder.
+    """
+    if folder_id is None:
+        return
+    db.execute(
+        update(FolderStats).where(FolderStats.c.folder_id == folder_id).values(
+            direct_item_count=FolderStats.c.direct_item_count + items,
+            direct_quantity=FolderStats.c.direct_quantity + quantity,
+            direct_subfolder_count=FolderStats.c.direct_subfolder_count + subfolders,
+        )
+    )
+
+def item_added(db: Session, folder_id: Optional[int], quantity: Optional[float]):
+    """
+    Records a new item in `folder_id` (None for the root level).
+    """
+    _apply(db, folder_id, items=1, quantity=quantity or 0.0)
+    _apply_direct(db, folder_id, items=1, quantity=quantity or 0.0)
+
+def item_removed(db: Session, folder_id: Optional[int], quantity: Optional[float]):
+    """
+    Records the deletion of an item from `folder_id`.
+    """
+    _apply(db, folder_id, items=-1, quantity=-(quantity or 0.0))
+    _apply_direct(db, folder_id, items=-1, quantity=-(quantity or 0.0))
+
+def item_changed(db: Session, old_folder_id: Optional[int], old_quantity: Optional[float], new_folder_id: Optional[int], new_quantity: Optional[float]):
+    """
+    Records an item update that may have changed its folder and/or quantity.
+    """
+    if old_folder_id == new_folder_id and (old_quantity or 0.0) == (new_quantity or 0.0):
+        return
+    item_removed(db, old_folder_id, old_quantity)
+    item_added(db, new_folder_id, new_quantity)
+
+def items_changed(db: Session, changes: List[tuple]):
+    """
+    Records many item updates at once, as (old_folder_id, old_quantity, new_folder_id, new_quantity)
+    tuples. Deltas are netted per folder first, so each affected folder is updated only once.
+    """
+    deltas: Dict[Optional[int], list] = {}
+    for old_folder_id, old_quantity, new_folder_id, new_quantity in changes:
+        old_delta = deltas.setdefault(old_folder_id, [0, 0.0])
+        old_delta[0] -= 1
+        old_delta[1] -= old_quantity or 0.0
+        new_delta = deltas.setdefault(new_folder_id, [0, 0.0])
+        new_delta[0] += 1
+        new_delta[1] += new_quantity or 0.0
+    _apply_item_deltas(db, deltas)
+
+def items_added(db: Session, added: List[tuple]):
+    """
+    Records many new items at once, as (folder_id, quantity) tuples, updating each affected folder once.
+    """
+    deltas: Dict[Optional[int], list] = {}
+    for folder_id, quantity in added:
+        delta = deltas.setdefault(folder_id, [0, 0.0])
+        delta[0] += 1
+        delta[1] += quantity or 0.0
+    _apply_item_deltas(db, deltas)
+
+def _apply_item_deltas(db: Session, deltas: Dict[Optional[int], list]):
+    """
+    Applies {folder_id: [items, quantity]} deltas. The deltas are summed up every ancestor chain
+    first, so all subtree counters, all direct counters and the totals take one statement each.
+    """
+    deltas = {folder_id: delta for folder_id, delta in deltas.items() if delta[0] != 0 or delta[1] != 0.0}
+    if not deltas:
+        return
+    folder_ids = [folder_id for folder_id in deltas if folder_id is not None]
+    paths = dict(db.query(models.Folder.id, models.Folder.path).filter(models.Folder.id.in_(folder_ids))) if folder_ids else {}
+    subtree: Dict[int, list] = {}
+    for folder_id, (items, quantity) in deltas.items():
+        if not paths.get(folder_id):
+            continue
+        for chain_id in hierarchy.ancestor_ids_from_path(paths[folder_id]) + [folder_id]:
+            delta = subtree.setdefault(chain_id, [0, 0.0])
+            delta[0] += items
+            delta[1] += quantity
+
+    # Bind parameter names must differ from the column names they update
+    if subtree:
+        db.execute(
+            update(FolderStats).where(FolderStats.c.folder_id == bindparam("b_id")).values(
+                item_count=FolderStats.c.item_count + bindparam("b_items"),
+                quantity=FolderStats.c.quantity + bindparam("b_quantity"),
+            ),
+            [{"b_id": folder_id, "b_items": items, "b_quantity": quantity} for folder_id, (items, quantity) in subtree.items()],
+        )
+    if folder_ids:
+        db.execute(
+            update(FolderStats).where(FolderStats.c.folder_id == bindparam("b_id")).values(
+                direct_item_count=FolderStats.c.direct_item_count + bindparam("b_items"),
+                direct_quantity=FolderStats.c.direct_quantity + bindparam("b_quantity"),
+            ),
+            [{"b_id": folder_id, "b_items": deltas[folder_id][0], "b_quantity": deltas[folder_id][1]} for folder_id in folder_ids],
+        )
+    db.execute(
+        update(InventoryTotals).where(InventoryTotals.c.id == TOTALS_ID).values(
+            total_items=InventoryTotals.c.total_items + sum(delta[0] for delta in deltas.values()),
+            total_quantity=InventoryTotals.c.total_quantity + sum(delta[1] for delta in deltas.values()),
+        )
+    )
+
+def folder_added(db: Session, folder_id: int, parent_id: Optional[int]):
+    """
+    Records a new, empty folder. Its ancestry path must already be assigned.
+    """
+    db.execute(insert(FolderStats).values(folder_id=folder_id, **{c: 0 for c in STAT_COLUMNS}))
+    _apply(db, parent_id, folders=1)
+    _apply_direct(db, parent_id, subfolders=1)
+
+def _subtree_totals(db: Session, folder_id: int):
+    """
+    Returns the stored (item_count, quantity, subfolder_count) of a folder's subtree.
+    """
+    return db.execute(
+        select(FolderStats.c.item_count, FolderStats.c.quantity, FolderStats.c.subfolder_count)
+        .where(FolderStats.c.folder_id == folder_id)
+    ).first()
+
+def subtree_moved(db: Session, folder_id: int, old_parent_id: Optional[int], new_parent_id: Optional[int]):
+    """
+    Moves a folder's subtree counters from its old ancestors to its new ones.
+    """
+    row = _subtree_totals(db, folder_id)
+    if row is None or old_parent_id == new_parent_id:
+        return
+    # Totals are unchanged by a move, so the two deltas cancel out there
+    _apply(db, old_parent_id, items=-row.item_count, quantity=-row.quantity, folders=-(row.subfolder_count + 1))
+    _apply(db, new_parent_id, items=row.item_count, quantity=row.quantity, folders=row.subfolder_count + 1)
+    _apply_direct(db, old_parent_id, subfolders=-1)
+    _apply_direct(db, new_parent_id, subfolders=1)
+
+def subtree_removed(db: Session, folder_id: int):
+    """
+    Removes a folder's subtree from its ancestors and the totals, and drops the subtree's
+    own counter rows. Must be called before the folders themselves are deleted.
+    """
+    parent_id = db.query(models.Folder.parent_id).filter(models.Folder.id == folder_id).scalar()
+    path = hierarchy.get_folder_path(db, folder_id)
+    row = _subtree_totals(db, folder_id)
+    if row is None or path is None:
+        return
+    _apply(db, parent_id, items=-row.item_count, quantity=-row.quantity, folders=-(row.subfolder_count + 1))
+    _apply_direct(db, parent_id, subfolders=-1)
+    subtree_ids = select(models.Folder.id).where(hierarchy.subtree_filter(models.Folder.path, path))
+    db.execute(delete(FolderStats).where(FolderStats.c.folder_id.in_(subtree_ids)))
+
+def subtree_added(db: Session, folder_id: int):
+    """
+    Computes the counters of a freshly written subtree (e.g. a clone or an import)
+    from scratch and adds its totals to the ancestors and the inventory totals.
+    """
+    path = hierarchy.get_folder_path(db, folder_id)
+    if path is None:
+        return
+    stats = _compute(db, path)
+    _write_stats(db, stats, path)
+    root = stats[folder_id]
+    parent_id = db.query(models.Folder.parent_id).filter(models.Folder.id == folder_id).scalar()
+    _apply(db, parent_id, items=root["item_count"], quantity=root["quantity"], folders=root["subfolder_count"] + 1)
+    _apply_direct(db, parent_id, subfolders=1)
+
+
+# --- Reads ---
+
+def get_folder_stats(db: Session, folder_id: int):
+    """
+    Returns the stored counter row of a folder, or None if the folder has none.
+    """
+    return db.execute(select(FolderStats).where(FolderStats.c.folder_id == folder_id)).first()
+
+def get_direct_counts(db: Session, folder_ids: List[int]) -> Dict[int, tuple]:
+    """
+    Returns {folder_id: (direct_item_count, direct_subfolder_count)} for many folders in one query.
+    """
+    if not folder_ids:
+        return {}
+    rows = db.execute(
+        select(FolderStats.c.folder_id, FolderStats.c.direct_item_count, FolderStats.c.direct_subfolder_count)
+        .where(FolderStats.c.folder_id.in_(folder_ids))
+    )
+    return {row.folder_id: (row.direct_item_count, row.direct_subfolder_count) for row in rows}
+
+def get_totals(db: Session):
+    """
+    Returns the inventory totals row, computing it first if it is missing.
+    """
+    row = db.execute(select(InventoryTotals).where(InventoryTotals.c.id == TOTALS_ID)).first()
+    if row is None:
+        repair(db)
+        row = db.execute(select(InventoryTotals).where(InventoryTotals.c.id == TOTALS_ID)).first()
+    return row
+
+
+# --- Full recomputation, consistency check and repair ---
+
+def _compute(db: Session, root_path: Optional[str] = None) -> Dict[int, dict]:
+    """
+    Computes the counters of every folder (or of every folder in the subtree at `root_path`)
+    from the folders and items tables.
+    """
+    folder_query = select(models.Folder.id, models.Folder.parent_id, models.Folder.path)
+    if root_path is not None:
+        folder_query = folder_query.where(hierarchy.subtree_filter(models.Folder.path, root_path))
+    folders = db.execute(folder_query).all()
+    stats = {f.id: {c: 0 for c in STAT_COLUMNS} for f in folders}
+    for c in ("direct_quantity", "quantity"):
+        for s in stats.values():
+            s[c] = 0.0
+
+    item_query = select(models.Item.folder_id, func.count(models.Item.id), func.coalesce(func.sum(models.Item.quantity), 0.0)).group_by(models.Item.folder_id)
+    if root_path is not None:
+        subtree_ids = select(models.Folder.id).where(hierarchy.subtree_filter(models.Folder.path, root_path))
+        item_query = item_query.where(models.Item.folder_id.in_(subtree_ids))
+    for folder_id, count, quantity in db.execute(item_query):
+        if folder_id in stats:
+            stats[folder_id]["direct_item_count"] = count
+            stats[folder_id]["direct_quantity"] = quantity
+
+    for f in folders:
+        if f.parent_id in stats:
+            stats[f.parent_id]["direct_subfolder_count"] += 1
+        if f.path is None:
+            continue
+        direct = stats[f.id]
+        chain = [i for i in hierarchy.ancestor_ids_from_path(f.path) if i in stats]
+        for target in chain + [f.id]:
+            stats[target]["item_count"] += direct["direct_item_count"]
+            stats[target]["quantity"] += direct["direct_quantity"]
+        for target in chain:
+            stats[target]["subfolder_count"] += 1
+    return stats
+
+def _write_stats(db: Session, stats: Dict[int, dict], root_path: Optional[str] = None):
+    """
+    Replaces the stored counter rows of all folders (or of the subtree at `root_path`).
+    """
+    stmt = delete(FolderStats)
+    if root_path is not None:
+        subtree_ids = select(models.Folder.id).where(hierarchy.subtree_filter(models.Folder.path, root_path))
+        stmt = stmt.where(FolderStats.c.folder_id.in_(subtree_ids))
+    db.execute(stmt)
+    if stats:
+        db.execute(insert(FolderStats), [{"folder_id": folder_id, **s} for folder_id, s in stats.items()])
+
+def _compute_totals(db: Session) -> dict:
+    return {
+        "total_folders": db.query(func.count(models.Folder.id)).scalar(),
+        "total_items": db.query(func.count(models.Item.id)).scalar(),
+        "total_quantity": db.query(func.sum(models.Item.quantity)).scalar() or 0.0,
+    }
+
+def _differs(stored, expected: dict) -> bool:
+    for key, value in expected.items():
+        stored_value = getattr(stored, key)
+        if isinstance(value, float):
+            if abs(stored_value - value) > QUANTITY_TOLERANCE:
+                return True
+        elif stored_value != value:
+            return True
+    return False
+
+def check(db: Session) -> List[str]:
+    """
+    Compares every stored counter with a fresh computation.
+    Returns a list of human-readable problems (empty if everything is consistent).
+    """
+    problems = []
+    expected = _compute(db)
+    stored = {row.folder_id: row for row in db.execute(select(FolderStats)).all()}
+    for folder_id, values in expected.items():
+        if folder_id not in stored:
+            problems.append(f"folder {folder_id}: missing stats row")
+        elif _differs(stored[folder_id], values):
+            problems.append(f"folder {folder_id}: stored {dict(stored[folder_id]._mapping)} expected {values}")
+    for folder_id in stored.keys() - expected.keys():
+        problems.append(f"folder {folder_id}: stats row for a deleted folder")
+
+    totals = db.execute(select(InventoryTotals).where(InventoryTotals.c.id == TOTALS_ID)).first()
+    expected_totals = _compute_totals(db)
+    if totals is None:
+        problems.append("inventory totals row is missing")
+    elif _differs(totals, expected_totals):
+        problems.append(f"inventory totals: stored {dict(totals._mapping)} expected {expected_totals}")
+    return problems
+
+def repair(db: Session):
+    """
+    Recomputes every counter row and the inventory totals from scratch. Commits.
+    """
+    _write_stats(db, _compute(db))
+    db.execute(delete(InventoryTotals))
+    db.execute(insert(InventoryTotals).values(id=TOTALS_ID, **_compute_totals(db)))
+    changes.note_change(db, reload=True)
+    db.commit()
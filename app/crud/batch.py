@@ -0,0 +1,23 @@
+# app/crud/batch.py
+# Shared helpers for reads of many entities by an explicit list of ids.
+
+from __future__ import annotations # MUST be the very first import
+
+from typing import List, Tuple
+
+MAX_BATCH_SIZE = 1000 # Ids accepted per batch request, well below SQLite's bound-parameter limit
+
+
+def order_by_ids(rows, ids: List[int]) -> Tuple[list, List[int]]:
+    """
+    Returns (rows in the order of `ids`, ids without a row). Repeated ids are returned once.
+    `rows` may be ORM objects or Core rows; both expose `.id`.
+    """
+    by_id = {row.id: row for row in rows}
+    ordered, missing = [], []
+    for requested_id in dict.fromkeys(ids):
+        if requested_id in by_id:
+            ordered.append(by_id[requested_id])
+        else:
+            missing.append(requested_id)
+    return ordered, missing
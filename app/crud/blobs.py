@@ -0,0 +1,217 @@
+# app/crud/blobs.py
+# The content-addressed image store: one file per distinct image content, shared by every
+# image row with that content.
+#
+# Files are named after the SHA-256 of their bytes (see app/core/uploads.py) and never change,
+# so uploading the same photo twice, or cloning a folder with its images, stores nothing new.
+# image_blobs has one row per stored file. Its ref_count is kept equal to the number of images
+# using the file by triggers on `images`, so every write path (ORM, INSERT ... SELECT clones,
+# set-based and cascading deletes) keeps it exact in the same transaction, like the indexes in
+# app/crud/search.py and app/crud/suggest.py. A blob whose count drops to zero gets an
+# orphaned_at timestamp and stays on disk until it is removed by a garbage collection.
+#
+# Images uploaded before the store existed point at their upload name; migrate_legacy_images()
+# moves their files into the store.
+#
+# The downscaled variants of a stored file (see app/core/thumbnails.py) are recorded on every
+# image using it with record_variants(); generate_missing_variants() renders those still missing.
+
+from __future__ import annotations # MUST be the very first import
+
+import logging
+import os
+import shutil
+from sqlalchemy.orm import Session
+from sqlalchemy import select, text, update
+from typing import Dict, List, Optional
+
+from app import models
+from app.core import thumbnails
+from app.core.uploads import IMAGE_DIR, IMAGE_URL_PREFIX, blob_name, hash_file, image_url
+from app.crud import changes
+
+MIGRATION_BATCH_SIZE = 500 # Legacy files moved per transaction
+VARIANT_BATCH_SIZE = 100 # Stored files rendered per transaction by generate_missing_variants()
+
+_ADD_REFERENCE = "UPDATE image_blobs SET ref_count = ref_count + 1, orphaned_at = NULL WHERE sha256 = new.sha256;"
+# SET expressions see the old row, so ref_count <= 1 means this was the last reference
+_REMOVE_REFERENCE = (
+    "UPDATE image_blobs SET ref_count = ref_count - 1, "
+    "orphaned_at = CASE WHEN ref_count <= 1 THEN CURRENT_TIMESTAMP ELSE orphaned_at END WHERE sha256 = old.sha256;"
+)
+_TRIGGERS = [
+    f"CREATE TRIGGER IF NOT EXISTS images_blob_insert AFTER INSERT ON images "
+    f"WHEN new.sha256 IS NOT NULL BEGIN {_ADD_REFERENCE} END",
+    f"CREATE TRIGGER IF NOT EXISTS images_blob_delete AFTER DELETE ON images "
+    f"WHEN old.sha256 IS NOT NULL BEGIN {_REMOVE_REFERENCE} END",
+    f"CREATE TRIGGER IF NOT EXISTS images_blob_update AFTER UPDATE OF sha256 ON images "
+    f"WHEN old.sha256 IS NOT new.sha256 BEGIN {_REMOVE_REFERENCE} {_ADD_REFERENCE} END",
+]
+_RECOUNT = (
+    "UPDATE image_blobs SET ref_count = (SELECT count(*) FROM images WHERE images.sha256 = image_blobs.sha256), "
+    "orphaned_at = CASE WHEN EXISTS (SELECT 1 FROM images WHERE images.sha256 = image_blobs.sha256) THEN NULL "
+    "ELSE coalesce(orphaned_at, CURRENT_TIMESTAMP) END"
+)
+
+
+def ensure_blob_triggers(connection) -> bool:
+    """
+    Creates the reference counting triggers if they do not exist yet, recounting the
+    references of every blob when they did not. Returns True if they had to be created.
+    """
+    missing = not connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'images_blob_insert'")
+    ).first()
+    if missing:
+        connection.execute(text(_RECOUNT))
+    for statement in _TRIGGERS:
+        connection.execute(text(statement))
+    return missing
+
+def recount_blobs(db: Session):
+    """
+    Recomputes the reference count of every blob from the images. Commits.
+    """
+    db.execute(text(_RECOUNT))
+    db.commit()
+
+def add_blob(db: Session, sha256: str, path: str, size: int) -> str:
+    """
+    Records a stored file unless a blob with the same content already exists.
+    Returns the path of the blob, which is the existing one's if there was one.
+    """
+    db.execute(text(
+        "INSERT INTO image_blobs (sha256, path, size, ref_count, created_at) "
+        "VALUES (:sha256, :path, :size, 0, CURRENT_TIMESTAMP) ON CONFLICT (sha256) DO NOTHING"
+    ), {"sha256": sha256, "path": path, "size": size})
+    return db.execute(select(models.ImageBlob.path).where(models.ImageBlob.sha256 == sha256)).scalar_one()
+
+def legacy_image_count(db: Session) -> int:
+    """
+    Returns the number of images whose file is in the image directory under its upload name.
+    """
+    return db.execute(text(
+        "SELECT count(*) FROM images WHERE sha256 IS NULL AND filepath LIKE :prefix"
+    ), {"prefix": IMAGE_URL_PREFIX + "/%"}).scalar()
+
+def _legacy_file(filepath: str, directory: str) -> Optional[str]:
+    """
+    Returns the path in `directory` of the file behind a legacy image URL, or None if the URL
+    does not name a file directly inside it.
+    """
+    name = filepath[len(IMAGE_URL_PREFIX) + 1:]
+    if not name or name != os.path.basename(name) or name in (".", ".."):
+        return None
+    return os.path.join(directory, name)
+
+def _store_copy(source: str, path: str):
+    """
+    Places a copy of `source` at `path` unless that file already exists, hard-linking when possible.
+    """
+    if os.path.exists(path):
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f"{path}.migrating"
+    try:
+        os.link(source, temp_path)
+    except OSError:
+        shutil.copyfile(source, temp_path)
+        os.chmod(temp_path, 0o644)
+    os.replace(temp_path, path)
+
+def migrate_legacy_images(db: Session, directory: str = IMAGE_DIR, batch_size: int = MIGRATION_BATCH_SIZE) -> dict:
+    """
+    Moves the files of images uploaded before the content-addressed store into it: each file is
+    hashed and stored under its hash, the images using it are pointed at the stored file, and
+    the old file is removed once that is committed. Identical files end up as one blob.
+    Each batch of files is committed separately. Images whose file is missing are left unchanged.
+    Returns {"images": migrated images, "files": legacy files removed, "blobs": blobs created, "missing": [image URLs]}.
+    """
+    report = {"images": 0, "files": 0, "blobs": 0, "missing": []}
+    last = ""
+    while True:
+        filepaths = db.execute(text(
+            "SELECT DISTINCT filepath FROM images WHERE sha256 IS NULL AND filepath LIKE :prefix AND filepath > :last "
+            "ORDER BY filepath LIMIT :limit"
+        ), {"prefix": IMAGE_URL_PREFIX + "/%", "last": last, "limit": batch_size}).scalars().all()
+        if not filepaths:
+            return report
+        last = filepaths[-1]
+        moved: List[str] = []
+        for filepath in filepaths:
+            source = _legacy_file(filepath, directory)
+            if source is None or not os.path.isfile(source):
+                report["missing"].append(filepath)
+                continue
+            sha256, size = hash_file(source)
+            created = db.get(models.ImageBlob, sha256) is None
+            path = add_blob(db, sha256, blob_name(sha256, source), size)
+            _store_copy(source, os.path.join(directory, path))
+            report["blobs"] += created
+            ids = db.execute(text(
+                "UPDATE images SET filepath = :url, sha256 = :sha256 WHERE filepath = :filepath AND sha256 IS NULL RETURNING id"
+            ), {"url": image_url(path), "sha256": sha256, "filepath": filepath}).scalars().all()
+            changes.log_changes(db, "image", select(models.Image.id).where(models.Image.id.in_(ids)))
+            report["images"] += len(ids)
+            moved.append(source)
+        changes.note_change(db, reload=True)
+        db.commit()
+        for source in moved:
+            try:
+                os.unlink(source)
+                report["files"] += 1
+            except OSError as e:
+                logging.warning(f"Could not remove migrated image file {source}: {e}")
+
+def blob_variants(db: Session, sha256: str) -> Optional[Dict[str, str]]:
+    """
+    Returns the variants already recorded for a stored file, or None if they have not been rendered.
+    """
+    return db.execute(
+        select(models.Image.variants).where(models.Image.sha256 == sha256, models.Image.variants.isnot(None)).limit(1)
+    ).scalar()
+
+def record_variants(db: Session, sha256: str, variants: Dict[str, str]) -> int:
+    """
+    Records the variants rendered for a stored file ({size name: path relative to the image
+    directory}) on every image using it. Returns the number of updated images. Does not commit.
+    """
+    updated = db.execute(
+        update(models.Image).where(models.Image.sha256 == sha256)
+        .values(variants={name: image_url(path) for name, path in variants.items()})
+        .returning(models.Image.id, models.Image.folder_id, models.Image.item_id)
+    ).all()
+    changes.note_change(db, *(
+        changes.change_event("image", "update", image.id, image.folder_id, item_id=image.item_id) for image in updated
+    ))
+    return len(updated)
+
+def generate_missing_variants(db: Session, batch_size: int = VARIANT_BATCH_SIZE) -> dict:
+    """
+    Renders the variants of every stored file used by images that have none recorded, in the
+    thumbnail process pool, committing after each batch of files.
+    Returns {"files": files rendered, "images": images updated, "missing": [paths of missing files]}.
+    """
+    report = {"files": 0, "images": 0, "missing": []}
+    last = ""
+    while True:
+        blobs = db.execute(
+            select(models.ImageBlob.sha256, models.ImageBlob.path)
+            .where(models.ImageBlob.sha256 > last, models.ImageBlob.sha256.in_(
+                select(models.Image.sha256).where(models.Image.variants.is_(None))
+            ))
+            .order_by(models.ImageBlob.sha256).limit(batch_size)
+        ).all()
+        if not blobs:
+            return report
+        last = blobs[-1].sha256
+        futures = [(blob, thumbnails.submit(blob.path, blob.sha256)) for blob in blobs]
+        for blob, future in futures:
+            try:
+                variants = future.result()
+            except FileNotFoundError:
+                report["missing"].append(blob.path)
+                continue
+            report["images"] += record_variants(db, blob.sha256, variants)
+            report["files"] += 1
+        db.commit()
@@ -0,0 +1,168 @@
+# app/crud/changes.py
+# Tracks a version stamp of the inventory for ETag / If-None-Match handling, collects
+# the change events published on the GET /events stream, and keeps the change log
+# served by GET /changes.
+#
+# Every CRUD write calls note_change() in the same transaction as its writes, so the
+# version moves forward exactly when committed data changes. Reads compare the
+# version with the client's ETag before loading anything else. The events passed to
+# note_change() are held on the session and published only once the transaction commits.
+#
+# The events are also recorded in the change log, which holds one row per entity: each
+# write replaces the entity's row and so gives it the next sequence number, and deletes
+# leave a tombstone. The log therefore grows with the inventory, not with the number of
+# writes; compaction removes tombstones older than CHANGE_LOG_RETENTION. SQLite runs one
+# write transaction at a time, so sequence numbers become visible in increasing order.
+
+from __future__ import annotations # MUST be the very first import
+
+import secrets
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session
+from sqlalchemy import delete, event, func, insert, literal, select, update
+from typing import Optional, Tuple
+
+# Import models from the top-level 'app' package
+from app import models
+from app.core.events import broker
+
+COUNTER_ID = 1 # Primary key of the single change_counter row
+TOTALS_ID = 1 # Primary key of the single inventory_totals row (see app/crud/aggregates.py)
+MAX_EVENTS_PER_MESSAGE = 100 # Larger transactions are published as a reload instead of one event per row
+PENDING_EVENTS = "pending_change_events" # Session.info key holding the message of the open transaction
+CHANGE_LOG_RETENTION = timedelta(days=30) # Tombstones older than this are removed by compaction
+COMPACTION_INTERVAL = 1000 # note_change() compacts the change log once every this many versions
+LOGGED_ENTITIES = (("folder", models.Folder), ("item", models.Item), ("image", models.Image))
+
+ChangeCounter = models.ChangeCounter.__table__
+InventoryTotals = models.InventoryTotals.__table__
+ChangeLog = models.ChangeLogEntry.__table__
+
+
+def ensure_counter(db: Session):
+    """
+    Creates the counter row with a fresh epoch if it does not exist yet. Commits.
+    """
+    if db.execute(select(ChangeCounter.c.id).where(ChangeCounter.c.id == COUNTER_ID)).first() is None:
+        db.execute(insert(ChangeCounter).values(id=COUNTER_ID, epoch=secrets.token_hex(4), version=0))
+        db.commit()
+
+def change_event(entity: str, op: str, entity_id: int, folder_id: Optional[int] = None, **extra) -> dict:
+    """
+    Builds one change event: the entity ("item", "folder" or "image"), the operation
+    ("create", "update", "move" or "delete"), its id and the folder it is in (the parent
+    for folders). Moves also carry `from_folder_id`; images carry their `item_id`.
+    """
+    return {"entity": entity, "op": op, "id": entity_id, "folder_id": folder_id, **extra}
+
+def _log_statement():
+    # OR REPLACE deletes the entity's previous row, so the new row takes the next sequence number
+    return insert(ChangeLog).prefix_with("OR REPLACE")
+
+def log_changes(db: Session, entity: str, ids, deleted: bool = False):
+    """
+    Records a change of every `entity` whose id is selected by `ids` (a SELECT of one id column)
+    in the change log, for set-based writes that do not describe their rows one by one.
+    Deleted rows must be logged before they are deleted.
+    """
+    selected = ids.subquery()
+    db.execute(_log_statement().from_select(
+        ["entity", "entity_id", "deleted", "changed_at"],
+        select(literal(entity), selected.c[0], literal(deleted), literal(datetime.utcnow())),
+    ))
+
+def note_change(db: Session, *events: dict, reload: bool = False):
+    """
+    Moves the inventory version forward. Call it from every write path before committing.
+    `events` describe what changed and are recorded in the change log; pass reload=True as well
+    for changes too broad to describe one by one on the event stream. The events are published
+    to GET /events subscribers when the transaction commits.
+    """
+    version = db.execute(
+        update(ChangeCounter).where(ChangeCounter.c.id == COUNTER_ID)
+        .values(version=ChangeCounter.c.version + 1)
+        .returning(ChangeCounter.c.version)
+    ).scalar()
+    if events:
+        changed_at = datetime.utcnow()
+        db.execute(_log_statement(), [
+            {"entity": e["entity"], "entity_id": e["id"], "deleted": e["op"] == "delete", "changed_at": changed_at}
+            for e in events
+        ])
+    if version is not None and version % COMPACTION_INTERVAL == 0:
+        _compact(db, datetime.utcnow() - CHANGE_LOG_RETENTION)
+    if not broker.has_subscribers():
+        return
+    message = db.info.setdefault(PENDING_EVENTS, {"changes": []})
+    message["changes"].extend(events)
+    if reload or len(message["changes"]) > MAX_EVENTS_PER_MESSAGE:
+        message["reload"] = True
+    # Version and counts as of this write; the last call before the commit wins
+    epoch, version = get_version(db)
+    totals = db.execute(
+        select(InventoryTotals.c.total_folders, InventoryTotals.c.total_items, InventoryTotals.c.total_quantity)
+        .where(InventoryTotals.c.id == TOTALS_ID)
+    ).first()
+    message["version"] = f"{epoch}-{version}"
+    message["counts"] = dict(totals._mapping) if totals is not None else None
+
+@event.listens_for(Session, "after_commit")
+def _publish_pending_events(session: Session):
+    message = session.info.pop(PENDING_EVENTS, None)
+    if message is not None:
+        if message.get("reload"):
+            message = {"version": message["version"], "counts": message["counts"], "reload": True}
+        broker.publish(message)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending_events(session: Session):
+    session.info.pop(PENDING_EVENTS, None)
+
+def get_version(db: Session) -> Tuple[str, int]:
+    """
+    Returns the (epoch, version) stamp of the current inventory state.
+    """
+    row = db.execute(select(ChangeCounter.c.epoch, ChangeCounter.c.version).where(ChangeCounter.c.id == COUNTER_ID)).first()
+    if row is None:
+        ensure_counter(db)
+        row = db.execute(select(ChangeCounter.c.epoch, ChangeCounter.c.version).where(ChangeCounter.c.id == COUNTER_ID)).first()
+    return row.epoch, row.version
+
+def _compact(db: Session, cutoff: datetime) -> int:
+    tombstones = (ChangeLog.c.deleted.is_(True), ChangeLog.c.changed_at < cutoff)
+    horizon = db.execute(select(func.max(ChangeLog.c.seq)).where(*tombstones)).scalar()
+    if horizon is None:
+        return 0
+    removed = db.execute(delete(ChangeLog).where(*tombstones)).rowcount
+    db.execute(
+        update(ChangeCounter).where(ChangeCounter.c.id == COUNTER_ID)
+        .values(compacted_seq=func.max(ChangeCounter.c.compacted_seq, horizon))
+    )
+    return removed
+
+def compact_change_log(db: Session, retention: timedelta = CHANGE_LOG_RETENTION) -> int:
+    """
+    Removes tombstones older than `retention` from the change log and moves the compaction
+    horizon past them: clients that synced before the horizon must start over from since=0.
+    Rows of existing entities are never removed. Commits. Returns the number of removed tombstones.
+    """
+    removed = _compact(db, datetime.utcnow() - retention)
+    db.commit()
+    return removed
+
+def backfill_change_log(db: Session) -> int:
+    """
+    Records every folder, item and image in an empty change log, for databases created
+    before the log existed. Commits. Returns the number of recorded rows.
+    """
+    if db.execute(select(ChangeLog.c.seq).limit(1)).first() is not None:
+        return 0
+    changed_at = datetime.utcnow()
+    recorded = 0
+    for entity, model in LOGGED_ENTITIES:
+        recorded += db.execute(_log_statement().from_select(
+            ["entity", "entity_id", "deleted", "changed_at"],
+            select(literal(entity), model.id, literal(False), literal(changed_at)).order_by(model.id),
+        )).rowcount
+    db.commit()
+    return recorded
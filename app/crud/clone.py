@@ -0,0 +1,166 @@
+# app/crud/clone.py
+# Set-based cloning of a whole folder subtree.
+#
+# Instead of cloning row by row through the ORM, the subtree is copied with a handful of
+# INSERT ... SELECT statements: one per folder level, one for all items and one for each
+# kind of image. Old -> new ids are remapped through two temporary tables, filled by matching
+# each copy to its original through a marker (a placeholder path, items.clone_source_id).
+
+from __future__ import annotations # MUST be the very first import
+
+from sqlalchemy.orm import Session
+from sqlalchemy import column, or_, select, table, text
+from typing import Optional, Tuple
+
+# Import models from the top-level 'app' package
+from app import models
+from app.crud import aggregates, changes, hierarchy, tags
+
+CLONE_SUFFIX = " (Cloned)"
+# Placeholder path prefix marking folders inserted at the current level. It sorts before "/",
+# so it can never collide with a real path and is found with a range scan on the path index.
+PENDING_PATH_PREFIX = "#"
+
+_DEPTH_SQL = "(length(path) - length(replace(path, '/', '')))"
+
+# The id mapping tables, for selecting the ids of the copies
+_folder_map = table("clone_folder_map", column("old_id"), column("new_id"))
+_item_map = table("clone_item_map", column("old_id"), column("new_id"))
+
+
+def _prepare_maps(db: Session):
+    """
+    Creates (once per connection) and empties the temporary id mapping tables.
+    """
+    db.execute(text(
+        "CREATE TEMP TABLE IF NOT EXISTS clone_folder_map ("
+        "old_id INTEGER PRIMARY KEY, level INTEGER NOT NULL, new_id INTEGER)"
+    ))
+    db.execute(text("CREATE INDEX IF NOT EXISTS temp.idx_clone_folder_map_level ON clone_folder_map (level)"))
+    db.execute(text(
+        "CREATE TEMP TABLE IF NOT EXISTS clone_item_map ("
+        "old_id INTEGER PRIMARY KEY, new_folder_id INTEGER NOT NULL, new_id INTEGER)"
+    ))
+    db.execute(text("DELETE FROM clone_folder_map"))
+    db.execute(text("DELETE FROM clone_item_map"))
+
+def _clone_folders(db: Session, source_path: str, target_parent_id: Optional[int]) -> int:
+    """
+    Copies every folder of the subtree at `source_path`, one level per statement,
+    and fills clone_folder_map. Returns the number of copied folders.
+    """
+    # Snapshot the subtree first, so clones inserted into it are never copied again
+    db.execute(text(
+        f"INSERT INTO clone_folder_map (old_id, level) "
+        f"SELECT id, {_DEPTH_SQL} - :root_depth FROM folders WHERE path >= :low AND path < :high"
+    ), {
+        "root_depth": source_path.count(hierarchy.PATH_SEPARATOR),
+        "low": source_path,
+        "high": hierarchy.path_upper_bound(source_path),
+    })
+    max_level = db.execute(text("SELECT max(level) FROM clone_folder_map")).scalar()
+    pending = {"low": PENDING_PATH_PREFIX, "high": chr(ord(PENDING_PATH_PREFIX) + 1)}
+
+    for level in range(max_level + 1):
+        # The new parent is the target for the subtree root and the copy of the old parent below it
+        db.execute(text(
+            "INSERT INTO folders (name, description, notes, tags, parent_id, path) "
+            "SELECT f.name || :suffix, f.description, f.notes, f.tags, "
+            "CASE WHEN m.level = 0 THEN :target_parent_id ELSE pm.new_id END, "
+            ":pending || f.id "
+            "FROM clone_folder_map m JOIN folders f ON f.id = m.old_id "
+            "LEFT JOIN clone_folder_map pm ON pm.old_id = f.parent_id "
+            "WHERE m.level = :level ORDER BY f.id"
+        ), {"suffix": CLONE_SUFFIX, "target_parent_id": target_parent_id, "pending": PENDING_PATH_PREFIX, "level": level})
+        db.execute(text(
+            "UPDATE clone_folder_map SET new_id = ("
+            "SELECT id FROM folders WHERE path = :pending || clone_folder_map.old_id"
+            ") WHERE level = :level"
+        ), {"pending": PENDING_PATH_PREFIX, "level": level})
+        # Parents of this level already have their final paths
+        db.execute(text(
+            "UPDATE folders SET path = coalesce("
+            "(SELECT p.path FROM folders p WHERE p.id = folders.parent_id), '/'"
+            ") || id || '/' WHERE path >= :low AND path < :high"
+        ), pending)
+
+    return db.execute(text("SELECT count(*) FROM clone_folder_map")).scalar()
+
+def _clone_items(db: Session) -> int:
+    """
+    Copies the items of every mapped folder with one INSERT ... SELECT and fills clone_item_map.
+    Returns the number of copied items.
+    """
+    db.execute(text(
+        "INSERT INTO clone_item_map (old_id, new_folder_id) "
+        "SELECT i.id, m.new_id FROM items i JOIN clone_folder_map m ON m.old_id = i.folder_id"
+    ))
+    count = db.execute(text("SELECT count(*) FROM clone_item_map")).scalar()
+    if not count:
+        return 0
+
+    # Each copy carries the id of its original in clone_source_id until it has been mapped
+    db.execute(text(
+        "INSERT INTO items (name, description, quantity, unit, notes, tags, folder_id, clone_source_id) "
+        "SELECT i.name || :suffix, i.description, i.quantity, i.unit, i.notes, i.tags, c.new_folder_id, i.id "
+        "FROM clone_item_map c JOIN items i ON i.id = c.old_id ORDER BY i.id"
+    ), {"suffix": CLONE_SUFFIX})
+    db.execute(text(
+        "UPDATE clone_item_map SET new_id = ("
+        "SELECT id FROM items WHERE clone_source_id = clone_item_map.old_id)"
+    ))
+    db.execute(text("UPDATE items SET clone_source_id = NULL WHERE clone_source_id IS NOT NULL"))
+    return count
+
+def _clone_images(db: Session) -> int:
+    """
+    Copies the images of every mapped folder and item. Returns the number of copied images.
+    """
+    folder_images = db.execute(text(
+        "INSERT INTO images (filename, filepath, description, sha256, variants, folder_id) "
+        "SELECT im.filename, im.filepath, im.description, im.sha256, im.variants, m.new_id "
+        "FROM images im JOIN clone_folder_map m ON m.old_id = im.folder_id WHERE im.item_id IS NULL"
+    )).rowcount
+    item_images = db.execute(text(
+        "INSERT INTO images (filename, filepath, description, sha256, variants, item_id) "
+        "SELECT im.filename, im.filepath, im.description, im.sha256, im.variants, c.new_id "
+        "FROM images im JOIN clone_item_map c ON c.old_id = im.item_id WHERE im.folder_id IS NULL"
+    )).rowcount
+    return folder_images + item_images
+
+def clone_subtree(db: Session, folder_id: int, new_parent_id: Optional[int] = None) -> Optional[Tuple[models.Folder, dict]]:
+    """
+    Clones a folder with all of its subfolders, items and images, appending " (Cloned)" to the
+    names of the copied folders and items. The copy is placed under `new_parent_id`, or next to
+    the original when it is None. Commits.
+    Returns (new root folder, {"folders": n, "items": n, "images": n}), or None if the folder
+    or the target parent does not exist.
+    """
+    source = db.query(models.Folder.parent_id, models.Folder.path).filter(models.Folder.id == folder_id).first()
+    if source is None or source.path is None:
+        return None
+    if new_parent_id is not None and hierarchy.get_folder_path(db, new_parent_id) is None:
+        return None
+    target_parent_id = new_parent_id if new_parent_id is not None else source.parent_id
+
+    _prepare_maps(db)
+    copied = {
+        "folders": _clone_folders(db, source.path, target_parent_id),
+        "items": _clone_items(db),
+        "images": _clone_images(db),
+    }
+    new_root_id = db.execute(text("SELECT new_id FROM clone_folder_map WHERE old_id = :id"), {"id": folder_id}).scalar()
+
+    aggregates.subtree_added(db, new_root_id)
+    tags.copy_links(db, "folder", _folder_map)
+    tags.copy_links(db, "item", _item_map)
+    new_folder_ids = select(_folder_map.c.new_id)
+    new_item_ids = select(_item_map.c.new_id)
+    changes.log_changes(db, "folder", new_folder_ids)
+    changes.log_changes(db, "item", new_item_ids)
+    changes.log_changes(db, "image", select(models.Image.id).where(
+        or_(models.Image.folder_id.in_(new_folder_ids), models.Image.item_id.in_(new_item_ids))
+    ))
+    changes.note_change(db, changes.change_event("folder", "create", new_root_id, target_parent_id))
+    db.commit()
+    return db.get(models.Folder, new_root_id), copied
@@ -4,22 +4,20 @@
 from __future__ import annotations # MUST be the very first import
 
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 
-# Import models and schemas from the top-level 'app' package
-from app import models, schemas
+# Import schemas from the top-level 'app' package
+from app import schemas
+from app.crud import aggregates
 
 def get_realtime_counts(db: Session) -> schemas.CountsResponse: # Direct type hint
     """
-    Calculates and returns real-time counts of folders, items, and their total quantity.
+    Returns real-time counts of folders, items, and their total quantity.
+    Reads the single inventory totals row maintained by the CRUD write paths.
     """
-    total_folders = db.query(models.Folder).count() # Use models.Folder
-    total_items = db.query(models.Item).count() # Use models.Item
-    # Sum of float quantities
-    total_quantity = db.query(func.sum(models.Item.quantity)).scalar() or 0.0 # Use models.Item.quantity
+    totals = aggregates.get_totals(db)
 
     return schemas.CountsResponse(
-        total_folders=total_folders,
-        total_items=total_items,
-        total_quantity=total_quantity
+        total_folders=totals.total_folders,
+        total_items=totals.total_items,
+        total_quantity=totals.total_quantity
     )
@@ -0,0 +1,71 @@
+# app/crud/export.py
+# Streams the whole inventory as newline-delimited JSON (one record per line).
+#
+# Every table is read in pages of EXPORT_BATCH_SIZE rows by id (keyset pagination), each page
+# in its own short read transaction that has ended before the page is encoded and handed to
+# the caller. A client reading slowly therefore never holds a lock that writers wait on, and
+# memory use depends on the batch size, not on the number of rows. The export is not a
+# point-in-time snapshot: rows written while it runs appear if their page has not been read yet.
+
+from __future__ import annotations # MUST be the very first import
+
+from sqlalchemy.orm import Session
+from sqlalchemy import select
+from typing import Iterator
+
+# Import models from the top-level 'app' package
+from app import models
+from app.core.fastjson import dumps
+from app.crud.fields import FOLDER_COLUMNS, IMAGE_RESPONSE_COLUMNS, ITEM_COLUMNS
+from app.crud.hierarchy import folder_name_paths
+
+EXPORT_BATCH_SIZE = 1000 # Rows fetched from the cursor and encoded per chunk
+
+
+def _records(db: Session, statement, id_column, record_type: str) -> Iterator[bytes]:
+    """
+    Yields one chunk of NDJSON lines per page of rows, in `id_column` order, each line tagged with its record type.
+    """
+    last_id = None
+    while True:
+        page = statement.order_by(id_column).limit(EXPORT_BATCH_SIZE)
+        if last_id is not None:
+            page = page.where(id_column > last_id)
+        result = db.execute(page)
+        keys = ["type", *result.keys()]
+        rows = result.all()
+        db.rollback() # Ends the read transaction before the page is sent
+        if not rows:
+            return
+        has_quantity = "quantity" in keys
+        lines = []
+        for row in rows:
+            record = dict(zip(keys, (record_type, *row)))
+            floats = (record["quantity"],) if has_quantity and isinstance(record["quantity"], float) else ()
+            lines.append(dumps(record, floats=floats))
+        yield b"\n".join(lines) + b"\n"
+        if len(rows) < EXPORT_BATCH_SIZE:
+            return
+        last_id = rows[-1].id
+
+def export_ndjson(db: Session, folder_paths: bool = False) -> Iterator[bytes]:
+    """
+    Yields every folder, then every item, then every image as NDJSON, each in id order.
+    With `folder_paths`, item records also carry "folder_path": the names of the folder
+    and its ancestors joined by "/" (None for items at the root level). The paths are
+    resolved by the database in the same query as the items.
+    """
+    yield from _records(db, select(*FOLDER_COLUMNS.values()), models.Folder.id, "folder")
+
+    item_columns = list(ITEM_COLUMNS.values())
+    if folder_paths:
+        names = folder_name_paths()
+        items = (
+            select(*item_columns, names.c.name_path.label("folder_path"))
+            .outerjoin(names, names.c.id == models.Item.folder_id)
+        )
+    else:
+        items = select(*item_columns)
+    yield from _records(db, items, models.Item.id, "item")
+
+    yield from _records(db, select(*IMAGE_RESPONSE_COLUMNS), models.Image.id, "image")
@@ -0,0 +1,189 @@
+# app/crud/fields.py
+# Sparse fieldset reads for items and folders (the `fields=` query parameter), and full
+# responses built from Core rows for the fast JSON path.
+#
+# Only the requested columns are selected, and each requested relationship is loaded for
+# the whole page with one extra SELECT ... IN. Relationships that are not requested are
+# never loaded. Results are plain dicts containing exactly the requested keys.
+
+from __future__ import annotations # MUST be the very first import
+
+from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from typing import Dict, List, Optional
+
+# Import models and schemas from the top-level 'app' package
+from app import models, schemas
+
+ITEM_COLUMNS = {
+    name: getattr(models.Item, name)
+    for name in ("id", "name", "description", "quantity", "unit", "notes", "tags", "acquired_date", "folder_id")
+}
+FOLDER_COLUMNS = {
+    name: getattr(models.Folder, name)
+    for name in ("id", "name", "description", "notes", "tags", "parent_id")
+}
+# Computed fields and relationships that can be requested besides the plain columns.
+# "thumbnail" is the path of the first image's smallest variant, or of the image itself while it
+# has none; folder counts are direct children only.
+ITEM_FIELDS = tuple(ITEM_COLUMNS) + ("thumbnail", "images")
+FOLDER_FIELDS = tuple(FOLDER_COLUMNS) + ("item_count", "subfolder_count", "thumbnail", "images", "items", "subfolders")
+FOLDER_SUBFOLDER_FIELDS = ("id", "name", "parent_id") # Shape of nested subfolders in a sparse folder
+# Full response shapes, in schema field order, for building complete responses from Core rows
+ITEM_RESPONSE_FIELDS = tuple(schemas.ItemResponse.model_fields)
+FOLDER_RESPONSE_COLUMNS = tuple(name for name in schemas.FolderResponse.model_fields if name in FOLDER_COLUMNS)
+IMAGE_RESPONSE_COLUMNS = tuple(getattr(models.Image, name) for name in schemas.ImageResponse.model_fields)
+
+
+class InvalidFields(ValueError):
+    """
+    Raised when `fields` is empty or names a field that does not exist.
+    """
+
+
+def parse_fields(fields: Optional[str], allowed) -> Optional[List[str]]:
+    """
+    Parses a comma-separated `fields` parameter into a list of unique field names, in request order.
+    Returns None when no fieldset was requested. Raises InvalidFields for unknown names.
+    """
+    if fields is None:
+        return None
+    requested = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    if not requested:
+        raise InvalidFields("fields must name at least one field")
+    unknown = [name for name in requested if name not in allowed]
+    if unknown:
+        raise InvalidFields(f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(allowed)}")
+    return requested
+
+def _thumbnail_column(owner_column, image_column, other_column):
+    return (
+        select(func.coalesce(func.json_extract(models.Image.variants, "$.thumb"), models.Image.filepath))
+        .where(image_column == owner_column, other_column.is_(None))
+        .order_by(models.Image.id).limit(1)
+        .scalar_subquery().label("thumbnail")
+    )
+
+def item_query(db: Session, fields: List[str], sort_column=None):
+    """
+    Builds a query selecting only the requested item columns, plus the id and sort column
+    that keyset pagination needs. Filters and paging are added by the caller.
+    """
+    columns = [ITEM_COLUMNS["id"]]
+    if sort_column is not None and sort_column is not ITEM_COLUMNS["id"]:
+        columns.append(sort_column)
+    columns += [ITEM_COLUMNS[name] for name in fields if name in ITEM_COLUMNS and ITEM_COLUMNS[name] not in columns]
+    if "thumbnail" in fields:
+        columns.append(_thumbnail_column(models.Item.id, models.Image.item_id, models.Image.folder_id))
+    return db.query(*columns)
+
+def folder_query(db: Session, fields: List[str], sort_column=None):
+    """
+    Builds a query selecting only the requested folder columns and counters, plus the id and
+    sort column that keyset pagination needs. Filters and paging are added by the caller.
+    """
+    columns = [FOLDER_COLUMNS["id"]]
+    if sort_column is not None and sort_column is not FOLDER_COLUMNS["id"]:
+        columns.append(sort_column)
+    columns += [FOLDER_COLUMNS[name] for name in fields if name in FOLDER_COLUMNS and FOLDER_COLUMNS[name] not in columns]
+    if "thumbnail" in fields:
+        columns.append(_thumbnail_column(models.Folder.id, models.Image.folder_id, models.Image.item_id))
+    counters = {"item_count": models.FolderStats.direct_item_count, "subfolder_count": models.FolderStats.direct_subfolder_count}
+    requested_counters = [name for name in counters if name in fields]
+    columns += [counters[name].label(name) for name in requested_counters]
+    query = db.query(*columns)
+    if requested_counters:
+        query = query.outerjoin(models.FolderStats, models.FolderStats.folder_id == models.Folder.id)
+    return query
+
+def images_by_owner(db: Session, owner_column, other_column, owner_ids: List[int]) -> Dict[int, list]:
+    """
+    Returns {owner id: [ImageResponse-shaped dicts]} for the images of many items or folders, in id order.
+    """
+    images: Dict[int, list] = {owner_id: [] for owner_id in owner_ids}
+    if not owner_ids:
+        return images
+    rows = db.query(*IMAGE_RESPONSE_COLUMNS).filter(owner_column.in_(owner_ids), other_column.is_(None)).order_by(models.Image.id)
+    for image in rows:
+        images[image._mapping[owner_column.key]].append(dict(image._mapping))
+    return images
+
+def item_dicts(db: Session, rows, fields: List[str]) -> List[dict]:
+    """
+    Turns rows from item_query() into dicts with exactly the requested fields,
+    loading the images of all rows with one query if they were requested.
+    """
+    images = images_by_owner(db, models.Image.item_id, models.Image.folder_id, [row.id for row in rows]) if "images" in fields else {}
+    result = []
+    for row in rows:
+        values = row._mapping
+        result.append({name: images[row.id] if name == "images" else values[name] for name in fields})
+    return result
+
+def folder_dicts(db: Session, rows, fields: List[str]) -> List[dict]:
+    """
+    Turns rows from folder_query() into dicts with exactly the requested fields. Each requested
+    relationship is loaded for all rows with one query: images in full, items as ItemSummary
+    and subfolders as {id, name, parent_id}.
+    """
+    folder_ids = [row.id for row in rows]
+    related: Dict[str, Dict[int, list]] = {}
+    if "images" in fields:
+        related["images"] = images_by_owner(db, models.Image.folder_id, models.Image.item_id, folder_ids)
+    if "items" in fields:
+        related["items"] = {folder_id: [] for folder_id in folder_ids}
+        if folder_ids:
+            summary_columns = [getattr(models.Item, name) for name in schemas.ItemSummary.model_fields]
+            for item in db.query(*summary_columns).filter(models.Item.folder_id.in_(folder_ids)).order_by(models.Item.id):
+                related["items"][item.folder_id].append(dict(item._mapping))
+    if "subfolders" in fields:
+        related["subfolders"] = {folder_id: [] for folder_id in folder_ids}
+        if folder_ids:
+            subfolder_columns = [FOLDER_COLUMNS[name] for name in FOLDER_SUBFOLDER_FIELDS]
+            for subfolder in db.query(*subfolder_columns).filter(models.Folder.parent_id.in_(folder_ids)).order_by(models.Folder.id):
+                related["subfolders"][subfolder.parent_id].append(dict(subfolder._mapping))
+
+    result = []
+    for row in rows:
+        values = row._mapping
+        folder = {}
+        for name in fields:
+            if name in related:
+                folder[name] = related[name][row.id]
+            elif name in ("item_count", "subfolder_count"):
+                folder[name] = values[name] or 0
+            else:
+                folder[name] = values[name]
+        result.append(folder)
+    return result
+
+def folder_response_dicts(db: Session, rows, depth: int) -> List[dict]:
+    """
+    Builds FolderResponse-shaped dicts from rows of folder_query(db, FOLDER_RESPONSE_COLUMNS),
+    matching what the endpoints serialize from ORM objects for depth 0 or 1 without validating
+    any model. At depth 1 the items (with their images), subfolders and images of all rows are
+    loaded with one query each. Nested lists are in id order.
+    """
+    folder_ids = [row.id for row in rows]
+    items: Dict[int, list] = {folder_id: [] for folder_id in folder_ids}
+    subfolders: Dict[int, list] = {folder_id: [] for folder_id in folder_ids}
+    images: Dict[int, list] = {}
+    if depth > 0 and folder_ids:
+        item_rows = item_query(db, ITEM_RESPONSE_FIELDS).filter(models.Item.folder_id.in_(folder_ids)).order_by(models.Item.id).all()
+        for item in item_dicts(db, item_rows, list(ITEM_RESPONSE_FIELDS)):
+            items[item["folder_id"]].append(item)
+        subfolder_rows = folder_query(db, FOLDER_RESPONSE_COLUMNS).filter(models.Folder.parent_id.in_(folder_ids)).order_by(models.Folder.id).all()
+        for subfolder in folder_response_dicts(db, subfolder_rows, 0):
+            subfolders[subfolder["parent_id"]].append(subfolder)
+        images = images_by_owner(db, models.Image.folder_id, models.Image.item_id, folder_ids)
+
+    result = []
+    for row in rows:
+        values = row._mapping
+        folder = {name: values[name] for name in FOLDER_RESPONSE_COLUMNS}
+        folder["id"] = row.id
+        folder["items"] = items[row.id]
+        folder["subfolders"] = subfolders[row.id]
+        folder["images"] = images.get(row.id, [])
+        result.append(folder)
+    return result
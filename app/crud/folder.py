@@ -3,16 +3,30 @@
 
 from __future__ import annotations # MUST be the very first import
 
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func
-from typing import List, Optional
+from sqlalchemy.orm import Session, joinedload, selectinload, aliased
+from sqlalchemy import delete, func, or_, select, update
+from typing import List, Optional, Tuple
 
 # Import models and schemas from the top-level 'app' package
 from app import models, schemas
+from app.crud import aggregates, changes, hierarchy, tags
+from app.crud.batch import order_by_ids
+from app.crud.clone import clone_subtree
+from app.crud.item import summarize_bulk_results
+from app.crud.fields import FOLDER_RESPONSE_COLUMNS, folder_dicts, folder_query, folder_response_dicts
+from app.crud.pagination import DEFAULT_PAGE_SIZE, paginate
 
 
 # --- Folder CRUD Operations ---
 
+def _folder_event(op: str, folder_id: int, old_parent_id: Optional[int], new_parent_id: Optional[int]) -> dict:
+    """
+    Builds the change event of a folder write, naming the previous parent if the folder moved.
+    """
+    if old_parent_id == new_parent_id:
+        return changes.change_event("folder", op, folder_id, new_parent_id)
+    return changes.change_event("folder", op, folder_id, new_parent_id, from_folder_id=old_parent_id)
+
 def create_folder(db: Session, folder: schemas.FolderCreate) -> models.Folder:
     """
     Creates a new folder in the database.
@@ -21,6 +35,12 @@ def create_folder(db: Session, folder: schemas.FolderCreate) -> models.Folder:
     
     db_folder = models.Folder(**folder_data) # Use models.Folder
     db.add(db_folder)
+    db.flush() # Flush to get the new id for the ancestry path
+    hierarchy.assign_path(db, db_folder)
+    aggregates.folder_added(db, db_folder.id, db_folder.parent_id)
+    if db_folder.tags:
+        tags.set_tags(db, "folder", {db_folder.id: db_folder.tags})
+    changes.note_change(db, changes.change_event("folder", "create", db_folder.id, db_folder.parent_id))
     db.commit()
     db.refresh(db_folder)
     return db_folder
@@ -35,6 +55,74 @@ def get_folder(db: Session, folder_id: int) -> Optional[models.Folder]:
         joinedload(models.Folder.images) # Use models.Folder.images
     ).filter(models.Folder.id == folder_id).first() # Use models.Folder.id
 
+def folder_load_options(depth: int, with_images: bool = True) -> list:
+    """
+    Builds loader options that fetch subfolders and items down to `depth` levels, one SELECT ... IN
+    per relationship and level. Folders at the last level are loaded without any relationships.
+    Images (of folders and items) are skipped when with_images is False.
+    """
+    options = []
+    level = None # Loader path to the subfolders of the previous level
+    for _ in range(depth):
+        items = level.selectinload(models.Folder.items) if level is not None else selectinload(models.Folder.items)
+        if with_images:
+            options.append(items.selectinload(models.Item.images))
+            options.append(level.selectinload(models.Folder.images) if level is not None else selectinload(models.Folder.images))
+        else:
+            options.append(items)
+        level = level.selectinload(models.Folder.subfolders) if level is not None else selectinload(models.Folder.subfolders)
+        options.append(level)
+    return options
+
+def get_folder_to_depth(db: Session, folder_id: int, depth: int = 1, with_images: bool = True) -> Optional[models.Folder]:
+    """
+    Retrieves a single folder with its subfolders and items loaded down to `depth` levels.
+    """
+    return db.query(models.Folder).options(
+        *folder_load_options(depth, with_images)
+    ).filter(models.Folder.id == folder_id).first()
+
+def get_folder_fields(db: Session, folder_id: int, fields: List[str]) -> Optional[dict]:
+    """
+    Retrieves only the requested fields of a single folder (see app/crud/fields.py).
+    """
+    rows = folder_query(db, fields).filter(models.Folder.id == folder_id).all()
+    return folder_dicts(db, rows, fields)[0] if rows else None
+
+# Sort orders accepted by the folder list endpoints, each backed by a (column, id) index
+FOLDER_SORT_COLUMNS = {
+    "id": models.Folder.id,
+    "name": models.Folder.name,
+}
+
+def _folder_list_query(db: Session, depth: int, with_images: bool, sort: str, fields: Optional[List[str]], as_dicts: bool):
+    if fields is not None:
+        return folder_query(db, fields, FOLDER_SORT_COLUMNS.get(sort))
+    if as_dicts:
+        return folder_query(db, FOLDER_RESPONSE_COLUMNS, FOLDER_SORT_COLUMNS.get(sort))
+    return db.query(models.Folder).options(*folder_load_options(depth, with_images)) # Use models.Folder
+
+def _folder_list_result(db: Session, rows, depth: int, fields: Optional[List[str]], as_dicts: bool) -> list:
+    if fields is not None:
+        return folder_dicts(db, rows, fields)
+    if as_dicts:
+        return folder_response_dicts(db, rows, depth)
+    return rows
+
+def get_subfolders(db: Session, folder_id: int, depth: int = 0, with_images: bool = True,
+                   limit: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None, sort: str = "id",
+                   fields: Optional[List[str]] = None, as_dicts: bool = False) -> Tuple[list, Optional[str]]:
+    """
+    Retrieves one page of the direct subfolders of a folder, with their own children loaded down to `depth` levels.
+    With `fields`, returns dicts holding only those fields instead and ignores depth and with_images.
+    With `as_dicts` (depth 0 or 1 only), returns FolderResponse-shaped dicts built from Core rows.
+    Returns (folders, next_cursor). Raises InvalidCursor for an unknown sort order or a bad cursor.
+    """
+    query = _folder_list_query(db, depth, with_images, sort, fields, as_dicts)
+    query = query.filter(models.Folder.parent_id == folder_id)
+    folders, next_cursor = paginate(query, models.Folder, FOLDER_SORT_COLUMNS, sort=sort, after=after, limit=limit)
+    return _folder_list_result(db, folders, depth, fields, as_dicts), next_cursor
+
 def get_root_folders(db: Session, skip: int = 0, limit: int = 100) -> List[models.Folder]:
     """
     Retrieves all root-level folders (folders with parent_id is NULL).
@@ -47,90 +135,118 @@ def get_root_folders(db: Session, skip: int = 0, limit: int = 100) -> List[model
     ).filter(models.Folder.parent_id == None).offset(skip).limit(limit).all() # Use models.Folder.parent_id
 
 
-def get_all_folders(db: Session, skip: int = 0, limit: int = 100) -> List[models.Folder]:
+def get_all_folders(db: Session, skip: int = 0, limit: int = DEFAULT_PAGE_SIZE, depth: int = 0, with_images: bool = True,
+                    after: Optional[str] = None, sort: str = "id", fields: Optional[List[str]] = None,
+                    as_dicts: bool = False) -> Tuple[list, Optional[str]]:
     """
-    Retrieves all folders in the database.
+    Retrieves one page of all folders in the database, with their children loaded down to `depth` levels.
+    With `fields`, returns dicts holding only those fields instead and ignores depth and with_images.
+    With `as_dicts` (depth 0 or 1 only), returns FolderResponse-shaped dicts built from Core rows.
+    Returns (folders, next_cursor). Raises InvalidCursor for an unknown sort order or a bad cursor.
     """
-    return db.query(models.Folder).offset(skip).limit(limit).all() # Use models.Folder
+    query = _folder_list_query(db, depth, with_images, sort, fields, as_dicts)
+    folders, next_cursor = paginate(query, models.Folder, FOLDER_SORT_COLUMNS, sort=sort, after=after, limit=limit, skip=skip)
+    return _folder_list_result(db, folders, depth, fields, as_dicts), next_cursor
+
+def get_folders_by_ids(db: Session, folder_ids: List[int], depth: int = 1, with_images: bool = True,
+                       fields: Optional[List[str]] = None, as_dicts: bool = False) -> Tuple[list, List[int]]:
+    """
+    Retrieves many folders by id with one query, plus one SELECT ... IN per relationship and level,
+    loaded and shaped like get_all_folders(). Returns (folders in the order of folder_ids, ids that do not exist).
+    """
+    query = _folder_list_query(db, depth, with_images, "id", fields, as_dicts)
+    folders, missing = order_by_ids(query.filter(models.Folder.id.in_(set(folder_ids))).all(), folder_ids)
+    return _folder_list_result(db, folders, depth, fields, as_dicts), missing
 
 def update_folder(db: Session, folder_id: int, folder: schemas.FolderUpdate) -> Optional[models.Folder]:
     """
     Updates an existing folder in the database.
+    Returns None if the folder does not exist or the new parent would create a cycle.
     """
     db_folder = db.query(models.Folder).filter(models.Folder.id == folder_id).first() # Use models.Folder
     if db_folder:
         update_data = folder.model_dump(exclude_unset=True)
+        if "parent_id" in update_data and update_data["parent_id"] != db_folder.parent_id:
+            # A parent change is a move, keep the ancestry index in step
+            new_parent_id = update_data["parent_id"]
+            if new_parent_id is not None and hierarchy.is_descendant(db, new_parent_id, folder_id):
+                return None
+            if not hierarchy.move_subtree(db, folder_id, new_parent_id):
+                return None
+            aggregates.subtree_moved(db, folder_id, db_folder.parent_id, new_parent_id)
+        old_parent_id = db_folder.parent_id
         for key, value in update_data.items():
             setattr(db_folder, key, value)
         db.add(db_folder)
+        if "tags" in update_data:
+            tags.set_tags(db, "folder", {folder_id: db_folder.tags})
+        changes.note_change(db, _folder_event("update", folder_id, old_parent_id, db_folder.parent_id))
         db.commit()
         db.refresh(db_folder)
     return db_folder
 
-def delete_folder(db: Session, folder_id: int) -> Optional[models.Folder]:
+DELETE_BATCH_SIZE = 500 # Folder ids per DELETE statement, well below SQLite's bound-parameter limit
+
+def _batches(ids: List[int], size: int = DELETE_BATCH_SIZE):
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+def delete_folder(db: Session, folder_id: int) -> Optional[dict]:
     """
     Deletes a folder and all its contents (subfolders, items, and images) recursively.
-    This relies on the 'ondelete="CASCADE"' and 'cascade="all, delete-orphan"'
-    settings in models.py relationships.
+    The subtree ids are collected with one range query on the ancestry index, then images,
+    items and folders are removed with set-based DELETEs in batches, without loading the ORM graph.
+    Returns {"folders": n, "items": n, "images": n} with the number of deleted rows,
+    or None if the folder does not exist.
     """
-    db_folder = db.query(models.Folder).filter(models.Folder.id == folder_id).first() # Use models.Folder
-    if db_folder:
-        db.delete(db_folder)
-        db.commit()
-    return db_folder
+    path = hierarchy.get_folder_path(db, folder_id)
+    if path is None:
+        return None
+
+    subtree = db.query(models.Folder.id, models.Folder.path).filter(
+        hierarchy.subtree_filter(models.Folder.path, path)
+    ).all()
+    # Deepest folders first, so no batch deletes a parent whose children are still referencing it
+    folder_ids = [row.id for row in sorted(subtree, key=lambda row: hierarchy.path_depth(row.path), reverse=True)]
+
+    aggregates.subtree_removed(db, folder_id)
+    deleted = {"folders": 0, "items": 0, "images": 0}
+    for batch in _batches(folder_ids):
+        item_ids = select(models.Item.id).where(models.Item.folder_id.in_(batch))
+        # Tombstones for the change log, recorded while the rows still exist
+        changes.log_changes(db, "image", select(models.Image.id).where(
+            or_(models.Image.item_id.in_(item_ids), models.Image.folder_id.in_(batch))
+        ), deleted=True)
+        changes.log_changes(db, "item", item_ids, deleted=True)
+        changes.log_changes(db, "folder", select(models.Folder.id).where(models.Folder.id.in_(batch)), deleted=True)
+        tags.remove_links(db, "item", item_ids)
+        tags.remove_links(db, "folder", select(models.Folder.id).where(models.Folder.id.in_(batch)))
+        deleted["images"] += db.execute(
+            delete(models.Image).where(models.Image.item_id.in_(item_ids)).execution_options(synchronize_session=False)
+        ).rowcount
+        deleted["images"] += db.execute(
+            delete(models.Image).where(models.Image.folder_id.in_(batch)).execution_options(synchronize_session=False)
+        ).rowcount
+        deleted["items"] += db.execute(
+            delete(models.Item).where(models.Item.folder_id.in_(batch)).execution_options(synchronize_session=False)
+        ).rowcount
+    for batch in _batches(folder_ids):
+        deleted["folders"] += db.execute(
+            delete(models.Folder).where(models.Folder.id.in_(batch)).execution_options(synchronize_session=False)
+        ).rowcount
+    ancestor_ids = hierarchy.ancestor_ids_from_path(path)
+    changes.note_change(db, changes.change_event("folder", "delete", folder_id, ancestor_ids[-1] if ancestor_ids else None))
+    db.commit()
+    return deleted
 
-def clone_folder(db: Session, folder_id: int, new_parent_id: Optional[int] = None) -> Optional[models.Folder]:
+def clone_folder(db: Session, folder_id: int, new_parent_id: Optional[int] = None) -> Optional[Tuple[models.Folder, dict]]:
     """
     Clones a folder, including all its subfolders, items, and images recursively.
+    The copy is made with set-based INSERT ... SELECT statements (see app/crud/clone.py).
+    Returns (cloned folder, counts of copied folders/items/images), or None if the folder
+    or the target parent does not exist.
     """
-    original_folder = get_folder(db, folder_id)
-    if not original_folder:
-        return None
-
-    # Helper function for recursive cloning
-    def _recursive_clone(original_f: models.Folder, parent_id: Optional[int]) -> models.Folder:
-        # Clone the folder itself
-        new_folder_data = {
-            "name": f"{original_f.name} (Cloned)",
-            "description": original_f.description,
-            "notes": original_f.notes,
-            "tags": original_f.tags,
-            "parent_id": parent_id if parent_id is not None else original_f.parent_id,
-        }
-        print(f"DEBUG: _recursive_clone - new_folder_data: {new_folder_data}")
-        print(f"DEBUG: _recursive_clone - parent_id received: {parent_id}")
-
-        new_folder = models.Folder(**new_folder_data)
-        db.add(new_folder)
-        db.flush() # Flush to get the new_folder.id before committing
-        print(f"DEBUG: _recursive_clone - new_folder created with ID: {new_folder.id}, parent_id: {new_folder.parent_id}")
-
-        # Clone items within this folder
-        from app.crud.item import clone_item
-        for original_item in original_f.items:
-            clone_item(db, original_item.id, new_folder.id)
-
-        # Clone images associated with this folder
-        for original_folder_image in original_f.images:
-            new_image_data = {
-                "filename": original_folder_image.filename,
-                "filepath": original_folder_image.filepath,
-                "description": original_folder_image.description,
-                "folder_id": new_folder.id,
-            }
-            db.add(models.Image(**new_image_data))
-
-        # Recursively clone subfolders
-        for original_subfolder in original_f.subfolders:
-            _recursive_clone(original_subfolder, new_folder.id)
-
-        return new_folder
-
-    # Start the recursive cloning process
-    cloned_folder = _recursive_clone(original_folder, new_parent_id)
-    db.commit()
-    db.refresh(cloned_folder)
-    return cloned_folder
+    return clone_subtree(db, folder_id, new_parent_id)
 
 def move_folder(db: Session, folder_id: int, new_parent_id: Optional[int]) -> Optional[models.Folder]:
     """
@@ -146,14 +262,15 @@ def move_folder(db: Session, folder_id: int, new_parent_id: Optional[int]) -> Op
     if new_parent_id == folder_id:
         return None
 
-    # Prevent moving a folder into one of its own subfolders
-    if new_parent_id is not None:
-        current_check_folder_id = new_parent_id
-        while current_check_folder_id is not None:
-            if current_check_folder_id == folder_id:
-                return None # Trying to move into a subfolder of itself
-            parent_of_check = db.query(models.Folder.parent_id).filter(models.Folder.id == current_check_folder_id).scalar() # Use models.Folder
-            current_check_folder_id = parent_of_check
+    # Prevent moving a folder into one of its own subfolders (one lookup on the ancestry index)
+    if new_parent_id is not None and hierarchy.is_descendant(db, new_parent_id, folder_id):
+        return None
+
+    # Rewrite the subtree's paths; fails if the target parent does not exist
+    if not hierarchy.move_subtree(db, folder_id, new_parent_id):
+        return None
+    aggregates.subtree_moved(db, folder_id, db_folder.parent_id, new_parent_id)
+    changes.note_change(db, _folder_event("move", folder_id, db_folder.parent_id, new_parent_id))
 
     db_folder.parent_id = new_parent_id
     db.add(db_folder)
@@ -161,28 +278,156 @@ def move_folder(db: Session, folder_id: int, new_parent_id: Optional[int]) -> Op
     db.refresh(db_folder)
     return db_folder
 
-# NEW: Function to calculate total quantity in a folder and its subfolders
-def calculate_folder_quantity(db: Session, folder_id: Optional[int]) -> float:
-    """Recursively calculates the total quantity of items within a folder and its children."""
-    total_quantity = 0.0
+def bulk_move_folders(db: Session, folder_ids: List[int], new_parent_id: Optional[int]) -> dict:
+    """
+    Moves many folders under the same parent (None for root folders) in a single transaction.
+    The folders and the target are validated with one query, and the cycle check reads the
+    target's ancestry from its path instead of walking each folder's subtree.
+    Returns {"succeeded": n, "failed": n, "results": [{"id", "status", "detail"}, ...]} in request order.
+    """
+    lookup_ids = set(folder_ids)
+    if new_parent_id is not None:
+        lookup_ids.add(new_parent_id)
+    rows = {
+        row.id: row for row in
+        db.query(models.Folder.id, models.Folder.parent_id, models.Folder.path).filter(models.Folder.id.in_(lookup_ids))
+    }
 
-    if folder_id is None:
-        # Include items with null folder_id (root level items)
-        root_items_quantity = db.query(func.sum(models.Item.quantity)).filter(models.Item.folder_id == None).scalar() # Use models.Item
-        total_quantity += root_items_quantity if root_items_quantity else 0.0
-
-        # Get root folders and calculate their quantities
-        root_folders = db.query(models.Folder).filter(models.Folder.parent_id == None).all() # Use models.Folder
-        for root_folder in root_folders:
-            total_quantity += calculate_folder_quantity(db, root_folder.id)
+    # Moving a folder under the target is a cycle iff the folder is the target or one of its ancestors
+    target_chain = set()
+    if new_parent_id is not None:
+        target = rows.get(new_parent_id)
+        if target is None:
+            return summarize_bulk_results([
+                {"id": folder_id, "status": "invalid_target", "detail": "Target folder not found"} for folder_id in folder_ids
+            ])
+        target_chain = set(hierarchy.ancestor_ids_from_path(target.path)) | {new_parent_id}
+
+    results = []
+    moved = []
+    for folder_id in folder_ids:
+        if folder_id not in rows:
+            results.append({"id": folder_id, "status": "not_found", "detail": "Folder not found"})
+        elif folder_id in target_chain:
+            results.append({"id": folder_id, "status": "cycle", "detail": "Cannot move a folder into itself or its subfolders"})
+        else:
+            results.append({"id": folder_id, "status": "ok", "detail": None})
+            if rows[folder_id].parent_id != new_parent_id and folder_id not in moved:
+                moved.append(folder_id)
+
+    # Paths are rewritten one subtree at a time, so a folder moved together with one of
+    # its ancestors still picks up the ancestor's new path first
+    for folder_id in moved:
+        aggregates.subtree_moved(db, folder_id, rows[folder_id].parent_id, new_parent_id)
+        hierarchy.move_subtree(db, folder_id, new_parent_id)
+    if moved:
+        db.execute(
+            update(models.Folder).where(models.Folder.id.in_(moved)).values(parent_id=new_parent_id)
+            .execution_options(synchronize_session=False)
+        )
+    changes.note_change(db, *(_folder_event("move", folder_id, rows[folder_id].parent_id, new_parent_id) for folder_id in moved))
+    db.commit()
+    return summarize_bulk_results(results)
+
+def get_folder_stats(db: Session, folder_id: int) -> Optional[schemas.FolderStatsResponse]:
+    """
+    Returns subtree rollups for a folder (total quantity, item count, subfolder count and max depth).
+    Counts come from the materialized counters; max depth is one range scan on the path index.
+    Returns None if the folder does not exist.
+    """
+    stats = aggregates.get_folder_stats(db, folder_id)
+    path = hierarchy.get_folder_path(db, folder_id)
+    if stats is None or path is None:
+        return None
+
+    depth = hierarchy.depth_expression(models.Folder.path)
+    deepest = db.query(func.max(depth)).filter(hierarchy.subtree_filter(models.Folder.path, path)).scalar()
+
+    return schemas.FolderStatsResponse(
+        folder_id=folder_id,
+        total_quantity=stats.quantity,
+        item_count=stats.item_count,
+        subfolder_count=stats.subfolder_count,
+        max_depth=deepest - hierarchy.path_depth(path),
+    )
+
+ROOT_FOLDER_NAME = "Root" # Name of the synthetic node standing for the inventory root
+
+_TREE_FOLDER_COLUMNS = ("id", "name", "description", "notes", "tags", "parent_id")
+_TREE_ITEM_COLUMNS = ("id", "name", "description", "quantity", "unit", "notes", "tags", "acquired_date", "folder_id")
+
+def get_folder_tree(db: Session, root_id: Optional[int] = None, max_depth: Optional[int] = None) -> Optional[dict]:
+    """
+    Loads a folder (or the whole inventory when root_id is None) with its nested subfolders and items.
+    Uses one flat query for folders and one for items, then assembles the nesting in memory in O(n).
+    Children are only filled in for folders less than `max_depth` levels below the root (all if None).
+    Returns None if root_id does not exist.
+    """
+    depth = hierarchy.depth_expression(models.Folder.path)
+    stats = models.FolderStats
+    root = aliased(models.Folder)
+
+    # Folders in the subtree down to max_depth, with their direct counts
+    folder_query = select(
+        *(getattr(models.Folder, c) for c in _TREE_FOLDER_COLUMNS),
+        func.coalesce(stats.direct_item_count, 0).label("item_count"),
+        func.coalesce(stats.direct_subfolder_count, 0).label("subfolder_count"),
+    ).outerjoin(stats, stats.folder_id == models.Folder.id).order_by(models.Folder.name)
+    # Folders whose children are expanded, i.e. less than max_depth levels below the root
+    expanded_ids = select(models.Folder.id)
+
+    if root_id is not None:
+        root_depth = hierarchy.depth_expression(root.path)
+        folder_query = folder_query.join(root, root.id == root_id).where(hierarchy.subtree_filter(models.Folder.path, root.path))
+        expanded_ids = expanded_ids.join(root, root.id == root_id).where(hierarchy.subtree_filter(models.Folder.path, root.path))
+        if max_depth is not None:
+            folder_query = folder_query.where(depth <= root_depth + max_depth)
+            expanded_ids = expanded_ids.where(depth < root_depth + max_depth)
+        item_filter = models.Item.folder_id.in_(expanded_ids)
     else:
-        # Get items directly in the folder
-        items_quantity = db.query(func.sum(models.Item.quantity)).filter(models.Item.folder_id == folder_id).scalar() # Use models.Item
-        total_quantity += items_quantity if items_quantity else 0.0
+        if max_depth is not None:
+            folder_query = folder_query.where(depth <= max_depth)
+            expanded_ids = expanded_ids.where(depth < max_depth)
+        item_filter = models.Item.folder_id.is_(None) | models.Item.folder_id.in_(expanded_ids)
 
-        # Get child folders and calculate their quantities
-        child_folders = db.query(models.Folder).filter(models.Folder.parent_id == folder_id).all() # Use models.Folder
-        for child_folder in child_folders:
-            total_quantity += calculate_folder_quantity(db, child_folder.id)
+    nodes = {
+        row.id: {**row._asdict(), "subfolders": [], "items": []}
+        for row in db.execute(folder_query)
+    }
+    if root_id is None:
+        tree = {"id": None, "name": ROOT_FOLDER_NAME, "parent_id": None, "subfolders": [], "items": []}
+    elif root_id in nodes:
+        tree = nodes[root_id]
+    else:
+        return None
+
+    for node in nodes.values():
+        if node["id"] == root_id:
+            continue
+        parent = tree if node["parent_id"] is None else nodes.get(node["parent_id"])
+        if parent is not None:
+            parent["subfolders"].append(node)
+
+    item_query = select(*(getattr(models.Item, c) for c in _TREE_ITEM_COLUMNS)).where(item_filter).order_by(models.Item.name)
+    for row in db.execute(item_query):
+        item = row._asdict()
+        parent = tree if item["folder_id"] is None else nodes.get(item["folder_id"])
+        if parent is not None:
+            parent["items"].append(item)
+
+    if root_id is None:
+        tree["item_count"] = len(tree["items"])
+        tree["subfolder_count"] = len(tree["subfolders"])
+    return tree
+
+def calculate_folder_quantity(db: Session, folder_id: Optional[int]) -> float:
+    """
+    Calculates the total quantity of items within a folder and its children.
+    With folder_id=None the whole inventory (including root level items) is summed.
+    """
+    if folder_id is None:
+        # Every item is either at the root level or somewhere below a root folder
+        return aggregates.get_totals(db).total_quantity
 
-    return total_quantity
\ No newline at end of file
+    stats = get_folder_stats(db, folder_id)
+    return stats.total_quantity if stats else 0.0
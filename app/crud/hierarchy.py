@@ -0,0 +1,203 @@
+# app/crud/hierarchy.py
+# Maintains and queries the materialized-path ancestry index of the folder hierarchy.
+#
+# Every folder stores its full ancestry in Folder.path as "/<root id>/.../<own id>/".
+# Because a folder's path is a prefix of all of its descendants' paths, subtree reads
+# become a single range scan on the path index, and ancestor lookups are a string split.
+
+from __future__ import annotations # MUST be the very first import
+
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import func, literal, select, update
+from typing import Dict, List, Optional
+
+# Import models from the top-level 'app' package
+from app import models
+
+PATH_SEPARATOR = "/"
+
+
+def child_path(parent_path: Optional[str], folder_id: int) -> str:
+    """
+    Returns the path of a folder given the path of its parent (None for root folders).
+    """
+    return f"{parent_path or PATH_SEPARATOR}{folder_id}{PATH_SEPARATOR}"
+
+def ancestor_ids_from_path(path: str) -> List[int]:
+    """
+    Returns the ids of all ancestors encoded in a path, root first, excluding the folder itself.
+    """
+    return [int(part) for part in path.strip(PATH_SEPARATOR).split(PATH_SEPARATOR)[:-1]]
+
+def path_upper_bound(path: str) -> str:
+    """
+    Returns the exclusive upper bound of the range of paths starting with `path`.
+    '0' is the character right after the '/' separator, so [path, upper) holds exactly the subtree.
+    """
+    return path[:-1] + "0"
+
+def subtree_filter(path_column, path):
+    """
+    Builds an index-friendly filter matching a folder and all of its descendants.
+    `path` may be a literal string or a SQL expression (e.g. another folder's path column).
+    """
+    if isinstance(path, str):
+        upper = path_upper_bound(path)
+    else:
+        upper = func.substr(path, 1, func.length(path) - 1).concat("0")
+    return (path_column >= path) & (path_column < upper)
+
+def depth_expression(path_column):
+    """
+    Builds a SQL expression for the depth of a folder from its path; root folders have depth 1.
+    """
+    return func.length(path_column) - func.length(func.replace(path_column, PATH_SEPARATOR, "")) - 1
+
+def path_depth(path: str) -> int:
+    """
+    Returns the depth encoded in a path, matching depth_expression().
+    """
+    return path.count(PATH_SEPARATOR) - 1
+
+def folder_name_paths():
+    """
+    Builds a recursive CTE of (id, name_path) for every folder reachable from a root folder,
+    where name_path joins the names of the folder's ancestors and its own name with "/".
+    Join it against a folder id column to resolve readable locations in the same query.
+    """
+    roots = select(models.Folder.id, models.Folder.name.label("name_path")).where(models.Folder.parent_id.is_(None))
+    names = roots.cte("folder_name_paths", recursive=True)
+    children = select(
+        models.Folder.id, names.c.name_path.concat(PATH_SEPARATOR).concat(models.Folder.name)
+    ).join(names, models.Folder.parent_id == names.c.id)
+    return names.union_all(children)
+
+def get_folder_path(db: Session, folder_id: int) -> Optional[str]:
+    """
+    Returns the stored path of a folder, or None if the folder does not exist.
+    """
+    return db.query(models.Folder.path).filter(models.Folder.id == folder_id).scalar()
+
+def assign_path(db: Session, db_folder: models.Folder, parent_path: Optional[str] = None) -> str:
+    """
+    Sets the path of a freshly flushed folder from its parent.
+    The parent's path is looked up unless the caller already knows it.
+    """
+    if parent_path is None and db_folder.parent_id is not None:
+        parent_path = get_folder_path(db, db_folder.parent_id)
+    db_folder.path = child_path(parent_path, db_folder.id)
+    return db_folder.path
+
+def get_ancestor_ids(db: Session, folder_id: int) -> Optional[List[int]]:
+    """
+    Returns the ids of all ancestors of a folder, root first.
+    Returns None if the folder does not exist.
+    """
+    path = get_folder_path(db, folder_id)
+    if path is None:
+        return None
+    return ancestor_ids_from_path(path)
+
+def get_ancestors(db: Session, folder_id: int) -> Optional[List[models.Folder]]:
+    """
+    Returns all ancestors of a folder as models, root first.
+    Returns None if the folder does not exist.
+    """
+    ancestor_ids = get_ancestor_ids(db, folder_id)
+    if ancestor_ids is None:
+        return None
+    if not ancestor_ids:
+        return []
+    by_id = {f.id: f for f in db.query(models.Folder).filter(models.Folder.id.in_(ancestor_ids)).all()}
+    return [by_id[i] for i in ancestor_ids if i in by_id]
+
+def get_descendant_ids(db: Session, folder_id: int, include_self: bool = False) -> List[int]:
+    """
+    Returns the ids of all folders below a folder with a single range query on the path index.
+    """
+    root = aliased(models.Folder)
+    query = db.query(models.Folder.id).join(root, root.id == folder_id).filter(
+        subtree_filter(models.Folder.path, root.path)
+    )
+    if not include_self:
+        query = query.filter(models.Folder.id != folder_id)
+    return [row[0] for row in query.all()]
+
+def is_descendant(db: Session, folder_id: int, ancestor_id: int) -> bool:
+    """
+    Returns True if `folder_id` is `ancestor_id` itself or lies anywhere below it.
+    """
+    marker = literal(f"{PATH_SEPARATOR}{ancestor_id}{PATH_SEPARATOR}")
+    return db.query(
+        select(models.Folder.id).where(
+            models.Folder.id == folder_id,
+            func.instr(models.Folder.path, marker) > 0,
+        ).exists()
+    ).scalar()
+
+def move_subtree(db: Session, folder_id: int, new_parent_id: Optional[int]) -> bool:
+    """
+    Rewrites the paths of a folder and all of its descendants after a re-parent,
+    using a single UPDATE over the subtree range. Does not change parent_id or commit.
+    Returns False if either folder does not exist.
+    """
+    old_path = get_folder_path(db, folder_id)
+    if old_path is None:
+        return False
+    parent_path = None
+    if new_parent_id is not None:
+        parent_path = get_folder_path(db, new_parent_id)
+        if parent_path is None:
+            return False
+    new_path = child_path(parent_path, folder_id)
+    if new_path != old_path:
+        db.execute(
+            update(models.Folder)
+            .where(subtree_filter(models.Folder.path, old_path))
+            .values(path=literal(new_path).concat(func.substr(models.Folder.path, len(old_path) + 1)))
+            .execution_options(synchronize_session=False)
+        )
+    return True
+
+def _compute_paths(parent_by_id: Dict[int, Optional[int]]) -> Dict[int, str]:
+    """
+    Computes the path of every folder reachable from a root folder, from (id, parent_id) pairs.
+    Folders whose parent is missing are treated as roots; folders caught in a cycle get no path.
+    """
+    children: Dict[Optional[int], List[int]] = {}
+    for folder_id, parent_id in parent_by_id.items():
+        if parent_id is not None and parent_id not in parent_by_id:
+            parent_id = None # Dangling parent reference, treat as a root folder
+        children.setdefault(parent_id, []).append(folder_id)
+
+    paths: Dict[int, str] = {}
+    stack = [(folder_id, None) for folder_id in children.get(None, [])]
+    while stack:
+        folder_id, parent_path = stack.pop()
+        paths[folder_id] = child_path(parent_path, folder_id)
+        stack.extend((child_id, paths[folder_id]) for child_id in children.get(folder_id, []))
+    return paths
+
+def check_paths(db: Session) -> List[int]:
+    """
+    Returns the ids of folders whose stored path does not match the parent_id chain.
+    """
+    rows = db.query(models.Folder.id, models.Folder.parent_id, models.Folder.path).all()
+    expected = _compute_paths({row.id: row.parent_id for row in rows})
+    return [row.id for row in rows if expected.get(row.id) != row.path]
+
+def rebuild_paths(db: Session) -> int:
+    """
+    Recomputes every folder path from the parent_id chain and fixes the ones that differ.
+    Used to build the index for existing databases. Commits and returns the number of fixed folders.
+    """
+    rows = db.query(models.Folder.id, models.Folder.parent_id, models.Folder.path).all()
+    expected = _compute_paths({row.id: row.parent_id for row in rows})
+    changed = [
+        {"id": row.id, "path": expected.get(row.id)}
+        for row in rows if expected.get(row.id) != row.path
+    ]
+    if changed:
+        db.execute(update(models.Folder), changed)
+    db.commit()
+    return len(changed)
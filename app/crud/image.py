@@ -4,10 +4,18 @@
 from __future__ import annotations # MUST be the very first import
 
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 # Import models and schemas from the top-level 'app' package
 from app import models, schemas
+from app.core.uploads import image_url
+from app.crud import blobs, changes
+from app.crud.batch import order_by_ids
+from app.crud.fields import images_by_owner
+from app.crud.pagination import DEFAULT_PAGE_SIZE, paginate
+
+def _image_event(op: str, db_image: models.Image) -> dict:
+    return changes.change_event("image", op, db_image.id, db_image.folder_id, item_id=db_image.item_id)
 
 def create_image(db: Session, image: schemas.ImageCreate) -> models.Image:
     """
@@ -15,26 +23,69 @@ def create_image(db: Session, image: schemas.ImageCreate) -> models.Image:
     """
     db_image = models.Image(**image.model_dump()) # Use models.Image
     db.add(db_image)
+    db.flush() # Flush to get the new id for the change event
+    changes.note_change(db, _image_event("create", db_image))
     db.commit()
     db.refresh(db_image)
     return db_image
 
+def create_stored_image(db: Session, sha256: str, path: str, size: int, filename: str, description: Optional[str] = None,
+                        item_id: Optional[int] = None, folder_id: Optional[int] = None) -> Tuple[models.Image, str]:
+    """
+    Records an image whose file is in the content-addressed store under `path` (or will be once
+    this commits), sharing the blob of an earlier file with the same content. If the item or
+    folder already has an image with this content, nothing is written and that image is returned.
+    Returns (image, path of the blob the file belongs at).
+    """
+    path = blobs.add_blob(db, sha256, path, size)
+    db_image = db.query(models.Image).filter(
+        models.Image.sha256 == sha256, models.Image.item_id == item_id, models.Image.folder_id == folder_id
+    ).order_by(models.Image.id).first()
+    if db_image is None:
+        db_image = models.Image(filename=filename, filepath=image_url(path), description=description,
+                                item_id=item_id, folder_id=folder_id, sha256=sha256, variants=blobs.blob_variants(db, sha256))
+        db.add(db_image)
+        db.flush() # Flush to get the new id for the change event
+        changes.note_change(db, _image_event("create", db_image))
+    db.commit()
+    db.refresh(db_image)
+    return db_image, path
+
 def get_image(db: Session, image_id: int) -> Optional[models.Image]:
     """
     Retrieves a single image by its ID.
     """
     return db.query(models.Image).filter(models.Image.id == image_id).first() # Use models.Image
 
-def get_images(db: Session, skip: int = 0, limit: int = 100, item_id: Optional[int] = None, folder_id: Optional[int] = None) -> List[models.Image]:
+IMAGE_SORT_COLUMNS = {"id": models.Image.id}
+
+def get_images(db: Session, limit: int = DEFAULT_PAGE_SIZE, item_id: Optional[int] = None, folder_id: Optional[int] = None,
+               after: Optional[str] = None, sort: str = "id", skip: int = 0) -> Tuple[List[models.Image], Optional[str]]:
     """
-    Retrieves a list of images, optionally filtered by item_id or folder_id.
+    Retrieves one page of images, optionally filtered by item_id or folder_id. Returns (images, next_cursor).
+    Raises InvalidCursor for an unknown sort order or a bad cursor.
     """
     query = db.query(models.Image) # Use models.Image
     if item_id is not None:
         query = query.filter(models.Image.item_id == item_id) # Use models.Image.item_id
     if folder_id is not None:
         query = query.filter(models.Image.folder_id == folder_id) # Use models.Image.folder_id
-    return query.offset(skip).limit(limit).all()
+    return paginate(query, models.Image, IMAGE_SORT_COLUMNS, sort=sort, after=after, limit=limit, skip=skip)
+
+def get_images_for_owners(db: Session, item_ids: Optional[List[int]] = None,
+                          folder_ids: Optional[List[int]] = None) -> Tuple[List[dict], List[int]]:
+    """
+    Retrieves the images of many items, or of many folders, with one query for the images and
+    one for the owners. Returns (ImageResponse-shaped dicts grouped in the order of the owner ids
+    and by image id within an owner, owner ids that do not exist).
+    """
+    if item_ids is not None:
+        owner, owner_ids, image_column, other_column = models.Item, item_ids, models.Image.item_id, models.Image.folder_id
+    else:
+        owner, owner_ids, image_column, other_column = models.Folder, folder_ids, models.Image.folder_id, models.Image.item_id
+    owners, missing = order_by_ids(db.query(owner.id).filter(owner.id.in_(set(owner_ids))).all(), owner_ids)
+    images = images_by_owner(db, image_column, other_column, [row.id for row in owners])
+    return [image for row in owners for image in images[row.id]], missing
 
 def update_image(db: Session, image_id: int, image: schemas.ImageUpdate) -> Optional[models.Image]:
     """
@@ -43,9 +94,12 @@ def update_image(db: Session, image_id: int, image: schemas.ImageUpdate) -> Opti
     db_image = db.query(models.Image).filter(models.Image.id == image_id).first() # Use models.Image
     if db_image:
         update_data = image.model_dump(exclude_unset=True)
+        if update_data.get("filepath", db_image.filepath) != db_image.filepath:
+            update_data.update(sha256=None, variants=None) # No longer the stored file
         for key, value in update_data.items():
             setattr(db_image, key, value)
         db.add(db_image)
+        changes.note_change(db, _image_event("update", db_image))
         db.commit()
         db.refresh(db_image)
     return db_image
@@ -57,5 +111,6 @@ def delete_image(db: Session, image_id: int) -> Optional[models.Image]:
     db_image = db.query(models.Image).filter(models.Image.id == image_id).first() # Use models.Image
     if db_image:
         db.delete(db_image)
+        changes.note_change(db, _image_event("delete", db_image))
         db.commit()
     return db_image
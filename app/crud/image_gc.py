@@ -0,0 +1,325 @@
+# app/crud/image_gc.py
+# Garbage collection of the image directory.
+#
+# Deleting images, items or folders only removes rows; the files stay. Two kinds of garbage
+# accumulate:
+# - Stored files no image uses any more. The blob triggers (see app/crud/blobs.py) set
+#   image_blobs.orphaned_at when the last image using a file goes away, so these are found
+#   with an indexed query, without listing any directory.
+# - Files no row knows about: temporary files of interrupted uploads, files of legacy images
+#   that were deleted, leftovers of failed writes. These can only be found by listing the
+#   directories of the store. Listing is incremental: each directory's modification time is
+#   recorded when it is listed, and a directory whose modification time has not changed since
+#   (no file was added or removed) is skipped unless unreferenced files were left in it for a
+#   later pass. Deleting or re-pointing an image that is not in the store only changes rows,
+#   so a trigger counts its file as pending in its directory's scan to have it listed again.
+#   Directories are listed oldest first within a budget of entries per pass.
+# Listing a directory also reports the images whose file is missing from it; those rows are
+# left unchanged.
+#
+# Files are only removed once they have been unreferenced for a grace period. A file is first
+# renamed to a TRASH_PREFIX name, then the rows are checked (or the blob row deleted) in a
+# transaction, and only then is the file unlinked, or renamed back if it is in use again. An
+# upload of the same content at the same time either commits first, and the file is kept, or
+# finds its name free and stores its own copy.
+
+from __future__ import annotations # MUST be the very first import
+
+import logging
+import os
+import re
+import time
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session
+from sqlalchemy import select, text
+from typing import Dict, List, Optional
+
+from app import models
+from app.core.thumbnails import VARIANT_SIZES, variant_name
+from app.core.uploads import IMAGE_DIR, IMAGE_URL_PREFIX, TEMP_PREFIX, image_url
+
+GC_GRACE = timedelta(hours=float(os.environ.get("IMAGE_GC_GRACE_HOURS", 24))) # Age before an unreferenced file is removed
+GC_INTERVAL = float(os.environ.get("IMAGE_GC_INTERVAL_SECONDS", 3600)) # Between background passes; 0 disables them
+GC_SCAN_BUDGET = 20000 # Directory entries listed per pass; directories past it are listed by the next pass
+GC_BLOB_BATCH = 1000 # Unused stored files removed per pass
+MAX_REPORTED_MISSING = 1000 # Images with a missing file listed in the report; all of them are counted
+TRASH_PREFIX = ".gc-" # Name prefix of files about to be removed
+TEMPORARY_SUFFIXES = (".migrating",) # Partial copies left by an interrupted migrate-images
+
+_SHARD = re.compile(r"[0-9a-f]{2}")
+
+# The image directory of an image URL: "" for the top level, the shard for "ab/..."
+_URL_NAME = f"substr(old.filepath, {len(IMAGE_URL_PREFIX) + 2})"
+_URL_DIRECTORY = f"CASE WHEN instr({_URL_NAME}, '/') = 0 THEN '' ELSE substr({_URL_NAME}, 1, instr({_URL_NAME}, '/') - 1) END"
+_IN_IMAGE_DIR = f"substr(old.filepath, 1, {len(IMAGE_URL_PREFIX) + 1}) = '{IMAGE_URL_PREFIX}/'"
+_MARK_PENDING = f"UPDATE image_directory_scans SET pending = pending + 1 WHERE directory = {_URL_DIRECTORY};"
+_TRIGGERS = [
+    f"CREATE TRIGGER IF NOT EXISTS images_gc_delete AFTER DELETE ON images "
+    f"WHEN old.sha256 IS NULL AND {_IN_IMAGE_DIR} BEGIN {_MARK_PENDING} END",
+    f"CREATE TRIGGER IF NOT EXISTS images_gc_update AFTER UPDATE OF filepath, sha256 ON images "
+    f"WHEN old.sha256 IS NULL AND {_IN_IMAGE_DIR} AND (new.filepath IS NOT old.filepath OR new.sha256 IS NOT NULL) "
+    f"BEGIN {_MARK_PENDING} END",
+]
+_STORED_NAME = re.compile(r"([0-9a-f]{64})(\.w\d+)?(?:\.[a-z0-9]{1,10})?") # A stored file or one of its variants
+
+
+def ensure_gc_triggers(connection):
+    """
+    Creates the triggers that have a directory listed again when a file outside the store loses its image.
+    """
+    for statement in _TRIGGERS:
+        connection.execute(text(statement))
+
+def _variant_paths(sha256: str) -> List[str]:
+    return [variant_name(sha256, size, file_format) for size in VARIANT_SIZES.values() for file_format in ("webp", "jpeg")]
+
+def _trash(path: str) -> Optional[str]:
+    """
+    Renames a file to its trash name. Returns that, or None if the file does not exist.
+    """
+    trash = os.path.join(os.path.dirname(path), TRASH_PREFIX + os.path.basename(path))
+    try:
+        os.rename(path, trash)
+    except FileNotFoundError:
+        return None
+    return trash
+
+def _restore(trash: str):
+    """
+    Renames a trashed file back, unless its name has been taken again in the meantime.
+    """
+    path = os.path.join(os.path.dirname(trash), os.path.basename(trash)[len(TRASH_PREFIX):])
+    try:
+        os.link(trash, path)
+    except FileExistsError:
+        pass # Stored again by an upload; a content-addressed name means the same bytes
+    os.unlink(trash)
+
+def _file_size(path: str) -> int:
+    try:
+        return os.stat(path).st_size
+    except FileNotFoundError:
+        return 0
+
+def _unlink(path: str) -> int:
+    """
+    Removes a file. Returns the number of bytes freed.
+    """
+    try:
+        size = os.stat(path).st_size
+        os.unlink(path)
+    except FileNotFoundError:
+        return 0
+    return size
+
+def _age_cutoff(grace: timedelta) -> float:
+    return time.time() - grace.total_seconds()
+
+def _changed_at(entry: os.DirEntry) -> float:
+    # Hard links made by migrate-images keep the old mtime but get a new ctime
+    stat = entry.stat()
+    return max(stat.st_mtime, stat.st_ctime)
+
+def _report_missing(db: Session, report: dict, condition):
+    rows = db.execute(select(models.Image.id, models.Image.filepath).where(condition).order_by(models.Image.id)).all()
+    report["missing_count"] += len(rows)
+    room = MAX_REPORTED_MISSING - len(report["missing"])
+    report["missing"].extend({"image_id": row.id, "filepath": row.filepath} for row in rows[:max(room, 0)])
+
+def _collect_unused_blobs(db: Session, directory: str, grace: timedelta, dry_run: bool, report: dict):
+    """
+    Removes stored files, with their variants, that no image has used for the grace period.
+    """
+    cutoff = (datetime.utcnow() - grace).strftime("%Y-%m-%d %H:%M:%S") # CURRENT_TIMESTAMP format, in UTC
+    blobs = db.execute(text(
+        "SELECT sha256, path, size FROM image_blobs WHERE ref_count = 0 AND orphaned_at < :cutoff "
+        "ORDER BY orphaned_at LIMIT :limit"
+    ), {"cutoff": cutoff, "limit": GC_BLOB_BATCH}).all()
+    for blob in blobs:
+        paths = [blob.path] + _variant_paths(blob.sha256)
+        if dry_run:
+            report["unused_files"] += 1
+            report["reclaimed_bytes"] += sum(_file_size(os.path.join(directory, path)) for path in paths)
+            continue
+        trashed = [trash for trash in (_trash(os.path.join(directory, path)) for path in paths) if trash]
+        deleted = db.execute(
+            text("DELETE FROM image_blobs WHERE sha256 = :sha256 AND ref_count = 0"), {"sha256": blob.sha256}
+        ).rowcount
+        db.commit()
+        for trash in trashed:
+            if deleted:
+                report["reclaimed_bytes"] += _unlink(trash)
+            else:
+                _restore(trash) # Used again since it was selected
+        report["unused_files"] += bool(deleted)
+
+def _remove_stray(db: Session, path: str, in_use, dry_run: bool, report: dict):
+    """
+    Removes an unreferenced file unless `in_use()` finds a row using it once it has been moved aside.
+    """
+    if dry_run:
+        report["stray_files"] += 1
+        report["reclaimed_bytes"] += _file_size(path)
+        return
+    trash = _trash(path)
+    if trash is None:
+        return
+    if in_use():
+        _restore(trash)
+    else:
+        report["stray_files"] += 1
+        report["reclaimed_bytes"] += _unlink(trash)
+
+def _scan_entry(db: Session, entry: os.DirEntry, cutoff: float, dry_run: bool, report: dict, in_use) -> int:
+    """
+    Handles a file that no row was found for. Returns 1 if it is left for a later pass.
+    """
+    if _changed_at(entry) > cutoff:
+        return 1
+    name = entry.name
+    if name.startswith(TRASH_PREFIX): # Left by an interrupted pass
+        original = name[len(TRASH_PREFIX):]
+        if in_use(original) and not os.path.exists(os.path.join(os.path.dirname(entry.path), original)):
+            if not dry_run:
+                _restore(entry.path)
+        else:
+            report["stray_files"] += 1
+            report["reclaimed_bytes"] += entry.stat().st_size if dry_run else _unlink(entry.path)
+    elif name.startswith(TEMP_PREFIX) or name.endswith(TEMPORARY_SUFFIXES):
+        report["stray_files"] += 1
+        report["reclaimed_bytes"] += entry.stat().st_size if dry_run else _unlink(entry.path)
+    else:
+        _remove_stray(db, entry.path, lambda: in_use(name), dry_run, report)
+    return 0
+
+def _scan_top_level(db: Session, directory: str, entries: List[os.DirEntry], cutoff: float, dry_run: bool, report: dict) -> int:
+    """
+    Checks the files directly in the image directory: legacy images stored under their upload
+    name and temporary files. Returns the number of unreferenced files left for a later pass.
+    """
+    referenced = set(db.execute(select(models.Image.filepath).where(
+        models.Image.sha256.is_(None), models.Image.filepath.like(IMAGE_URL_PREFIX + "/%")
+    )).scalars())
+
+    def in_use(name: str) -> bool:
+        url = image_url(name)
+        return db.execute(select(models.Image.id).where(models.Image.filepath == url).limit(1)).first() is not None
+
+    pending = 0
+    names = set()
+    for entry in entries:
+        names.add(entry.name)
+        if image_url(entry.name) not in referenced:
+            pending += _scan_entry(db, entry, cutoff, dry_run, report, in_use)
+    for url in sorted(referenced):
+        name = url[len(IMAGE_URL_PREFIX) + 1:]
+        if "/" not in name and name not in names:
+            _report_missing(db, report, models.Image.filepath == url)
+    return pending
+
+def _scan_shard(db: Session, directory: str, shard: str, entries: List[os.DirEntry], cutoff: float,
+                dry_run: bool, report: dict) -> int:
+    """
+    Checks the files of one shard directory of the content-addressed store against image_blobs.
+    Returns the number of unreferenced files left for a later pass.
+    """
+    # Hex digits sort before "g", so this is every hash starting with the shard name
+    blobs = {
+        blob.sha256: blob for blob in db.execute(
+            select(models.ImageBlob.sha256, models.ImageBlob.path, models.ImageBlob.ref_count)
+            .where(models.ImageBlob.sha256 >= shard, models.ImageBlob.sha256 < shard + "g")
+        )
+    }
+
+    def in_use(name: str) -> bool:
+        match = _STORED_NAME.fullmatch(name)
+        if match:
+            path = db.execute(select(models.ImageBlob.path).where(models.ImageBlob.sha256 == match.group(1))).scalar()
+            if path is not None and (match.group(2) or path == f"{shard}/{name}"):
+                return True
+        url = image_url(f"{shard}/{name}")
+        return db.execute(select(models.Image.id).where(models.Image.filepath == url).limit(1)).first() is not None
+
+    pending = 0
+    names = set()
+    for entry in entries:
+        names.add(entry.name)
+        match = _STORED_NAME.fullmatch(entry.name)
+        blob = blobs.get(match.group(1)) if match else None
+        # Variants belong to their blob; an original only under the blob's own name
+        if blob is not None and (match.group(2) or blob.path == f"{shard}/{entry.name}"):
+            continue # Also when unused: _collect_unused_blobs() removes those
+        pending += _scan_entry(db, entry, cutoff, dry_run, report, in_use)
+    for blob in blobs.values():
+        if blob.ref_count > 0 and os.path.basename(blob.path) not in names:
+            _report_missing(db, report, models.Image.sha256 == blob.sha256)
+    return pending
+
+def _directories(directory: str) -> List[str]:
+    # "" is the image directory itself
+    return [""] + sorted(entry.name for entry in os.scandir(directory) if entry.is_dir() and _SHARD.fullmatch(entry.name))
+
+def collect_garbage(db: Session, directory: str = IMAGE_DIR, grace: timedelta = GC_GRACE, dry_run: bool = False,
+                    full: bool = False, scan_budget: int = GC_SCAN_BUDGET) -> dict:
+    """
+    Runs one garbage collection pass: removes stored files no image has used for `grace`, then
+    lists the directories that may hold unreferenced files or be missing files, until
+    `scan_budget` entries have been listed. With `full`, every directory is listed regardless
+    of its recorded state. With `dry_run`, nothing is removed or recorded and the report counts
+    what would be. Commits.
+    """
+    report = {
+        "dry_run": dry_run, "unused_files": 0, "stray_files": 0, "reclaimed_bytes": 0, "pending_files": 0,
+        "directories_listed": 0, "directories_skipped": 0, "directories_left": 0, "missing_count": 0, "missing": [],
+    }
+    if not os.path.isdir(directory):
+        return report
+    _collect_unused_blobs(db, directory, grace, dry_run, report)
+
+    cutoff = _age_cutoff(grace)
+    scans: Dict[str, models.ImageDirectoryScan] = {scan.directory: scan for scan in db.query(models.ImageDirectoryScan)}
+    # Least recently listed first, so a budget smaller than the store still covers all of it in turn
+    directories = sorted(_directories(directory), key=lambda name: (name in scans, scans[name].scanned_at if name in scans else None))
+    listed = 0
+    for name in directories:
+        path = os.path.join(directory, name)
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            continue
+        scan = scans.get(name)
+        if not full and scan is not None and scan.mtime_ns == mtime_ns and scan.pending == 0:
+            report["directories_skipped"] += 1
+            continue
+        if listed >= scan_budget:
+            report["directories_left"] += 1
+            continue
+        entries = [entry for entry in os.scandir(path) if entry.is_file(follow_symlinks=False)]
+        listed += len(entries)
+        report["directories_listed"] += 1
+        if name:
+            pending = _scan_shard(db, directory, name, entries, cutoff, dry_run, report)
+        else:
+            pending = _scan_top_level(db, directory, entries, cutoff, dry_run, report)
+        report["pending_files"] += pending
+        if not dry_run:
+            # The time from before the listing, so files added during it get the directory listed again
+            if scan is None:
+                scan = models.ImageDirectoryScan(directory=name)
+                db.add(scan)
+            scan.mtime_ns, scan.pending, scan.scanned_at = mtime_ns, pending, datetime.utcnow()
+            db.commit()
+    db.rollback() # Ends the read transaction of a dry run
+    return report
+
+def log_report(report: dict):
+    """
+    Logs a summary of a background pass, if it found anything.
+    """
+    if report["unused_files"] or report["stray_files"]:
+        logging.info(
+            f"Image garbage collection removed {report['unused_files']} unused and {report['stray_files']} stray files, "
+            f"{report['reclaimed_bytes']} bytes."
+        )
+    if report["missing_count"]:
+        logging.warning(f"{report['missing_count']} images refer to a missing file, first: {report['missing'][:5]}")
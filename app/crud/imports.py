@@ -0,0 +1,302 @@
+# app/crud/imports.py
+# Bulk import of items from CSV or NDJSON files.
+#
+# Rows are validated and written in chunks: each chunk resolves its folders, looks up the
+# items it may update with one query, inserts new items with a single executemany INSERT,
+# updates matched items with a single bulk UPDATE by primary key, and is committed on its
+# own. A failure therefore only loses the chunk that was being written, and memory use does
+# not depend on the size of the file.
+#
+# An NDJSON file from GET /export can be imported into any database: its folder records are
+# re-created (or matched by name under the same parent, like folder paths) and the folder_id
+# of its items is mapped from the exported ids to the imported folders. A folder listed before
+# its parent waits until the parent has been read. Image records are skipped, since the files
+# are not part of the export.
+
+from __future__ import annotations # MUST be the very first import
+
+import csv
+import json
+import os
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+from sqlalchemy import insert, update
+
+# Import models and schemas from the top-level 'app' package
+from app import models, schemas
+from app.crud import aggregates, changes, hierarchy, tags
+from app.crud.item import existing_folder_ids
+
+IMPORT_FORMATS = ("csv", "ndjson")
+IMPORT_CHUNK_SIZE = 1000 # Rows written and committed per transaction
+MAX_REPORTED_REJECTIONS = 1000 # Rejected rows listed in the report; all of them are counted
+MAX_IMPORT_BYTES = int(os.environ.get("MAX_IMPORT_BYTES", 100 * 1024 * 1024)) # Largest file POST /import accepts
+FOLDER_RECORD = "folder" # "type" of the folder records of an export
+
+# A parsed row: (line number, record) or (line number, reason why it could not be parsed)
+ImportRecord = Tuple[int, Union[dict, str]]
+
+
+class InvalidImport(ValueError):
+    """
+    Raised when the format of an import cannot be determined.
+    """
+
+
+def import_format(requested: Optional[str], filename: Optional[str]) -> str:
+    """
+    Returns the requested format, or the one matching the file extension (.csv, .ndjson or .jsonl).
+    Raises InvalidImport if neither names a supported format.
+    """
+    if requested is None and filename:
+        extension = filename.rsplit(".", 1)[-1].lower()
+        requested = "ndjson" if extension == "jsonl" else extension
+    if requested not in IMPORT_FORMATS:
+        raise InvalidImport(f"Unknown import format, expected one of: {', '.join(IMPORT_FORMATS)}")
+    return requested
+
+def read_csv(stream) -> Iterator[ImportRecord]:
+    """
+    Yields the rows of a CSV file with a header line. Empty cells are treated as missing,
+    so they get the default value on new items and leave existing items unchanged.
+    """
+    reader = csv.DictReader(stream)
+    for record in reader:
+        yield reader.line_num, {
+            key.strip(): value for key, value in record.items() if key and value not in (None, "")
+        }
+
+def read_ndjson(stream) -> Iterator[ImportRecord]:
+    """
+    Yields one JSON object per non-empty line. Folder records of an /export keep their
+    "type"; other records with a "type" other than "item" (image records) are skipped.
+    """
+    for line_number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield line_number, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield line_number, "Expected a JSON object"
+            continue
+        record_type = record.pop("type", "item")
+        if record_type == "item":
+            yield line_number, record
+        elif record_type == FOLDER_RECORD:
+            yield line_number, {**record, "type": FOLDER_RECORD}
+
+def read_records(stream, file_format: str) -> Iterator[ImportRecord]:
+    """
+    Parses a text stream in one of IMPORT_FORMATS.
+    """
+    return read_csv(stream) if file_format == "csv" else read_ndjson(stream)
+
+def _validation_detail(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in e['loc'])}: {e['msg']}" for e in error.errors())
+
+def _load_folder_ids(db: Session) -> Dict[Tuple[Optional[int], str], int]:
+    """
+    Returns {(parent_id, name): folder id} for all folders; the oldest folder wins for duplicate names.
+    """
+    rows = db.query(models.Folder.id, models.Folder.parent_id, models.Folder.name).order_by(models.Folder.id.desc())
+    return {(row.parent_id, row.name): row.id for row in rows}
+
+def _folder_for(db: Session, folder_ids: dict, parent_id: Optional[int], name: str, report: dict, events: list,
+                folder: Optional[schemas.FolderCreate] = None) -> int:
+    """
+    Returns the id of the folder named `name` under `parent_id`, creating it from `folder`
+    (or with just the name) if there is none, and adding its change event to `events`.
+    """
+    folder_id = folder_ids.get((parent_id, name))
+    if folder_id is None:
+        values = (folder or schemas.FolderCreate(name=name)).model_dump()
+        values["parent_id"] = parent_id
+        db_folder = models.Folder(**values)
+        db.add(db_folder)
+        db.flush() # Flush to get the new id for the ancestry path
+        hierarchy.assign_path(db, db_folder)
+        db.flush() # The counters below and the folder's children look the path up in the database
+        aggregates.folder_added(db, db_folder.id, parent_id)
+        if db_folder.tags:
+            tags.set_tags(db, "folder", {db_folder.id: db_folder.tags})
+        folder_id = folder_ids[(parent_id, name)] = db_folder.id
+        events.append(changes.change_event("folder", "create", db_folder.id, parent_id))
+        report["folders_created"] += 1
+    return folder_id
+
+def _resolve_folder(db: Session, folder_ids: dict, folder_path: Optional[str], report: dict, events: list) -> Optional[int]:
+    """
+    Returns the id of the folder at `folder_path` (None for the root level), creating missing folders
+    and adding their change events to `events`.
+    Raises ValidationError for folder names that a folder could not be created with.
+    """
+    parent_id = None
+    for name in (part.strip() for part in (folder_path or "").split(hierarchy.PATH_SEPARATOR)):
+        if name:
+            parent_id = _folder_for(db, folder_ids, parent_id, name, report, events)
+    return parent_id
+
+def _import_folders(db: Session, line: int, record: dict, folder_ids: dict, exported: dict, report: dict, events: list):
+    """
+    Imports a folder record of an export, and then the folders that were waiting for it as their parent.
+    `exported` holds {"seen": whether the file has folder records, "ids": {exported id: folder id},
+    "waiting": {exported parent id: [(line, record)]}}.
+    """
+    pending = [(line, record)]
+    while pending:
+        line, record = pending.pop()
+        try:
+            folder = schemas.FolderCreate.model_validate(record)
+        except ValidationError as e:
+            _reject(report, line, _validation_detail(e))
+            continue
+        exported_id = record.get("id")
+        if not isinstance(exported_id, int) or isinstance(exported_id, bool):
+            _reject(report, line, "id: Folder records need the exported folder id")
+            continue
+        if folder.parent_id is not None and folder.parent_id not in exported["ids"]:
+            exported["waiting"].setdefault(folder.parent_id, []).append((line, record))
+            continue
+        parent_id = exported["ids"].get(folder.parent_id)
+        exported["ids"][exported_id] = _folder_for(db, folder_ids, parent_id, folder.name, report, events, folder)
+        pending.extend(exported["waiting"].pop(exported_id, []))
+
+def _reject(report: dict, line: int, detail: str):
+    report["rejected"] += 1
+    if len(report["rejections"]) < MAX_REPORTED_REJECTIONS:
+        report["rejections"].append({"line": line, "detail": detail})
+
+def _existing_items(db: Session, rows: list, key: Optional[str]) -> Dict[object, tuple]:
+    """
+    Returns {key: (id, folder_id, quantity)} of the existing items the rows of a chunk may update.
+    """
+    columns = (models.Item.id, models.Item.folder_id, models.Item.quantity)
+    if key == "id":
+        ids = {row.id for _, row, _ in rows if row.id is not None}
+        if not ids:
+            return {}
+        return {item.id: tuple(item) for item in db.query(*columns).filter(models.Item.id.in_(ids))}
+    if key == "name":
+        names = {row.name for _, row, _ in rows}
+        items = db.query(*columns, models.Item.name).filter(models.Item.name.in_(names)).order_by(models.Item.id.desc())
+        # The oldest item wins if a folder holds several items with the same name
+        return {(item.folder_id, item.name): tuple(item)[:3] for item in items}
+    return {}
+
+def _import_chunk(db: Session, chunk: List[ImportRecord], key: Optional[str], folder_ids: dict, exported: dict,
+                  report: dict) -> List[dict]:
+    """
+    Writes one chunk of records. Returns the change events of the written folders and items.
+    """
+    rows = [] # (line, row, folder id)
+    events = []
+    for line, record in chunk:
+        if isinstance(record, str):
+            _reject(report, line, record)
+            continue
+        if record.get("type") == FOLDER_RECORD:
+            exported["seen"] = True
+            _import_folders(db, line, record, folder_ids, exported, report, events)
+            continue
+        try:
+            row = schemas.ImportRow.model_validate(record)
+            if "folder_path" in row.model_fields_set:
+                folder_id = _resolve_folder(db, folder_ids, row.folder_path, report, events)
+            else:
+                folder_id = row.folder_id
+        except ValidationError as e:
+            _reject(report, line, _validation_detail(e))
+            continue
+        if exported["seen"] and "folder_path" not in row.model_fields_set and folder_id is not None:
+            # The file has its own folders, so folder_id is an exported id
+            if folder_id not in exported["ids"]:
+                _reject(report, line, "folder_id: Folder not found in the imported file")
+                continue
+            folder_id = exported["ids"][folder_id]
+        rows.append((line, row, folder_id))
+
+    valid_folder_ids = existing_folder_ids(db, [folder_id for _, _, folder_id in rows])
+    existing = _existing_items(db, rows, key)
+    inserts: Dict[object, dict] = {} # New items by key (by line number when not upserting)
+    updates: Dict[int, dict] = {} # Changed columns of existing items by id
+    for line, row, folder_id in rows:
+        if folder_id is not None and folder_id not in valid_folder_ids:
+            _reject(report, line, "folder_id: Folder not found")
+            continue
+        located = bool({"folder_path", "folder_id"} & row.model_fields_set)
+        changed = row.model_dump(exclude_unset=True, exclude={"id", "folder_path", "folder_id"})
+        if located:
+            changed["folder_id"] = folder_id
+        match = {"id": row.id, "name": (folder_id, row.name)}.get(key)
+        if match is not None and match in existing:
+            updates.setdefault(existing[match][0], {}).update(changed)
+            report["updated"] += 1
+        elif match is not None and match in inserts:
+            inserts[match].update(changed) # Repeated key within the chunk, update the pending insert
+            report["updated"] += 1
+        else:
+            values = row.model_dump(exclude={"folder_path"})
+            values["folder_id"] = folder_id
+            if key != "id":
+                values["id"] = None # Ids from the file are only kept when upserting by id
+            inserts[match if match is not None else ("line", line)] = values
+            report["created"] += 1
+
+    if inserts:
+        # One executemany INSERT; a NULL id lets SQLite assign the next rowid
+        created = db.execute(
+            insert(models.Item).returning(models.Item.id, models.Item.folder_id, models.Item.tags), list(inserts.values())
+        ).all()
+        tags.set_tags(db, "item", {item.id: item.tags for item in created if item.tags})
+        events.extend(changes.change_event("item", "create", item.id, item.folder_id) for item in created)
+        aggregates.items_added(db, [(values["folder_id"], values["quantity"]) for values in inserts.values()])
+    if updates:
+        by_id = {item[0]: item for item in existing.values()}
+        aggregates.items_changed(db, [
+            (by_id[item_id][1], by_id[item_id][2], data.get("folder_id", by_id[item_id][1]), data.get("quantity", by_id[item_id][2]))
+            for item_id, data in updates.items()
+        ])
+        updated_rows = [{"id": item_id, **data} for item_id, data in updates.items() if data]
+        if updated_rows:
+            db.execute(update(models.Item), updated_rows)
+            tags.set_tags(db, "item", {row["id"]: row["tags"] for row in updated_rows if "tags" in row})
+            events.extend(
+                changes.change_event("item", "update", row["id"], row.get("folder_id", by_id[row["id"]][1])) for row in updated_rows
+            )
+    return events
+
+def import_items(db: Session, records: Iterable[ImportRecord], key: Optional[str] = None,
+                 dry_run: bool = False, chunk_size: int = IMPORT_CHUNK_SIZE) -> dict:
+    """
+    Imports items from parsed records (see read_records()), creating the folders named by their
+    folder paths and the folders of an export's folder records. With `key`, rows matching an existing item by "id" or by "name" within the same
+    folder update that item instead of creating a new one. Each chunk is committed separately;
+    with `dry_run` everything is written inside one transaction and rolled back at the end.
+    Returns the ImportReport fields.
+    """
+    report = {"dry_run": dry_run, "created": 0, "updated": 0, "rejected": 0, "folders_created": 0, "rejections": []}
+    folder_ids = _load_folder_ids(db)
+    exported = {"seen": False, "ids": {}, "waiting": {}}
+    records = iter(records)
+    try:
+        while True:
+            chunk = list(islice(records, chunk_size))
+            if not chunk:
+                break
+            events = _import_chunk(db, chunk, key, folder_ids, exported, report)
+            if not dry_run:
+                # Logged for GET /changes, but too many rows to describe one by one on the event stream
+                changes.note_change(db, *events, reload=True)
+                db.commit()
+        for line, _ in sorted(record for waiting in exported["waiting"].values() for record in waiting):
+            _reject(report, line, "parent_id: Folder not found in the imported file")
+    finally:
+        if dry_run:
+            db.rollback()
+    return report
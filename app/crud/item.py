@@ -3,11 +3,24 @@
 
 from __future__ import annotations # MUST be the very first import
 
-from sqlalchemy.orm import Session, joinedload
-from typing import List, Optional
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy import select, update
+from typing import Dict, List, Optional, Tuple
 
 # Import models and schemas from the top-level 'app' package
 from app import models, schemas
+from app.crud import aggregates, changes, tags
+from app.crud.batch import order_by_ids
+from app.crud.fields import item_dicts, item_query
+from app.crud.pagination import DEFAULT_PAGE_SIZE, paginate
+
+def _item_event(op: str, item_id: int, old_folder_id: Optional[int], new_folder_id: Optional[int]) -> dict:
+    """
+    Builds the change event of an item write, naming the previous folder if the item moved.
+    """
+    if old_folder_id == new_folder_id:
+        return changes.change_event("item", op, item_id, new_folder_id)
+    return changes.change_event("item", op, item_id, new_folder_id, from_folder_id=old_folder_id)
 
 def create_item(db: Session, item: schemas.ItemCreate) -> models.Item: # Direct type hint
     """
@@ -17,6 +30,11 @@ def create_item(db: Session, item: schemas.ItemCreate) -> models.Item: # Direct
     
     db_item = models.Item(**item_data) # Use models.Item
     db.add(db_item)
+    db.flush() # Flush to get the new id for the change event
+    aggregates.item_added(db, db_item.folder_id, db_item.quantity)
+    if db_item.tags:
+        tags.set_tags(db, "item", {db_item.id: db_item.tags})
+    changes.note_change(db, changes.change_event("item", "create", db_item.id, db_item.folder_id))
     db.commit()
     db.refresh(db_item)
     return db_item
@@ -30,17 +48,59 @@ def get_item(db: Session, item_id: int) -> Optional[models.Item]:
         joinedload(models.Item.images) # Use models.Item.images
     ).filter(models.Item.id == item_id).first() # Use models.Item.id
 
-def get_items(db: Session, skip: int = 0, limit: int = 100, folder_id: Optional[int] = None) -> List[models.Item]:
+def get_item_fields(db: Session, item_id: int, fields: List[str]) -> Optional[dict]:
     """
-    Retrieves a list of items, optionally filtered by folder_id.
-    Eagerly loads images for each item.
+    Retrieves only the requested fields of a single item (see app/crud/fields.py).
     """
-    query = db.query(models.Item).options( # Use models.Item
-        joinedload(models.Item.images) # Use models.Item.images
-    )
+    rows = item_query(db, fields).filter(models.Item.id == item_id).all()
+    return item_dicts(db, rows, fields)[0] if rows else None
+
+# Sort orders accepted by the item list endpoints, each backed by a (column, id) index
+ITEM_SORT_COLUMNS = {
+    "id": models.Item.id,
+    "name": models.Item.name,
+    "acquired_date": models.Item.acquired_date,
+    "quantity": models.Item.quantity,
+}
+
+def get_items(db: Session, limit: int = DEFAULT_PAGE_SIZE, folder_id: Optional[int] = None,
+              after: Optional[str] = None, sort: str = "id", fields: Optional[List[str]] = None,
+              tag_names: Optional[List[str]] = None) -> Tuple[list, Optional[str]]:
+    """
+    Retrieves one page of items, optionally filtered by folder_id and to items carrying every tag
+    in `tag_names`, ordered by `sort` and id.
+    Eagerly loads images for each item; with `fields`, returns dicts holding only those fields instead.
+    Returns (items, next_cursor). Raises InvalidCursor for an unknown sort order or a bad cursor.
+    """
+    if fields is not None:
+        query = item_query(db, fields, ITEM_SORT_COLUMNS.get(sort))
+    else:
+        query = db.query(models.Item).options( # Use models.Item
+            selectinload(models.Item.images) # One extra SELECT ... IN per page, keeps LIMIT on the items themselves
+        )
     if folder_id is not None:
         query = query.filter(models.Item.folder_id == folder_id) # Use models.Item.folder_id
-    return query.offset(skip).limit(limit).all()
+    if tag_names:
+        query = query.filter(tags.tagged_with("item", tag_names))
+    items, next_cursor = paginate(query, models.Item, ITEM_SORT_COLUMNS, sort=sort, after=after, limit=limit)
+    if fields is not None:
+        items = item_dicts(db, items, fields)
+    return items, next_cursor
+
+def get_items_by_ids(db: Session, item_ids: List[int], fields: Optional[List[str]] = None) -> Tuple[list, List[int]]:
+    """
+    Retrieves many items by id with one query, plus one SELECT ... IN for their images.
+    With `fields`, returns dicts holding only those fields instead.
+    Returns (items in the order of item_ids, ids that do not exist).
+    """
+    if fields is not None:
+        query = item_query(db, fields)
+    else:
+        query = db.query(models.Item).options(selectinload(models.Item.images))
+    items, missing = order_by_ids(query.filter(models.Item.id.in_(set(item_ids))).all(), item_ids)
+    if fields is not None:
+        items = item_dicts(db, items, fields)
+    return items, missing
 
 def update_item(db: Session, item_id: int, item: schemas.ItemUpdate) -> Optional[models.Item]: # Direct type hint
     """
@@ -48,10 +108,15 @@ def update_item(db: Session, item_id: int, item: schemas.ItemUpdate) -> Optional
     """
     db_item = db.query(models.Item).filter(models.Item.id == item_id).first() # Use models.Item
     if db_item:
+        old_folder_id, old_quantity = db_item.folder_id, db_item.quantity
         update_data = item.model_dump(exclude_unset=True)
         for key, value in update_data.items():
             setattr(db_item, key, value)
         db.add(db_item)
+        aggregates.item_changed(db, old_folder_id, old_quantity, db_item.folder_id, db_item.quantity)
+        if "tags" in update_data:
+            tags.set_tags(db, "item", {db_item.id: db_item.tags})
+        changes.note_change(db, _item_event("update", db_item.id, old_folder_id, db_item.folder_id))
         db.commit()
         db.refresh(db_item)
     return db_item
@@ -63,7 +128,13 @@ def delete_item(db: Session, item_id: int) -> Optional[models.Item]:
     """
     db_item = db.query(models.Item).filter(models.Item.id == item_id).first() # Use models.Item
     if db_item:
+        aggregates.item_removed(db, db_item.folder_id, db_item.quantity)
+        changes.log_changes(db, "image", select(models.Image.id).where(
+            models.Image.item_id == db_item.id, models.Image.folder_id.is_(None)
+        ), deleted=True)
+        tags.set_tags(db, "item", {db_item.id: None})
         db.delete(db_item)
+        changes.note_change(db, changes.change_event("item", "delete", db_item.id, db_item.folder_id))
         db.commit()
     return db_item
 
@@ -90,6 +161,9 @@ def clone_item(db: Session, item_id: int, new_folder_id: Optional[int] = None) -
     new_item = models.Item(**new_item_data)
     db.add(new_item)
     db.flush()
+    aggregates.item_added(db, new_item.folder_id, new_item.quantity)
+    if new_item.tags:
+        tags.set_tags(db, "item", {new_item.id: new_item.tags})
 
     # Clone associated images
     for original_image in original_item.images:
@@ -97,10 +171,15 @@ def clone_item(db: Session, item_id: int, new_folder_id: Optional[int] = None) -
             "filename": original_image.filename,
             "filepath": original_image.filepath,
             "description": original_image.description,
+            "sha256": original_image.sha256, # The copy shares the stored file
+            "variants": original_image.variants,
             "item_id": new_item.id,
         }
         db.add(models.Image(**new_image_data))
+    db.flush()
+    changes.log_changes(db, "image", select(models.Image.id).where(models.Image.item_id == new_item.id))
 
+    changes.note_change(db, changes.change_event("item", "create", new_item.id, new_item.folder_id))
     return new_item
 
 def move_item(db: Session, item_id: int, new_folder_id: Optional[int]) -> Optional[models.Item]:
@@ -121,8 +200,106 @@ def move_item(db: Session, item_id: int, new_folder_id: Optional[int]) -> Option
         if not target_folder:
             return None # Target folder does not exist
     
+    aggregates.item_changed(db, db_item.folder_id, db_item.quantity, new_folder_id, db_item.quantity)
+    changes.note_change(db, _item_event("move", db_item.id, db_item.folder_id, new_folder_id))
     db_item.folder_id = new_folder_id
     db.add(db_item)
     db.commit()
     db.refresh(db_item)
     return db_item
+
+def summarize_bulk_results(results: List[dict]) -> dict:
+    """
+    Wraps per-id results of a bulk operation with succeeded/failed counts.
+    """
+    succeeded = sum(1 for result in results if result["status"] == "ok")
+    return {"succeeded": succeeded, "failed": len(results) - succeeded, "results": results}
+
+def existing_folder_ids(db: Session, folder_ids) -> set:
+    """
+    Returns which of the given folder ids exist, with a single query.
+    """
+    folder_ids = {folder_id for folder_id in folder_ids if folder_id is not None}
+    if not folder_ids:
+        return set()
+    return {row[0] for row in db.query(models.Folder.id).filter(models.Folder.id.in_(folder_ids))}
+
+def bulk_move_items(db: Session, item_ids: List[int], new_folder_id: Optional[int]) -> dict:
+    """
+    Moves many items to the same folder (None for the root level) in a single transaction.
+    The target and all items are validated with one query each, and the items are moved with one UPDATE.
+    Returns {"succeeded": n, "failed": n, "results": [{"id", "status", "detail"}, ...]} in request order.
+    """
+    if new_folder_id is not None and not existing_folder_ids(db, [new_folder_id]):
+        return summarize_bulk_results([
+            {"id": item_id, "status": "invalid_target", "detail": "Target folder not found"} for item_id in item_ids
+        ])
+
+    rows = {
+        row.id: row for row in
+        db.query(models.Item.id, models.Item.folder_id, models.Item.quantity).filter(models.Item.id.in_(set(item_ids)))
+    }
+    results = []
+    for item_id in item_ids:
+        if item_id in rows:
+            results.append({"id": item_id, "status": "ok", "detail": None})
+        else:
+            results.append({"id": item_id, "status": "not_found", "detail": "Item not found"})
+
+    if rows:
+        aggregates.items_changed(db, [
+            (row.folder_id, row.quantity, new_folder_id, row.quantity) for row in rows.values()
+        ])
+        db.execute(
+            update(models.Item).where(models.Item.id.in_(rows.keys())).values(folder_id=new_folder_id)
+            .execution_options(synchronize_session=False)
+        )
+    changes.note_change(db, *(_item_event("move", row.id, row.folder_id, new_folder_id) for row in rows.values()))
+    db.commit()
+    return summarize_bulk_results(results)
+
+def bulk_update_items(db: Session, patches: List[schemas.ItemPatch]) -> dict:
+    """
+    Applies partial updates to many items in a single transaction. Only the fields set in each
+    patch are changed; several patches for the same item are applied in order.
+    Items and target folders are validated with one query each before anything is written.
+    Returns {"succeeded": n, "failed": n, "results": [...]} with one result per patch, in request order.
+    """
+    rows = {
+        row.id: row for row in
+        db.query(models.Item.id, models.Item.folder_id, models.Item.quantity)
+        .filter(models.Item.id.in_({patch.id for patch in patches}))
+    }
+    patch_data = [patch.model_dump(exclude_unset=True, exclude={"id"}) for patch in patches]
+    valid_folder_ids = existing_folder_ids(db, [data.get("folder_id") for data in patch_data])
+
+    results = []
+    merged: Dict[int, dict] = {}
+    for patch, data in zip(patches, patch_data):
+        if patch.id not in rows:
+            results.append({"id": patch.id, "status": "not_found", "detail": "Item not found"})
+        elif data.get("folder_id") is not None and data["folder_id"] not in valid_folder_ids:
+            results.append({"id": patch.id, "status": "invalid_target", "detail": "Target folder not found"})
+        else:
+            merged.setdefault(patch.id, {}).update(data)
+            results.append({"id": patch.id, "status": "ok", "detail": None})
+
+    counter_changes = []
+    for item_id, data in merged.items():
+        row = rows[item_id]
+        counter_changes.append((
+            row.folder_id, row.quantity,
+            data.get("folder_id", row.folder_id), data.get("quantity", row.quantity),
+        ))
+    aggregates.items_changed(db, counter_changes)
+    # Bulk UPDATE by primary key; SQLAlchemy groups patches that set the same columns into one executemany
+    updates = [{"id": item_id, **data} for item_id, data in merged.items() if data]
+    if updates:
+        db.execute(update(models.Item), updates)
+    tags.set_tags(db, "item", {item_id: data["tags"] for item_id, data in merged.items() if "tags" in data})
+    changes.note_change(db, *(
+        _item_event("update", item_id, rows[item_id].folder_id, data.get("folder_id", rows[item_id].folder_id))
+        for item_id, data in merged.items()
+    ))
+    db.commit()
+    return summarize_bulk_results(results)
@@ -0,0 +1,89 @@
+# app/crud/pagination.py
+# Keyset (cursor) pagination shared by the list endpoints.
+#
+# A page is ordered by (sort column, id) and the next page starts strictly after the last
+# row of the previous one, so every page is a range scan on a composite index instead of
+# an OFFSET that has to skip all earlier rows. The cursor handed to clients is an opaque,
+# URL-safe encoding of the sort key and the (value, id) of the last row.
+
+from __future__ import annotations # MUST be the very first import
+
+import base64
+import json
+from datetime import date
+from typing import Any, List, Optional, Tuple
+
+from sqlalchemy import Date, and_, or_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor" # Response header carrying the cursor of the next page
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+class InvalidCursor(ValueError):
+    """
+    Raised when a cursor cannot be decoded or was issued for a different sort order.
+    """
+
+
+def encode_cursor(sort: str, value: Any, last_id: int) -> str:
+    if isinstance(value, date):
+        value = value.isoformat()
+    raw = json.dumps([sort, value, last_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort: str, column) -> Tuple[Any, int]:
+    """
+    Returns the (value, id) of the last row of the previous page.
+    Raises InvalidCursor if the cursor is malformed or belongs to another sort order.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort, value, last_id = json.loads(raw)
+    except (ValueError, TypeError):
+        raise InvalidCursor("Malformed cursor")
+    if cursor_sort != sort or not isinstance(last_id, int):
+        raise InvalidCursor("Cursor does not match the requested sort order")
+    if value is not None and isinstance(column.type, Date):
+        try:
+            value = date.fromisoformat(value)
+        except (TypeError, ValueError):
+            raise InvalidCursor("Malformed cursor")
+    return value, last_id
+
+def _after(column, id_column, value, last_id: int):
+    """
+    Builds the filter for rows strictly after (value, last_id) in ascending (column, id) order.
+    SQLite sorts NULLs first, so a NULL value is followed by the remaining NULLs and then every non-NULL row.
+    """
+    if value is None:
+        return or_(and_(column.is_(None), id_column > last_id), column.isnot(None))
+    return or_(column > value, and_(column == value, id_column > last_id))
+
+def paginate(query, model, sort_columns: dict, sort: str = "id", after: Optional[str] = None,
+             limit: int = DEFAULT_PAGE_SIZE, skip: int = 0) -> Tuple[List, Optional[str]]:
+    """
+    Applies keyset pagination to `query` over `model`, ordered by sort_columns[sort] and then id.
+    `skip` is only kept for clients of the old OFFSET paging and is applied after the cursor.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    Raises InvalidCursor for an unknown sort key or a bad cursor.
+    """
+    if sort not in sort_columns:
+        raise InvalidCursor(f"Unknown sort order '{sort}', expected one of: {', '.join(sort_columns)}")
+    column = sort_columns[sort]
+    id_column = model.id
+    if after:
+        value, last_id = decode_cursor(after, sort, column)
+        query = query.filter(_after(column, id_column, value, last_id))
+    order = (id_column,) if column is id_column else (column, id_column)
+    query = query.order_by(*order)
+    if skip:
+        query = query.offset(skip)
+
+    # One extra row tells whether there is a next page without a COUNT query
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(sort, getattr(last, column.key), last.id)
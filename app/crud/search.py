@@ -0,0 +1,237 @@
+# app/crud/search.py
+# Full-text search over item and folder names, descriptions, notes and tags (SQLite FTS5).
+#
+# items_fts and folders_fts are external-content FTS5 tables: they store only the inverted
+# index and read the text back from `items` and `folders`. Triggers on the base tables keep
+# them in sync, so every write path (ORM, Core bulk statements, INSERT ... SELECT clones,
+# set-based deletes) updates the index in the same transaction without any CRUD changes.
+# The update triggers only fire when an indexed column is set, so moves never touch the index.
+#
+# Ranking uses bm25(), which has to score every matching row before the best ones are known.
+# To keep broad queries (a short prefix matching half the inventory) fast, only the newest
+# RANK_WINDOW matches of each table are ranked; narrower queries rank all of their matches.
+# Older matches of a broad query follow the ranked ones, newest first, which FTS5 reads in
+# rowid order a page at a time. The first page fixes where each table's window ends and the
+# cursor carries it, so paging reaches every match exactly once while rows are being added.
+
+from __future__ import annotations # MUST be the very first import
+
+import re
+from sqlalchemy.orm import Session
+from sqlalchemy import Float, column, select, text
+from typing import Dict, List, Optional, Tuple
+
+# Import models from the top-level 'app' package
+from app import models
+from app.crud import hierarchy
+from app.crud.pagination import DEFAULT_PAGE_SIZE, InvalidCursor, decode_cursor, encode_cursor
+
+SEARCH_COLUMNS = ("name", "description", "notes", "tags")
+# bm25() weight of each column in SEARCH_COLUMNS order: a hit in the name counts most
+COLUMN_WEIGHTS = (10.0, 2.0, 1.0, 5.0)
+SEARCH_TABLES = {"item": ("items", "items_fts"), "folder": ("folders", "folders_fts")}
+CURSOR_SORT = "rank" # Sort key recorded in search cursors
+RANK_WINDOW = 1000 # Most matches of one table that are ranked, newest first
+MIN_PREFIX_LENGTH = 2 # Shorter words only match whole words; a one-letter prefix matches nearly everything
+
+_WORD = re.compile(r"\w+")
+_rank_column = column("rank", Float)
+
+
+def _index_ddl(table: str, fts_table: str) -> List[str]:
+    columns = ", ".join(SEARCH_COLUMNS)
+    new_values = ", ".join(f"new.{name}" for name in SEARCH_COLUMNS)
+    old_values = ", ".join(f"old.{name}" for name in SEARCH_COLUMNS)
+    delete_old = f"INSERT INTO {fts_table} ({fts_table}, rowid, {columns}) VALUES ('delete', old.id, {old_values});"
+    insert_new = f"INSERT INTO {fts_table} (rowid, {columns}) VALUES (new.id, {new_values});"
+    return [
+        # prefix='2 3' adds prefix indexes, so the prefix queries built by match_query() stay index lookups
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5({columns}, content='{table}', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts_table}_insert AFTER INSERT ON {table} BEGIN {insert_new} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts_table}_delete AFTER DELETE ON {table} BEGIN {delete_old} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts_table}_update AFTER UPDATE OF {columns} ON {table} "
+        f"BEGIN {delete_old} {insert_new} END",
+    ]
+
+def ensure_search_index(connection) -> bool:
+    """
+    Creates the FTS5 tables and their sync triggers if they do not exist yet, and indexes the
+    existing rows of a newly created table. Returns True if anything had to be indexed.
+    """
+    built = False
+    for table, fts_table in SEARCH_TABLES.values():
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": fts_table}
+        ).first()
+        for statement in _index_ddl(table, fts_table):
+            connection.execute(text(statement))
+        if not exists:
+            connection.execute(text(f"INSERT INTO {fts_table} ({fts_table}) VALUES ('rebuild')"))
+            built = True
+    return built
+
+def rebuild_search_index(db: Session):
+    """
+    Reindexes every item and folder from scratch. Commits.
+    """
+    for _, fts_table in SEARCH_TABLES.values():
+        db.execute(text(f"INSERT INTO {fts_table} ({fts_table}) VALUES ('rebuild')"))
+    db.commit()
+
+def match_query(q: str) -> Optional[str]:
+    """
+    Turns free text into an FTS5 query matching rows that contain every word, each word of at least
+    MIN_PREFIX_LENGTH characters also matching as a prefix ("cordless screw" finds "Cordless Screwdriver").
+    Returns None if `q` has no words.
+    Quoting every word keeps FTS5 operators and punctuation in `q` from being interpreted.
+    """
+    words = _WORD.findall(q)
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' if len(word) >= MIN_PREFIX_LENGTH else f'"{word}"' for word in words)
+
+def _folder_paths(db: Session, folder_ids) -> Dict[int, str]:
+    """
+    Returns {folder id: names of the folder and its ancestors joined by "/"} for the given folders,
+    resolved from the materialized paths with two queries however deep the folders are.
+    """
+    paths = dict(db.execute(select(models.Folder.id, models.Folder.path).where(models.Folder.id.in_(set(folder_ids)))).all())
+    chains = {
+        folder_id: hierarchy.ancestor_ids_from_path(path) + [folder_id]
+        for folder_id, path in paths.items() if path
+    }
+    needed = {folder_id for chain in chains.values() for folder_id in chain}
+    names = dict(db.execute(select(models.Folder.id, models.Folder.name).where(models.Folder.id.in_(needed))).all())
+    return {
+        folder_id: hierarchy.PATH_SEPARATOR.join(names.get(ancestor_id, "") for ancestor_id in chain)
+        for folder_id, chain in chains.items()
+    }
+
+def _window_bounds(db: Session, query: str, tables: List[str]) -> Dict[str, int]:
+    """
+    Returns {entity: rowid of its RANK_WINDOW-th newest match} (0 with fewer matches), the
+    lowest rowid in the ranked window of each table.
+    """
+    bounds = {}
+    for name in tables:
+        fts_table = SEARCH_TABLES[name][1]
+        bounds[name] = db.execute(text(
+            f"SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH :query ORDER BY rowid DESC LIMIT 1 OFFSET :window"
+        ), {"query": query, "window": RANK_WINDOW - 1}).scalar() or 0
+    return bounds
+
+def _ranked_hits(db: Session, query: str, bounds: Dict[str, int], limit: int, after: Optional[dict] = None) -> list:
+    """
+    Returns up to `limit` matches of the ranked windows ordered by (rank, type, id), starting
+    after the (rank, type, id) of `after`.
+    """
+    weights = ", ".join(str(weight) for weight in COLUMN_WEIGHTS)
+    # FTS5 applies the rowid bound while matching
+    matches = " UNION ALL ".join(
+        f"SELECT '{name}' AS type, rowid AS id, bm25({fts_table}, {weights}) AS rank "
+        f"FROM {fts_table} WHERE {fts_table} MATCH :query AND rowid >= :bound_{name}"
+        for name, (_, fts_table) in SEARCH_TABLES.items() if name in bounds
+    )
+    params = {"query": query, "limit": limit, **{f"bound_{name}": bound for name, bound in bounds.items()}}
+    keyset = ""
+    if after:
+        # Ordered by (rank, type, id), so the next page starts strictly after the last hit
+        keyset = "WHERE (rank, type, id) > (:rank, :type, :id)"
+        params.update(rank=after["rank"], type=after["type"], id=after["id"])
+    return db.execute(text(f"SELECT type, id, rank FROM ({matches}) {keyset} ORDER BY rank, type, id LIMIT :limit"), params).all()
+
+def _older_hits(db: Session, query: str, bounds: Dict[str, int], limit: int, after: Optional[dict] = None) -> list:
+    """
+    Returns up to `limit` matches below the ranked windows ordered by (id descending, type),
+    starting after the (type, id) of `after`. Each table is read in rowid order and stops after
+    `limit` rows, so no more than a page of them is scored.
+    """
+    weights = ", ".join(str(weight) for weight in COLUMN_WEIGHTS)
+    keyset = " AND (rowid < :id OR (rowid = :id AND :type < '{name}'))" if after else ""
+    matches = " UNION ALL ".join(
+        f"SELECT * FROM (SELECT '{name}' AS type, rowid AS id, bm25({fts_table}, {weights}) AS rank "
+        f"FROM {fts_table} WHERE {fts_table} MATCH :query AND rowid < :bound_{name}{keyset.format(name=name)} "
+        f"ORDER BY rowid DESC LIMIT :limit)"
+        for name, (_, fts_table) in SEARCH_TABLES.items() if name in bounds
+    )
+    params = {"query": query, "limit": limit, **{f"bound_{name}": bound for name, bound in bounds.items()}}
+    if after:
+        params.update(type=after["type"], id=after["id"])
+    return db.execute(text(f"SELECT type, id, rank FROM ({matches}) ORDER BY id DESC, type LIMIT :limit"), params).all()
+
+def _decode_search_cursor(after: str, tables: List[str]) -> dict:
+    """
+    Returns the position stored in a search cursor: {"phase", "bounds", "type", "id"} and,
+    in the "ranked" phase, "rank". Raises InvalidCursor if it is malformed or was made for other entities.
+    """
+    value, last_id = decode_cursor(after, CURSOR_SORT, _rank_column)
+    if not isinstance(value, dict) or value.get("phase") not in ("ranked", "older") or not isinstance(value.get("type"), str):
+        raise InvalidCursor("Malformed cursor")
+    bounds = value.get("bounds")
+    if not isinstance(bounds, dict) or sorted(bounds) != sorted(tables) or not all(isinstance(bound, int) for bound in bounds.values()):
+        raise InvalidCursor("Cursor does not match the requested search")
+    if value["phase"] == "ranked" and not isinstance(value.get("rank"), (int, float)):
+        raise InvalidCursor("Malformed cursor")
+    return {**value, "id": last_id}
+
+def search(db: Session, q: str, entity: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE,
+           after: Optional[str] = None) -> Tuple[List[dict], Optional[str]]:
+    """
+    Returns one page of items and folders matching `q`, best matches first, and the cursor of
+    the next page (None on the last page). Restricted to "item" or "folder" hits with `entity`.
+    Past the ranked window of a broad query, the remaining matches follow newest first.
+    Each hit carries its folder id and readable folder path: the folder holding an item, or the
+    parent of a folder (None at the root level).
+    Raises InvalidCursor for a bad `after` cursor.
+    """
+    query = match_query(q)
+    if query is None:
+        return [], None
+    tables = [name for name in SEARCH_TABLES if entity in (None, name)]
+    if after:
+        position = _decode_search_cursor(after, tables)
+        bounds = position["bounds"]
+    else:
+        position, bounds = None, _window_bounds(db, query, tables)
+
+    # One hit more than the page, to know whether another page follows
+    hits = []
+    if position is None or position["phase"] == "ranked":
+        hits = [("ranked", hit) for hit in _ranked_hits(db, query, bounds, limit + 1, position)]
+        position = None # The older matches are read from their start
+    if len(hits) <= limit:
+        hits += [("older", hit) for hit in _older_hits(db, query, bounds, limit + 1 - len(hits), position)]
+    next_cursor = None
+    if len(hits) > limit:
+        hits = hits[:limit]
+        phase, last = hits[-1]
+        value = {"phase": phase, "bounds": bounds, "type": last.type}
+        if phase == "ranked":
+            value["rank"] = last.rank
+        next_cursor = encode_cursor(CURSOR_SORT, value, last.id)
+    hits = [hit for _, hit in hits]
+
+    item_ids = [hit.id for hit in hits if hit.type == "item"]
+    folder_ids = [hit.id for hit in hits if hit.type == "folder"]
+    rows = {}
+    if item_ids:
+        for row in db.execute(select(
+            models.Item.id, models.Item.name, models.Item.description, models.Item.tags, models.Item.folder_id
+        ).where(models.Item.id.in_(item_ids))):
+            rows[("item", row.id)] = row._asdict()
+    if folder_ids:
+        for row in db.execute(select(
+            models.Folder.id, models.Folder.name, models.Folder.description, models.Folder.tags,
+            models.Folder.parent_id.label("folder_id"),
+        ).where(models.Folder.id.in_(folder_ids))):
+            rows[("folder", row.id)] = row._asdict()
+    paths = _folder_paths(db, [row["folder_id"] for row in rows.values() if row["folder_id"] is not None])
+
+    results = []
+    for hit in hits:
+        row = rows.get((hit.type, hit.id))
+        if row is None:
+            continue # Deleted between the two queries
+        results.append({"type": hit.type, **row, "folder_path": paths.get(row["folder_id"]), "rank": hit.rank})
+    return results, next_cursor
@@ -0,0 +1,197 @@
+# app/crud/suggest.py
+# As-you-type name suggestions for items and folders (GET /suggest).
+#
+# name_suggestions holds one row per distinct item or folder name with the number of rows
+# using it and when it was last used. Triggers on `items` and `folders` keep it in sync, so
+# every write path (ORM, Core bulk statements, INSERT ... SELECT clones, set-based deletes)
+# updates it in the same transaction, like the full-text index in app/crud/search.py.
+#
+# The table is keyed by (entity, key), so all names starting with a prefix are one contiguous
+# range. A lookup first checks the SUGGEST_WINDOW most used names, which is enough for short
+# prefixes matching many names, and only reads the prefix range when those hold too few
+# matches, which means the range is small. When exact matches do not fill the list, names
+# starting with a prefix one typo away (a letter missing, extra, wrong or swapped) follow.
+# Every range read is capped, so a lookup costs a bounded number of index reads however many
+# names share a prefix; the price is that only the first names of an unusually large range
+# (in name order) are ranked.
+
+from __future__ import annotations # MUST be the very first import
+
+import json
+import string
+from sqlalchemy.orm import Session
+from sqlalchemy import text
+from typing import List, Optional
+
+SUGGEST_TABLES = {"item": "items", "folder": "folders"}
+DEFAULT_SUGGESTIONS = 10
+MAX_SUGGESTIONS = 50
+SUGGEST_WINDOW = 500 # Most used names checked before falling back to a scan of the prefix range
+SCAN_LIMIT = 1000 # Names of a prefix range read and ranked when it is not covered by the window
+FUZZY_SCAN_LIMIT = 50 # Names read from the range of each prefix one typo away
+FUZZY_MAX_PREFIXES = 20 # Prefixes one typo away that are read, of those matching any name
+FUZZY_MIN_LENGTH = 4 # Shorter prefixes are only matched exactly; one typo in three letters matches almost anything
+# Letters tried for missing or wrong characters, besides those already in the prefix
+FUZZY_ALPHABET = string.ascii_lowercase + string.digits + " "
+RANGE_END = "\U0010ffff" # Sorts after every character, so key < prefix + RANGE_END bounds a prefix range
+
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+_ORDER = "s.uses DESC, s.last_used DESC, s.key" # Suggestion order, on name_suggestions AS s
+
+
+def _key_sql(column: str) -> str:
+    return f"lower(trim({column}))"
+
+def suggestion_key(prefix: str) -> str:
+    """
+    Normalizes typed text like the triggers normalize names: leading spaces removed and ASCII
+    letters lowercased, as SQLite's lower() does. Trailing spaces are kept, so "box " only
+    matches names with more words after "box".
+    """
+    return prefix.lstrip(" ").translate(_ASCII_LOWER)
+
+def _index_ddl(entity: str, table: str) -> List[str]:
+    add_new = (
+        f"INSERT INTO name_suggestions (entity, key, name, uses, last_used) "
+        f"SELECT '{entity}', {_key_sql('new.name')}, trim(new.name), 1, CURRENT_TIMESTAMP WHERE trim(new.name) <> '' "
+        f"ON CONFLICT (entity, key) DO UPDATE SET uses = uses + 1, name = excluded.name, last_used = excluded.last_used;"
+    )
+    old_row = f"entity = '{entity}' AND key = {_key_sql('old.name')}"
+    remove_old = (
+        f"UPDATE name_suggestions SET uses = uses - 1 WHERE {old_row}; "
+        f"DELETE FROM name_suggestions WHERE {old_row} AND uses <= 0;"
+    )
+    return [
+        f"CREATE TRIGGER IF NOT EXISTS {table}_suggest_insert AFTER INSERT ON {table} BEGIN {add_new} END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_suggest_delete AFTER DELETE ON {table} BEGIN {remove_old} END",
+        f"CREATE TRIGGER IF NOT EXISTS {table}_suggest_update AFTER UPDATE OF name ON {table} "
+        f"WHEN old.name IS NOT new.name BEGIN {remove_old} {add_new} END",
+    ]
+
+def _fill_statement(entity: str, table: str) -> str:
+    # The bare trim(name) is taken from the row holding max(id), so the newest spelling wins
+    return (
+        f"INSERT INTO name_suggestions (entity, key, name, uses, last_used) "
+        f"SELECT '{entity}', key, name, uses, CURRENT_TIMESTAMP FROM ("
+        f"SELECT {_key_sql('name')} AS key, trim(name) AS name, count(*) AS uses, max(id) "
+        f"FROM {table} WHERE trim(name) <> '' GROUP BY 1)"
+    )
+
+def ensure_suggest_index(connection) -> bool:
+    """
+    Creates the sync triggers if they do not exist yet and fills name_suggestions from the
+    existing items and folders when they did not. Returns True if it had to be filled.
+    """
+    missing = not connection.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'items_suggest_insert'")
+    ).first()
+    if missing:
+        connection.execute(text("DELETE FROM name_suggestions"))
+        for entity, table in SUGGEST_TABLES.items():
+            connection.execute(text(_fill_statement(entity, table)))
+    for entity, table in SUGGEST_TABLES.items():
+        for statement in _index_ddl(entity, table):
+            connection.execute(text(statement))
+    return missing
+
+def rebuild_suggestions(db: Session):
+    """
+    Recomputes name_suggestions from every item and folder. Usage counts are kept exact by the
+    triggers; this resets the recency of every name. Commits.
+    """
+    db.execute(text("DELETE FROM name_suggestions"))
+    for entity, table in SUGGEST_TABLES.items():
+        db.execute(text(_fill_statement(entity, table)))
+    db.commit()
+
+def typo_prefixes(key: str) -> List[str]:
+    """
+    Returns the prefixes one edit away from `key` (one character deleted, inserted, replaced,
+    or two neighbours swapped), sorted and without any that another one is a prefix of, so
+    their ranges in name_suggestions do not overlap.
+    """
+    letters = sorted(set(FUZZY_ALPHABET) | set(key))
+    variants = set()
+    for i in range(len(key) + 1):
+        head, tail = key[:i], key[i:]
+        variants.update(head + letter + tail for letter in letters)
+        if tail:
+            variants.add(head + tail[1:])
+            variants.update(head + letter + tail[1:] for letter in letters)
+        if len(tail) > 1:
+            variants.add(head + tail[1] + tail[0] + tail[2:])
+    variants.discard(key)
+    pruned = []
+    for variant in sorted(variants):
+        if not (pruned and variant.startswith(pruned[-1])):
+            pruned.append(variant)
+    return pruned
+
+def _rows(db: Session, sql: str, params: dict, fuzzy: bool) -> List[dict]:
+    return [
+        {"type": params["entity"], "name": row.name, "uses": row.uses, "fuzzy": fuzzy, "last_used": row.last_used, "key": row.key}
+        for row in db.execute(text(sql), params)
+    ]
+
+def _suggest(db: Session, entity: str, key: str, limit: int) -> List[dict]:
+    params = {"entity": entity, "low": key, "high": key + RANGE_END, "limit": limit, "window": SUGGEST_WINDOW}
+    # Reads the (entity, uses, last_used, key) index only, and the table for at most `limit` names
+    found = _rows(db, (
+        f"SELECT s.name, s.uses, s.last_used, s.key FROM ("
+        f"SELECT key FROM name_suggestions AS s WHERE entity = :entity ORDER BY {_ORDER} LIMIT :window"
+        f") AS popular JOIN name_suggestions AS s ON s.entity = :entity AND s.key = popular.key "
+        f"WHERE popular.key >= :low AND popular.key < :high ORDER BY {_ORDER} LIMIT :limit"
+    ), params, False)
+    if len(found) < limit:
+        # Too few among the most used names, so the prefix is rare and its range short
+        found = _rows(db, (
+            f"SELECT * FROM (SELECT name, uses, last_used, key FROM name_suggestions "
+            f"WHERE entity = :entity AND key >= :low AND key < :high ORDER BY key LIMIT :scan) AS s "
+            f"ORDER BY {_ORDER} LIMIT :limit"
+        ), {**params, "scan": SCAN_LIMIT}, False)
+    if len(found) < limit and len(key) >= FUZZY_MIN_LENGTH:
+        found += _typo_matches(db, entity, key, limit - len(found))
+    return found
+
+def _typo_matches(db: Session, entity: str, key: str, limit: int) -> List[dict]:
+    """
+    Returns up to `limit` names starting with a prefix one typo away from `key` but not with `key` itself.
+    """
+    # Few of the hundreds of variants match anything; one probe each finds them. They are passed
+    # as one JSON array, binding hundreds of separate parameters costs more than the probes.
+    matching = db.execute(text(
+        "SELECT value FROM json_each(:variants) WHERE EXISTS ("
+        "SELECT 1 FROM name_suggestions WHERE entity = :entity AND key >= value AND key < value || :end) LIMIT :count"
+    ), {"variants": json.dumps(typo_prefixes(key)), "entity": entity, "end": RANGE_END, "count": FUZZY_MAX_PREFIXES}).scalars().all()
+    if not matching:
+        return []
+    params = {f"v{i}": variant for i, variant in enumerate(matching)}
+    params.update(entity=entity, end=RANGE_END, scan=FUZZY_SCAN_LIMIT, low=key, high=key + RANGE_END, limit=limit)
+    ranges = " UNION ALL ".join(
+        f"SELECT * FROM (SELECT name, uses, last_used, key FROM name_suggestions "
+        f"WHERE entity = :entity AND key >= :v{i} AND key < :v{i} || :end ORDER BY key LIMIT :scan)"
+        for i in range(len(matching))
+    )
+    # The range of the prefix without its last letter also holds the exact matches, which are left out
+    return _rows(db, (
+        f"SELECT * FROM ({ranges}) AS s WHERE NOT (key >= :low AND key < :high) ORDER BY {_ORDER} LIMIT :limit"
+    ), params, True)
+
+def suggest(db: Session, prefix: str, entity: Optional[str] = None, limit: int = DEFAULT_SUGGESTIONS) -> List[dict]:
+    """
+    Returns up to `limit` distinct item and/or folder names starting with `prefix`
+    (case-insensitive for ASCII letters), most used first and then most recently used.
+    Names starting with a prefix one typo away fill the remaining places, marked `fuzzy`.
+    """
+    key = suggestion_key(prefix)
+    if not key.strip():
+        return []
+    found: List[dict] = []
+    for name in SUGGEST_TABLES:
+        if entity in (None, name):
+            found += _suggest(db, name, key, limit)
+    # Stable sorts, last key first: exact before typo matches, then by uses, recency and name
+    found.sort(key=lambda row: row["key"])
+    found.sort(key=lambda row: (row["uses"], row["last_used"]), reverse=True)
+    found.sort(key=lambda row: row["fuzzy"])
+    return [{name: row[name] for name in ("type", "name", "uses", "fuzzy")} for row in found[:limit]]
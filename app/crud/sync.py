@@ -0,0 +1,76 @@
+# app/crud/sync.py
+# Delta sync: pages of the change log together with the current state of the changed rows.
+#
+# A page is a range scan on the change log's sequence number, followed by one SELECT ... IN
+# per entity type for the rows that still exist. Clients keep the sequence number of the
+# last change they applied and pass it as `since` on their next sync.
+
+from __future__ import annotations # MUST be the very first import
+
+from sqlalchemy.orm import Session
+from sqlalchemy import select
+
+# Import models from the top-level 'app' package
+from app import models
+from app.crud.changes import COUNTER_ID, ChangeCounter, ChangeLog, ensure_counter
+from app.crud.fields import FOLDER_COLUMNS, IMAGE_RESPONSE_COLUMNS, ITEM_COLUMNS
+
+# Columns returned for each entity type, the same as the records of GET /export
+SYNC_COLUMNS = {
+    "folder": (models.Folder.id, tuple(FOLDER_COLUMNS.values())),
+    "item": (models.Item.id, tuple(ITEM_COLUMNS.values())),
+    "image": (models.Image.id, IMAGE_RESPONSE_COLUMNS),
+}
+
+
+class ChangesCompacted(ValueError):
+    """
+    Raised when the changes after `since` include tombstones that compaction already removed.
+    """
+
+
+def get_changes(db: Session, since: int = 0, limit: int = 1000) -> dict:
+    """
+    Returns the changes with a sequence number above `since`, oldest first, at most `limit` of them,
+    as the ChangeFeed fields. Each change carries the row's current columns, or `deleted` and no data.
+    Every entity appears at most once: a row changed several times is only listed at its latest change.
+    since=0 returns every existing row (and recent tombstones), which is a full sync.
+    Raises ChangesCompacted if `since` is older than the compaction horizon.
+    """
+    ensure_counter(db)
+    counter = db.execute(
+        select(ChangeCounter.c.epoch, ChangeCounter.c.compacted_seq).where(ChangeCounter.c.id == COUNTER_ID)
+    ).one()
+    if 0 < since < counter.compacted_seq:
+        raise ChangesCompacted(
+            f"Changes up to sequence number {counter.compacted_seq} were compacted, sync again from since=0"
+        )
+
+    entries = db.execute(
+        select(ChangeLog.c.seq, ChangeLog.c.entity, ChangeLog.c.entity_id, ChangeLog.c.deleted)
+        .where(ChangeLog.c.seq > since).order_by(ChangeLog.c.seq).limit(limit + 1)
+    ).all()
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    current = {} # (entity, id) -> row dict
+    for entity, (id_column, columns) in SYNC_COLUMNS.items():
+        ids = [entry.entity_id for entry in entries if entry.entity == entity and not entry.deleted]
+        if ids:
+            for row in db.execute(select(*columns).where(id_column.in_(ids))).mappings():
+                current[(entity, row["id"])] = dict(row)
+
+    changes = []
+    for entry in entries:
+        # A row deleted after the log was read is reported as deleted; its tombstone follows later
+        data = current.get((entry.entity, entry.entity_id))
+        changes.append({
+            "seq": entry.seq, "entity": entry.entity, "id": entry.entity_id,
+            "deleted": data is None, "data": data,
+        })
+    return {
+        "epoch": counter.epoch,
+        "changes": changes,
+        "next_since": entries[-1].seq if entries else since,
+        "has_more": has_more,
+    }
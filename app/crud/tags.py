@@ -0,0 +1,202 @@
+# app/crud/tags.py
+# Maintains the normalized tag index (tags, item_tags, folder_tags) behind GET /tags and
+# GET /items?tag=.
+#
+# Item.tags and Folder.tags stay the comma-separated strings the API reads and writes. Every
+# CRUD write that sets them calls set_tags() in the same transaction, which diffs the parsed
+# tags against the stored links and adjusts the per-tag usage counters, so finding everything
+# with a tag is an index lookup instead of a LIKE scan, and usage counts are plain reads.
+
+from __future__ import annotations # MUST be the very first import
+
+from collections import Counter
+from sqlalchemy.orm import Session
+from sqlalchemy import bindparam, delete, func, insert, select, true, update
+from typing import Dict, Iterable, List, Optional
+
+# Import models from the top-level 'app' package
+from app import models
+
+TAG_SEPARATOR = ","
+BATCH_SIZE = 500 # Ids or names per IN (...) list, well below SQLite's bound-parameter limit
+REBUILD_BATCH_SIZE = 1000 # Rows read per batch by rebuild_tags()
+
+Tags = models.Tag.__table__
+# Link table, owner column and Tag counter of each kind of tagged row
+LINKS = {
+    "item": (models.ItemTag.__table__, "item_id", "item_count"),
+    "folder": (models.FolderTag.__table__, "folder_id", "folder_count"),
+}
+
+
+def normalize_tag(name: str) -> str:
+    return name.strip().lower()
+
+def parse_tags(tags: Optional[str]) -> List[str]:
+    """
+    Splits a comma-separated tags string into unique normalized tag names, in order.
+    """
+    return list(dict.fromkeys(
+        normalize_tag(name) for name in (tags or "").split(TAG_SEPARATOR) if name.strip()
+    ))
+
+def _batches(values: list, size: int = BATCH_SIZE):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+def _tag_ids(db: Session, names: Iterable[str]) -> Dict[str, int]:
+    """
+    Returns {name: tag id} for the given normalized names, creating the tags that do not exist yet.
+    """
+    names = sorted(set(names))
+    ids = {}
+    for batch in _batches(names):
+        ids.update(db.execute(select(Tags.c.name, Tags.c.id).where(Tags.c.name.in_(batch))).all())
+    missing = [{"name": name, "item_count": 0, "folder_count": 0} for name in names if name not in ids]
+    if missing:
+        ids.update(db.execute(insert(Tags).returning(Tags.c.name, Tags.c.id), missing).all())
+    return ids
+
+def _add_counts(db: Session, kind: str, deltas: Dict[int, int]):
+    """
+    Adds usage deltas to the item or folder counters of tags, and drops tags nobody uses any more.
+    """
+    column = LINKS[kind][2]
+    rows = [{"b_id": tag_id, "b_delta": delta} for tag_id, delta in deltas.items() if delta]
+    if not rows:
+        return
+    db.execute(
+        update(Tags).where(Tags.c.id == bindparam("b_id"))
+        .values({column: Tags.c[column] + bindparam("b_delta")}),
+        rows,
+    )
+    for batch in _batches([row["b_id"] for row in rows]):
+        db.execute(delete(Tags).where(Tags.c.id.in_(batch), Tags.c.item_count == 0, Tags.c.folder_count == 0))
+
+def set_tags(db: Session, kind: str, tags_by_owner: Dict[int, Optional[str]]):
+    """
+    Makes the tag links of items or folders (`kind` "item" or "folder") match their tags strings,
+    given as {id: comma-separated tags}. Pass None or "" to remove all of a row's tags.
+    """
+    if not tags_by_owner:
+        return
+    link, owner_key, _ = LINKS[kind]
+    owner = link.c[owner_key]
+    current: Dict[int, set] = {}
+    for batch in _batches(list(tags_by_owner)):
+        for owner_id, tag_id in db.execute(select(owner, link.c.tag_id).where(owner.in_(batch))):
+            current.setdefault(owner_id, set()).add(tag_id)
+
+    wanted_names = {owner_id: parse_tags(tags) for owner_id, tags in tags_by_owner.items()}
+    ids = _tag_ids(db, (name for names in wanted_names.values() for name in names))
+    added, removed, deltas = [], [], Counter()
+    for owner_id, names in wanted_names.items():
+        wanted = {ids[name] for name in names}
+        have = current.get(owner_id, set())
+        for tag_id in wanted - have:
+            added.append({owner_key: owner_id, "tag_id": tag_id})
+            deltas[tag_id] += 1
+        for tag_id in have - wanted:
+            removed.append({"b_owner": owner_id, "b_tag": tag_id})
+            deltas[tag_id] -= 1
+    if removed:
+        db.execute(delete(link).where(owner == bindparam("b_owner"), link.c.tag_id == bindparam("b_tag")), removed)
+    if added:
+        db.execute(insert(link), added)
+    _add_counts(db, kind, deltas)
+
+def remove_links(db: Session, kind: str, owner_ids):
+    """
+    Removes the tag links of the items or folders selected by `owner_ids` (a SELECT of one id
+    column), for set-based deletes. Call it before the rows themselves are deleted.
+    """
+    link, owner_key, _ = LINKS[kind]
+    owner = link.c[owner_key]
+    deltas = {
+        tag_id: -count for tag_id, count in
+        db.execute(select(link.c.tag_id, func.count()).where(owner.in_(owner_ids)).group_by(link.c.tag_id))
+    }
+    if deltas:
+        db.execute(delete(link).where(owner.in_(owner_ids)))
+        _add_counts(db, kind, deltas)
+
+def copy_links(db: Session, kind: str, id_map):
+    """
+    Gives copied items or folders the tags of their originals. `id_map` is a table or subquery
+    with `old_id` and `new_id` columns, such as the id maps of a subtree clone.
+    """
+    link, owner_key, _ = LINKS[kind]
+    owner = link.c[owner_key]
+    db.execute(insert(link).from_select(
+        [owner_key, "tag_id"],
+        select(id_map.c.new_id, link.c.tag_id).join(id_map, id_map.c.old_id == owner),
+    ))
+    deltas = dict(db.execute(
+        select(link.c.tag_id, func.count()).join(id_map, id_map.c.new_id == owner).group_by(link.c.tag_id)
+    ).all())
+    _add_counts(db, kind, deltas)
+
+def tagged_with(kind: str, names: List[str]):
+    """
+    Builds a filter on the id column of items or folders matching rows that carry every tag in `names`.
+    The matching ids are collected from the tag links with the (tag_id, owner) index.
+    """
+    link, owner_key, _ = LINKS[kind]
+    owner = link.c[owner_key]
+    names = list(dict.fromkeys(normalize_tag(name) for name in names if name.strip()))
+    if not names:
+        return true()
+    matching = (
+        select(owner).join(Tags, Tags.c.id == link.c.tag_id).where(Tags.c.name.in_(names))
+        .group_by(owner).having(func.count() == len(names))
+    )
+    model = models.Item if kind == "item" else models.Folder
+    return model.id.in_(matching)
+
+def get_tags(db: Session, prefix: Optional[str] = None, limit: Optional[int] = None) -> List[dict]:
+    """
+    Returns the tags in use with their item and folder counts, most used first,
+    optionally only those starting with `prefix`.
+    """
+    query = select(Tags.c.name, Tags.c.item_count, Tags.c.folder_count)
+    if prefix and prefix.strip():
+        # Tag names are lower case, so the range is case-insensitive and uses the unique index on name
+        low = normalize_tag(prefix)
+        query = query.where(Tags.c.name >= low, Tags.c.name < low + "\U0010ffff")
+    query = query.order_by((Tags.c.item_count + Tags.c.folder_count).desc(), Tags.c.name)
+    if limit is not None:
+        query = query.limit(limit)
+    return [row._asdict() for row in db.execute(query)]
+
+def rebuild_tags(db: Session) -> int:
+    """
+    Recreates the tag index from the tags strings of every item and folder, for databases
+    created before it existed or after it was found inconsistent. Commits.
+    Returns the number of distinct tags.
+    """
+    for link, _, _ in LINKS.values():
+        db.execute(delete(link))
+    db.execute(delete(Tags))
+    ids: Dict[str, int] = {}
+    for kind, model in (("item", models.Item), ("folder", models.Folder)):
+        link, owner_key, _ = LINKS[kind]
+        result = db.execute(
+            select(model.id, model.tags).where(model.tags.isnot(None))
+            .execution_options(yield_per=REBUILD_BATCH_SIZE)
+        )
+        for rows in result.partitions():
+            parsed = [(owner_id, parse_tags(tags)) for owner_id, tags in rows]
+            new_names = {name for _, names in parsed for name in names if name not in ids}
+            if new_names:
+                ids.update(_tag_ids(db, new_names))
+            links = [{owner_key: owner_id, "tag_id": ids[name]} for owner_id, names in parsed for name in names]
+            if links:
+                db.execute(insert(link), links)
+    counts = {}
+    for kind, (link, _, column) in LINKS.items():
+        counts[column] = (
+            select(func.count()).select_from(link).where(link.c.tag_id == Tags.c.id).scalar_subquery()
+        )
+    db.execute(update(Tags).values(counts))
+    db.commit()
+    return len(ids)
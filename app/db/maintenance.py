@@ -0,0 +1,182 @@
+# app/db/maintenance.py
+# Command-line maintenance tasks for an existing database.
+#
+# Usage:
+#   python -m app.db.maintenance check-paths
+#   python -m app.db.maintenance rebuild-paths
+#   python -m app.db.maintenance check-aggregates
+#   python -m app.db.maintenance repair-aggregates
+#   python -m app.db.maintenance import items.csv [--format csv|ndjson] [--key id|name] [--dry-run]
+#   python -m app.db.maintenance compact-changes [--retention-days N]
+#   python -m app.db.maintenance rebuild-search
+#   python -m app.db.maintenance rebuild-tags
+#   python -m app.db.maintenance rebuild-suggestions
+#   python -m app.db.maintenance migrate-images
+#   python -m app.db.maintenance recount-images
+#   python -m app.db.maintenance generate-variants
+#   python -m app.db.maintenance gc-images [--dry-run] [--full] [--grace-hours N]
+
+import argparse
+import json
+import sys
+from datetime import timedelta
+
+import app.models # Register all models with Base.metadata
+from app.core import thumbnails
+from app.db.session import SessionLocal, create_database_and_tables
+from app.crud import aggregates, blobs, changes, hierarchy, image_gc, imports, search, suggest, tags
+
+
+def check_paths(db, args) -> int:
+    bad_ids = hierarchy.check_paths(db)
+    if bad_ids:
+        print(f"{len(bad_ids)} folders have an inconsistent ancestry path: {bad_ids}")
+        return 1
+    print("Folder ancestry paths are consistent.")
+    return 0
+
+def rebuild_paths(db, args) -> int:
+    fixed = hierarchy.rebuild_paths(db)
+    print(f"Rebuilt ancestry paths, {fixed} folders updated.")
+    return 0
+
+def check_aggregates(db, args) -> int:
+    problems = aggregates.check(db)
+    for problem in problems:
+        print(problem)
+    if problems:
+        print(f"{len(problems)} aggregate counters are inconsistent, run repair-aggregates to fix them.")
+        return 1
+    print("Aggregate counters are consistent.")
+    return 0
+
+def repair_aggregates(db, args) -> int:
+    aggregates.repair(db)
+    print("Recomputed all aggregate counters.")
+    return 0
+
+def import_file(db, args) -> int:
+    try:
+        file_format = imports.import_format(args.format, args.file)
+    except imports.InvalidImport as e:
+        print(e)
+        return 2
+    with open(args.file, encoding="utf-8-sig", newline="") as stream:
+        report = imports.import_items(db, imports.read_records(stream, file_format), key=args.key, dry_run=args.dry_run)
+    print(json.dumps(report, indent=2))
+    return 1 if report["rejected"] else 0
+
+def _import_arguments(parser):
+    parser.add_argument("file", help="CSV file with a header line, or NDJSON file")
+    parser.add_argument("--format", choices=imports.IMPORT_FORMATS, help="File format; defaults to the file extension")
+    parser.add_argument("--key", choices=("id", "name"), help="Update existing items matching by id or by name within the same folder")
+    parser.add_argument("--dry-run", action="store_true", help="Validate and report without writing anything")
+
+def compact_changes(db, args) -> int:
+    removed = changes.compact_change_log(db, retention=timedelta(days=args.retention_days))
+    print(f"Removed {removed} tombstones from the change log.")
+    return 0
+
+def _compact_arguments(parser):
+    parser.add_argument(
+        "--retention-days", type=float, default=changes.CHANGE_LOG_RETENTION.days,
+        help="Keep tombstones younger than this many days (default: %(default)s)",
+    )
+
+def rebuild_search(db, args) -> int:
+    search.rebuild_search_index(db)
+    print("Rebuilt the full-text search index.")
+    return 0
+
+def rebuild_tags(db, args) -> int:
+    count = tags.rebuild_tags(db)
+    print(f"Rebuilt the tag index, {count} distinct tags.")
+    return 0
+
+def rebuild_suggestions(db, args) -> int:
+    suggest.rebuild_suggestions(db)
+    print("Rebuilt the name suggestion index.")
+    return 0
+
+def migrate_images(db, args) -> int:
+    report = blobs.migrate_legacy_images(db)
+    print(f"Moved {report['files']} image files into {report['blobs']} new blobs, {report['images']} images updated.")
+    for filepath in report["missing"]:
+        print(f"Missing file: {filepath}")
+    return 1 if report["missing"] else 0
+
+def recount_images(db, args) -> int:
+    blobs.recount_blobs(db)
+    print("Recounted the images using every stored image file.")
+    return 0
+
+def generate_variants(db, args) -> int:
+    try:
+        report = blobs.generate_missing_variants(db)
+    finally:
+        thumbnails.shutdown()
+    print(f"Rendered variants of {report['files']} image files, {report['images']} images updated.")
+    for path in report["missing"]:
+        print(f"Missing file: {path}")
+    legacy_images = blobs.legacy_image_count(db)
+    if legacy_images:
+        print(f"{legacy_images} images are stored under their upload name, run migrate-images first to include them.")
+    return 1 if report["missing"] else 0
+
+def gc_images(db, args) -> int:
+    report = image_gc.collect_garbage(
+        db, grace=timedelta(hours=args.grace_hours), dry_run=args.dry_run, full=args.full,
+        scan_budget=sys.maxsize if args.full else image_gc.GC_SCAN_BUDGET,
+    )
+    print(json.dumps(report, indent=2))
+    return 1 if report["missing_count"] else 0
+
+def _gc_arguments(parser):
+    parser.add_argument("--dry-run", action="store_true", help="Report what would be removed without removing anything")
+    parser.add_argument("--full", action="store_true", help="List every directory, not only those changed since the last pass")
+    parser.add_argument(
+        "--grace-hours", type=float, default=image_gc.GC_GRACE.total_seconds() / 3600,
+        help="Keep unreferenced files younger than this many hours (default: %(default)s)",
+    )
+
+COMMANDS = {
+    "check-paths": (check_paths, "Report folders whose ancestry path is out of date"),
+    "rebuild-paths": (rebuild_paths, "Recompute the ancestry path of every folder"),
+    "check-aggregates": (check_aggregates, "Compare the materialized counters with a fresh computation"),
+    "repair-aggregates": (repair_aggregates, "Recompute all materialized counters"),
+    "import": (import_file, "Import items from a CSV or NDJSON file, like POST /import"),
+    "compact-changes": (compact_changes, "Remove old tombstones from the change log behind GET /changes"),
+    "rebuild-search": (rebuild_search, "Reindex every item and folder for GET /search"),
+    "rebuild-tags": (rebuild_tags, "Recreate the tag index from the tags of every item and folder"),
+    "rebuild-suggestions": (rebuild_suggestions, "Recount the item and folder names suggested by GET /suggest"),
+    "migrate-images": (migrate_images, "Move images uploaded before the content-addressed store into it"),
+    "recount-images": (recount_images, "Recompute the reference count of every stored image file"),
+    "generate-variants": (generate_variants, "Render the thumbnails of every image that has none yet"),
+    "gc-images": (gc_images, "Remove image files no image uses and report images whose file is missing"),
+}
+# Commands that take arguments, with the function adding them to the command's parser
+COMMAND_ARGUMENTS = {
+    "import": _import_arguments,
+    "compact-changes": _compact_arguments,
+    "gc-images": _gc_arguments,
+}
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="HomeOrg database maintenance")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for name, (_, help_text) in COMMANDS.items():
+        command_parser = subparsers.add_parser(name, help=help_text)
+        if name in COMMAND_ARGUMENTS:
+            COMMAND_ARGUMENTS[name](command_parser)
+    args = parser.parse_args(argv)
+
+    create_database_and_tables()
+    db = SessionLocal()
+    try:
+        handler, _ = COMMANDS[args.command]
+        return handler(db, args)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -35,6 +35,26 @@ def get_db():
     finally:
         db.close()
 
+# Columns added to existing tables after their first release.
+# create_all() never alters existing tables, so these are added with ALTER TABLE on startup.
+ADDED_COLUMNS = [
+    ("folders", "path", "VARCHAR"),
+    ("change_counter", "compacted_seq", "INTEGER NOT NULL DEFAULT 0"),
+    ("images", "sha256", "VARCHAR REFERENCES image_blobs (sha256)"),
+    ("images", "variants", "JSON"),
+    ("items", "clone_source_id", "INTEGER"),
+]
+
+def _add_missing_columns(connection):
+    """
+    Adds any column from ADDED_COLUMNS that an existing database does not have yet.
+    """
+    for table, column, column_type in ADDED_COLUMNS:
+        existing = {row[1] for row in connection.execute(text(f"PRAGMA table_info({table})"))}
+        if column not in existing:
+            connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}"))
+            print(f"Added column {table}.{column}")
+
 def create_database_and_tables():
     """
     Creates the database and tables if they don't exist, including indexes.
@@ -63,10 +83,78 @@ def create_database_and_tables():
     # Create indexes for frequently queried foreign key columns
     # Using CREATE INDEX IF NOT EXISTS to avoid errors if indexes already exist
     with engine.connect() as connection:
+        _add_missing_columns(connection)
         connection.execute(text("CREATE INDEX IF NOT EXISTS idx_items_folder_id ON items (folder_id);"))
         connection.execute(text("CREATE INDEX IF NOT EXISTS idx_folders_parent_id ON folders (parent_id);"))
         connection.execute(text("CREATE INDEX IF NOT EXISTS idx_images_folder_id ON images (folder_id);"))
         connection.execute(text("CREATE INDEX IF NOT EXISTS idx_images_item_id ON images (item_id);"))
+        connection.execute(text("CREATE INDEX IF NOT EXISTS idx_images_sha256 ON images (sha256);"))
+        connection.execute(text("CREATE INDEX IF NOT EXISTS idx_images_filepath ON images (filepath);"))
+        # Unused stored files by age, for image garbage collection
+        connection.execute(text("CREATE INDEX IF NOT EXISTS idx_image_blobs_unused ON image_blobs (orphaned_at) WHERE ref_count = 0;"))
+        connection.execute(text("CREATE INDEX IF NOT EXISTS idx_folders_path ON folders (path);"))
+        # Copies of a clone in progress, by original (the marker is cleared once they are mapped)
+        connection.execute(text("CREATE INDEX IF NOT EXISTS idx_items_clone_source ON items (clone_source_id) WHERE clone_source_id IS NOT NULL;"))
+        # Composite (sort column, id) indexes behind the keyset-paginated list endpoints
+        connection.execute(text("CREATE INDEX IF NOT EXISTS idx_items_name_id ON items (name, id);"))
+        connection.execute(text("CREATE INDEX IF NOT EXISTS idx_items_acquired_date_id ON items (acquired_date, id);"))
+        connection.execute(text("CREATE INDEX IF NOT EXISTS idx_items_quantity_id ON items (quantity, id);"))
+        connection.execute(text("CREATE INDEX IF NOT EXISTS idx_items_folder_name_id ON items (folder_id, name, id);"))
+        connection.execute(text("CREATE INDEX IF NOT EXISTS idx_items_folder_acquired_date_id ON items (folder_id, acquired_date, id);"))
+        connection.execute(text("CREATE INDEX IF NOT EXISTS idx_items_folder_quantity_id ON items (folder_id, quantity, id);"))
+        connection.execute(text("CREATE INDEX IF NOT EXISTS idx_folders_name_id ON folders (name, id);"))
+        connection.execute(text("CREATE INDEX IF NOT EXISTS idx_folders_parent_name_id ON folders (parent_id, name, id);"))
+        # Tag links by tag, for finding everything with a tag (the primary keys start with the item/folder)
+        connection.execute(text("CREATE INDEX IF NOT EXISTS idx_item_tags_tag_item ON item_tags (tag_id, item_id);"))
+        connection.execute(text("CREATE INDEX IF NOT EXISTS idx_folder_tags_tag_folder ON folder_tags (tag_id, folder_id);"))
+        # Most used names first, for GET /suggest
+        connection.execute(text("CREATE INDEX IF NOT EXISTS idx_name_suggestions_popular ON name_suggestions (entity, uses DESC, last_used DESC, key);"))
+        # Tombstones by age, for change log compaction
+        connection.execute(text("CREATE INDEX IF NOT EXISTS idx_change_log_tombstones ON change_log (changed_at) WHERE deleted;"))
+        # Full-text search index, kept in sync by triggers
+        from app.crud.search import ensure_search_index
+        if ensure_search_index(connection):
+            print("Built the full-text search index.")
+        # Name suggestion index, kept in sync by triggers
+        from app.crud.suggest import ensure_suggest_index
+        if ensure_suggest_index(connection):
+            print("Built the name suggestion index.")
+        # Image blob reference counts, kept in sync by triggers
+        from app.crud.blobs import ensure_blob_triggers
+        ensure_blob_triggers(connection)
+        # Directories holding files that lost their image, for image garbage collection
+        from app.crud.image_gc import ensure_gc_triggers
+        ensure_gc_triggers(connection)
         connection.commit() # Commit the index creation
 
-    print("Indexes created.")
\ No newline at end of file
+    print("Indexes created.")
+
+    # Build the folder ancestry index and the aggregate counters for databases created before they existed
+    from app.crud.hierarchy import rebuild_paths
+    from app.crud.aggregates import repair as repair_aggregates
+    from app.crud.changes import backfill_change_log, compact_change_log, ensure_counter
+    from app.crud.tags import rebuild_tags
+    from app.crud.blobs import legacy_image_count
+    db = SessionLocal()
+    try:
+        ensure_counter(db)
+        logged = backfill_change_log(db)
+        if logged:
+            print(f"Recorded {logged} existing rows in the change log.")
+        compact_change_log(db)
+        if db.execute(text("SELECT 1 FROM folders WHERE path IS NULL LIMIT 1")).first():
+            print(f"Rebuilt ancestry paths for {rebuild_paths(db)} folders.")
+        if not db.execute(text("SELECT 1 FROM inventory_totals")).first():
+            repair_aggregates(db)
+            print("Computed aggregate counters.")
+        if not db.execute(text("SELECT 1 FROM tags")).first() and db.execute(text(
+            "SELECT 1 FROM items WHERE tags <> '' UNION ALL SELECT 1 FROM folders WHERE tags <> '' LIMIT 1"
+        )).first():
+            print(f"Indexed {rebuild_tags(db)} tags.")
+        # Moving files is left to the maintenance command; until then they are served from their old URLs
+        legacy_images = legacy_image_count(db)
+        if legacy_images:
+            print(f"{legacy_images} images are stored under their upload name, run "
+                  f"`python -m app.db.maintenance migrate-images` to move them into the content-addressed store.")
+    finally:
+        db.close()
\ No newline at end of file
@@ -3,21 +3,48 @@
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
 from starlette.staticfiles import StaticFiles
+import anyio
+import asyncio
+import logging
 import os # Import os for path manipulation
 
-from app.db.session import create_database_and_tables
+from app.db.session import SessionLocal, create_database_and_tables
+from app.core import thumbnails
+from app.core.imagefiles import ImageFiles
+from app.core.uploads import IMAGE_DIR, IMAGE_URL_PREFIX
+from app.crud import image_gc
 
 # Directly import endpoint routers
-from app.api.endpoints import item, folder, image, counts
+from app.api.endpoints import item, folder, image, counts, export, imports, events, changes, search, tags, suggest
+
+def _collect_image_garbage():
+    db = SessionLocal()
+    try:
+        image_gc.log_report(image_gc.collect_garbage(db))
+    finally:
+        db.close()
+
+async def _collect_image_garbage_periodically():
+    # One incremental pass every GC_INTERVAL seconds, in the threadpool
+    while True:
+        await asyncio.sleep(image_gc.GC_INTERVAL)
+        try:
+            await anyio.to_thread.run_sync(_collect_image_garbage)
+        except Exception as e:
+            logging.error(f"Image garbage collection failed: {e}")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup event
     print("Application starting up...")
     create_database_and_tables() # Call the function from the new location
+    gc_task = asyncio.create_task(_collect_image_garbage_periodically()) if image_gc.GC_INTERVAL > 0 else None
     yield
     # Shutdown event
     print("Application shutting down.")
+    if gc_task is not None:
+        gc_task.cancel()
+    thumbnails.shutdown()
 
 app = FastAPI(
     title="Inventory Management API",
@@ -32,6 +59,13 @@ app.include_router(folder.router, prefix="/folders")
 app.include_router(item.router, prefix="/items")
 app.include_router(image.router, prefix="/images")
 app.include_router(counts.router, prefix="/counts")
+app.include_router(export.router, prefix="/export")
+app.include_router(imports.router, prefix="/import")
+app.include_router(events.router, prefix="/events")
+app.include_router(changes.router, prefix="/changes")
+app.include_router(search.router, prefix="/search")
+app.include_router(tags.router, prefix="/tags")
+app.include_router(suggest.router, prefix="/suggest")
 
 # Mount static files *after* all API routers.
 # This ensures that API routes take precedence over static file serving for conflicting paths.
@@ -39,7 +73,9 @@ app.include_router(counts.router, prefix="/counts")
 # Mount a separate StaticFiles instance specifically for images.
 # This will serve files from the "static/images" directory on the host
 # when requests come to the "/static_images" URL path in the browser.
-app.mount("/static_images", StaticFiles(directory="static/images"), name="static_images")
+# ImageFiles adds immutable caching for content-addressed files and byte range support.
+os.makedirs(IMAGE_DIR, exist_ok=True) # Uploads create it too, but the mount needs it at startup
+app.mount(IMAGE_URL_PREFIX, ImageFiles(directory=IMAGE_DIR), name="static_images")
 
 # Mount static files for the main frontend (index.html, styles.css, script.js)
 # This will serve files directly from the "static" directory at the root "/".
@@ -7,4 +7,8 @@ print("DEBUG: app.models.__init__.py executed")
 
 from .folder import Folder
 from .item import Item
-from .image import Image
+from .image import Image, ImageBlob, ImageDirectoryScan
+from .aggregates import FolderStats, InventoryTotals
+from .changes import ChangeCounter, ChangeLogEntry
+from .tag import Tag, ItemTag, FolderTag
+from .suggest import NameSuggestion
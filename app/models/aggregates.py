@@ -0,0 +1,33 @@
+# app/models/aggregates.py
+# Defines the materialized aggregate tables kept in step by app/crud/aggregates.py.
+
+from sqlalchemy import Column, Integer, Float, ForeignKey
+from app.db.base import Base # Import Base from the new, centralized location
+
+# Per-folder counters. "direct_*" columns cover only the folder's own children,
+# the others cover the whole subtree below the folder.
+class FolderStats(Base):
+    __tablename__ = "folder_stats"
+
+    folder_id = Column(Integer, ForeignKey("folders.id", ondelete="CASCADE"), primary_key=True)
+    direct_item_count = Column(Integer, nullable=False, default=0)
+    direct_quantity = Column(Float, nullable=False, default=0.0)
+    direct_subfolder_count = Column(Integer, nullable=False, default=0)
+    item_count = Column(Integer, nullable=False, default=0)
+    quantity = Column(Float, nullable=False, default=0.0)
+    subfolder_count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<FolderStats(folder_id={self.folder_id}, item_count={self.item_count}, quantity={self.quantity})>"
+
+# Inventory-wide totals, stored as a single row with id=1.
+class InventoryTotals(Base):
+    __tablename__ = "inventory_totals"
+
+    id = Column(Integer, primary_key=True)
+    total_folders = Column(Integer, nullable=False, default=0)
+    total_items = Column(Integer, nullable=False, default=0)
+    total_quantity = Column(Float, nullable=False, default=0.0)
+
+    def __repr__(self):
+        return f"<InventoryTotals(folders={self.total_folders}, items={self.total_items}, quantity={self.total_quantity})>"
@@ -0,0 +1,39 @@
+# app/models/changes.py
+# Defines the change counter that versions the whole inventory for conditional GETs,
+# and the change log behind the GET /changes delta sync.
+
+from sqlalchemy import Boolean, Column, DateTime, Integer, String, UniqueConstraint
+from app.db.base import Base # Import Base from the new, centralized location
+
+# Single row (id=1) bumped by every CRUD write. `epoch` is a random token chosen when the
+# row is created, so ETags from a recreated database never match the new one's.
+class ChangeCounter(Base):
+    __tablename__ = "change_counter"
+
+    id = Column(Integer, primary_key=True)
+    epoch = Column(String, nullable=False)
+    version = Column(Integer, nullable=False, default=0)
+    # Highest sequence number of a tombstone removed by compaction; older `since` values cannot be served
+    compacted_seq = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<ChangeCounter(epoch='{self.epoch}', version={self.version})>"
+
+# One row per folder, item and image that exists or was deleted recently. Every write replaces
+# the entity's row, which gives it the next sequence number; deletes leave a tombstone.
+# AUTOINCREMENT keeps sequence numbers increasing even after the newest rows are replaced or compacted.
+class ChangeLogEntry(Base):
+    __tablename__ = "change_log"
+    __table_args__ = (
+        UniqueConstraint("entity", "entity_id", name="uq_change_log_entity"),
+        {"sqlite_autoincrement": True},
+    )
+
+    seq = Column(Integer, primary_key=True)
+    entity = Column(String, nullable=False) # "folder", "item" or "image"
+    entity_id = Column(Integer, nullable=False)
+    deleted = Column(Boolean, nullable=False, default=False)
+    changed_at = Column(DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<ChangeLogEntry(seq={self.seq}, entity='{self.entity}', entity_id={self.entity_id}, deleted={self.deleted})>"
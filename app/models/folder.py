@@ -17,6 +17,9 @@ class Folder(Base):
     notes = Column(Text, nullable=True)
     tags = Column(String, nullable=True)
     parent_id = Column(Integer, ForeignKey("folders.id"), nullable=True)
+    # Materialized ancestry path, e.g. "/1/5/9/" for folder 9 under 5 under root folder 1.
+    # Maintained by app/crud/hierarchy.py; indexed so subtree reads are a single range scan.
+    path = Column(String, nullable=True)
 
     # Explicitly define the many-to-one relationship to the parent folder
     parent = relationship(
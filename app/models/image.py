@@ -1,7 +1,8 @@
 # app/models/image.py
-# Defines the SQLAlchemy model for images, which can be linked to items or folders.
+# Defines the SQLAlchemy models for images, which can be linked to items or folders,
+# and for the content-addressed files they are stored in.
 
-from sqlalchemy import Column, Integer, String, ForeignKey, Text
+from sqlalchemy import JSON, Column, DateTime, Integer, String, ForeignKey, Text, func
 from sqlalchemy.orm import relationship
 from app.db.base import Base # Import Base from the new, centralized location
 
@@ -19,6 +20,12 @@ class Image(Base):
     # These are nullable to allow an image to be associated with either.
     item_id = Column(Integer, ForeignKey("items.id"), nullable=True)
     folder_id = Column(Integer, ForeignKey("folders.id"), nullable=True)
+    # The stored file, for images uploaded to (or migrated into) the content-addressed store.
+    # NULL for images whose filepath points elsewhere.
+    sha256 = Column(String, ForeignKey("image_blobs.sha256"), nullable=True)
+    # URLs of the downscaled copies of the stored file by size name ({"thumb": ..., "small": ...}),
+    # recorded once they have been rendered; NULL until then.
+    variants = Column(JSON(none_as_null=True), nullable=True)
 
     # Relationships
     # back_populates links back to the 'images' attribute in Item and Folder models.
@@ -29,3 +36,41 @@ class Image(Base):
 
     def __repr__(self):
         return f"<Image(id={self.id}, filename='{self.filename}', item_id={self.item_id}, folder_id={self.folder_id})>"
+
+
+class ImageBlob(Base):
+    """
+    One stored image file, named after the SHA-256 of its content and shared by every image
+    with that content. ref_count is kept equal to the number of images using it by triggers
+    (see app/crud/blobs.py); orphaned_at is set when it drops to zero.
+    """
+    __tablename__ = "image_blobs"
+
+    sha256 = Column(String, primary_key=True)
+    path = Column(String, nullable=False) # Relative to the image directory, e.g. "ab/ab12...ef.jpg"
+    size = Column(Integer, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+    orphaned_at = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<ImageBlob(sha256='{self.sha256}', path='{self.path}', ref_count={self.ref_count})>"
+
+
+class ImageDirectoryScan(Base):
+    """
+    When the image garbage collector last listed a directory of the image store ("" for the
+    top level, "ab" for a shard), with the directory's modification time at that point and
+    the number of unreferenced files it left for a later pass, plus the files whose image has
+    been deleted since (counted by a trigger). A directory whose modification time is unchanged
+    and that has none pending is skipped without being listed.
+    """
+    __tablename__ = "image_directory_scans"
+
+    directory = Column(String, primary_key=True)
+    mtime_ns = Column(Integer, nullable=False)
+    pending = Column(Integer, nullable=False, default=0)
+    scanned_at = Column(DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<ImageDirectoryScan(directory='{self.directory}', pending={self.pending})>"
@@ -23,6 +23,8 @@ class Item(Base):
     acquired_date = Column(Date, nullable=True)
     # folder_id links an item to its parent folder
     folder_id = Column(Integer, ForeignKey("folders.id"), nullable=True)
+    # Id of the original while a folder clone maps its copies (see app/crud/clone.py), otherwise NULL
+    clone_source_id = Column(Integer, nullable=True)
 
     # Relationship to the Folder model
     folder = relationship("Folder", back_populates="items")
@@ -0,0 +1,25 @@
+# app/models/suggest.py
+# Defines the name suggestion index behind GET /suggest, kept in step with Item.name and
+# Folder.name by the triggers in app/crud/suggest.py.
+
+from sqlalchemy import Column, Integer, String, DateTime, PrimaryKeyConstraint
+from app.db.base import Base # Import Base from the new, centralized location
+
+# One row per distinct item or folder name. `key` is the trimmed name with ASCII letters
+# lowercased (SQLite's lower()), `name` the most recently used spelling, `uses` the number of
+# items or folders currently carrying it and `last_used` when one last got it.
+class NameSuggestion(Base):
+    __tablename__ = "name_suggestions"
+    __table_args__ = (
+        PrimaryKeyConstraint("entity", "key"),
+        {"sqlite_with_rowid": False}, # Rows are stored in key order, so prefix scans read no other pages
+    )
+
+    entity = Column(String, nullable=False) # "item" or "folder"
+    key = Column(String, nullable=False)
+    name = Column(String, nullable=False)
+    uses = Column(Integer, nullable=False, default=0)
+    last_used = Column(DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<NameSuggestion(entity='{self.entity}', name='{self.name}', uses={self.uses})>"
@@ -0,0 +1,32 @@
+# app/models/tag.py
+# Defines the normalized tag index kept in step with Item.tags and Folder.tags by app/crud/tags.py.
+
+from sqlalchemy import Column, Integer, String, ForeignKey
+from app.db.base import Base # Import Base from the new, centralized location
+
+# One row per distinct tag in use. `name` is the normalized (trimmed, lower-case) tag;
+# the counters are the number of items and folders carrying it.
+class Tag(Base):
+    __tablename__ = "tags"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False, unique=True)
+    item_count = Column(Integer, nullable=False, default=0)
+    folder_count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<Tag(id={self.id}, name='{self.name}', item_count={self.item_count}, folder_count={self.folder_count})>"
+
+# Links between items and their tags; the primary key also serves lookups by item
+class ItemTag(Base):
+    __tablename__ = "item_tags"
+
+    item_id = Column(Integer, ForeignKey("items.id", ondelete="CASCADE"), primary_key=True)
+    tag_id = Column(Integer, ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True)
+
+# Links between folders and their tags
+class FolderTag(Base):
+    __tablename__ = "folder_tags"
+
+    folder_id = Column(Integer, ForeignKey("folders.id", ondelete="CASCADE"), primary_key=True)
+    tag_id = Column(Integer, ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True)
@@ -6,11 +6,17 @@
 from .image import ImageBase, ImageCreate, ImageUpdate, ImageResponse
 
 # Then import Item and Folder schemas
-from .item import ItemBase, ItemCreate, ItemUpdate, ItemResponse
-from .folder import FolderBase, FolderCreate, FolderUpdate, FolderResponse
+from .item import ItemBase, ItemCreate, ItemUpdate, ItemResponse, ItemSummary
+from .folder import FolderBase, FolderCreate, FolderUpdate, FolderResponse, FolderCloneResponse, CloneSummary, DeleteSummary, FolderStatsResponse, FolderSummary, FolderTreeNode, ItemTreeNode
 
 # Finally, import other independent schemas
 from .counts import CountsResponse
+from .bulk import ItemBulkMove, FolderBulkMove, ItemPatch, ItemBulkPatch, BulkResult, BulkResponse, ItemBatchResponse, FolderBatchResponse, ImageBatchResponse
+from .imports import ImportRow, ImportRejection, ImportReport
+from .sync import ChangeRecord, ChangeFeed
+from .search import SearchHit
+from .tags import TagUsage
+from .suggest import NameSuggestion
 
 # Rebuild models after all have been defined to resolve forward references
 # The order of rebuild calls should also follow dependencies if possible,
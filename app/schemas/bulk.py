@@ -0,0 +1,74 @@
+# app/schemas/bulk.py
+# Defines Pydantic schemas for bulk move and bulk update requests, and batch reads by id.
+
+from pydantic import BaseModel, Field, field_validator
+from typing import Literal, Optional, List, Union
+from datetime import date
+
+from .folder import FolderResponse, FolderSummary
+from .image import ImageResponse
+from .item import ItemResponse
+
+# Outcome of one id in a bulk request
+BulkStatus = Literal["ok", "not_found", "invalid_target", "cycle"]
+
+# Schema for moving many items to the same folder
+class ItemBulkMove(BaseModel):
+    ids: List[int] = Field(..., min_length=1, description="IDs of the items to move")
+    new_folder_id: Optional[int] = Field(None, description="ID of the target folder (None for the root level)")
+
+# Schema for moving many folders under the same parent
+class FolderBulkMove(BaseModel):
+    ids: List[int] = Field(..., min_length=1, description="IDs of the folders to move")
+    new_parent_id: Optional[int] = Field(None, description="ID of the new parent folder (None for root folders)")
+
+# Partial update of a single item; only the fields that are set are changed
+class ItemPatch(BaseModel):
+    id: int = Field(..., description="ID of the item to update")
+    name: Optional[str] = Field(None, min_length=1, max_length=100, description="Name of the item")
+    description: Optional[str] = Field(None, max_length=500, description="Description of the item")
+    quantity: Optional[float] = Field(None, ge=0.0, description="Quantity of the item")
+    unit: Optional[str] = Field(None, max_length=50, description="Unit of measurement (e.g., 'pcs', 'kg')")
+    notes: Optional[str] = Field(None, max_length=1000, description="Additional notes about the item")
+    tags: Optional[str] = Field(None, description="Comma-separated tags for the item")
+    acquired_date: Optional[date] = Field(None, description="Date the item was acquired")
+    folder_id: Optional[int] = Field(None, description="ID of the folder this item belongs to")
+
+    @field_validator("name")
+    @classmethod
+    def name_not_null(cls, value):
+        # Omit the name to keep it; an explicit null would violate the NOT NULL column
+        if value is None:
+            raise ValueError("name cannot be null")
+        return value
+
+# Schema for updating many items in one request
+class ItemBulkPatch(BaseModel):
+    items: List[ItemPatch] = Field(..., min_length=1, description="Partial updates to apply, one per item")
+
+# Result for a single id of a bulk request
+class BulkResult(BaseModel):
+    id: int = Field(..., description="ID of the item or folder")
+    status: BulkStatus = Field(..., description="Outcome for this id")
+    detail: Optional[str] = Field(None, description="Reason why the id was skipped")
+
+# Schema for responding to a bulk request
+class BulkResponse(BaseModel):
+    succeeded: int = Field(..., description="Number of ids that were applied")
+    failed: int = Field(..., description="Number of ids that were skipped")
+    results: List[BulkResult] = Field(default_factory=list, description="Per-id results, in request order")
+
+# Schema for responding to a batch read of items by id
+class ItemBatchResponse(BaseModel):
+    items: List[ItemResponse] = Field(default_factory=list, description="Items found, in request order")
+    missing: List[int] = Field(default_factory=list, description="Requested ids that do not exist")
+
+# Schema for responding to a batch read of folders by id
+class FolderBatchResponse(BaseModel):
+    folders: Union[List[FolderResponse], List[FolderSummary]] = Field(default_factory=list, description="Folders found, in request order")
+    missing: List[int] = Field(default_factory=list, description="Requested ids that do not exist")
+
+# Schema for responding to a batch read of the images of many items or folders
+class ImageBatchResponse(BaseModel):
+    images: List[ImageResponse] = Field(default_factory=list, description="Images found, grouped in the order of the owner ids")
+    missing: List[int] = Field(default_factory=list, description="Requested item or folder ids that do not exist")
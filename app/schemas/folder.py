@@ -3,7 +3,8 @@
 
 from pydantic import BaseModel, Field
 from typing import Optional, List
-from .item import ItemResponse # Import ItemResponse for nesting
+from datetime import date
+from .item import ItemResponse, ItemSummary # Import item schemas for nesting
 from .image import ImageResponse # Import ImageResponse for nesting
 
 # Base schema for Folder attributes
@@ -41,4 +42,69 @@ class FolderResponse(FolderBase):
         from_attributes = True # Allows Pydantic to read from SQLAlchemy models
 
 # Forward reference for recursive schema definition (FolderResponse containing FolderResponse)
-FolderResponse.model_rebuild()
\ No newline at end of file
+FolderResponse.model_rebuild()
+
+# Number of rows copied by a folder clone
+class CloneSummary(BaseModel):
+    folders: int = Field(..., description="Number of folders copied, including the cloned folder itself")
+    items: int = Field(..., description="Number of items copied")
+    images: int = Field(..., description="Number of folder and item images copied")
+
+# Number of rows removed by a folder delete
+class DeleteSummary(BaseModel):
+    folders: int = Field(..., description="Number of folders deleted, including the folder itself")
+    items: int = Field(..., description="Number of items deleted")
+    images: int = Field(..., description="Number of folder and item images deleted")
+
+# Schema for responding to a folder clone: the new folder plus what was copied
+class FolderCloneResponse(FolderResponse):
+    copied: CloneSummary = Field(..., description="Number of rows copied by the clone")
+
+# Lean schema for folder listings (view=summary): names, counts and nesting, no images or notes
+class FolderSummary(BaseModel):
+    id: int = Field(..., description="Unique ID of the folder")
+    name: str = Field(..., description="Name of the folder")
+    parent_id: Optional[int] = Field(None, description="ID of the parent folder (None for root folders)")
+    item_count: int = Field(0, description="Number of items directly in this folder")
+    subfolder_count: int = Field(0, description="Number of direct subfolders of this folder")
+    # Children are only filled in for folders above the requested depth
+    subfolders: List["FolderSummary"] = Field(default_factory=list, description="Direct subfolders of this folder")
+    items: List[ItemSummary] = Field(default_factory=list, description="Items directly in this folder")
+
+FolderSummary.model_rebuild()
+
+# Schema for subtree rollups of a folder (the folder itself plus all of its descendants)
+class FolderStatsResponse(BaseModel):
+    folder_id: int = Field(..., description="ID of the folder the stats were computed for")
+    total_quantity: float = Field(..., description="Total quantity of all items in the folder and its subfolders")
+    item_count: int = Field(..., description="Number of items in the folder and its subfolders")
+    subfolder_count: int = Field(..., description="Number of subfolders at any depth below the folder")
+    max_depth: int = Field(..., description="Depth of the deepest subfolder (0 if the folder has no subfolders)")
+
+
+# Schemas for the whole-tree view, assembled in memory from flat rows (no nested images)
+class ItemTreeNode(BaseModel):
+    id: int = Field(..., description="Unique ID of the item")
+    name: str = Field(..., description="Name of the item")
+    description: Optional[str] = Field(None, description="Description of the item")
+    quantity: Optional[float] = Field(None, description="Quantity of the item")
+    unit: Optional[str] = Field(None, description="Unit of measurement")
+    notes: Optional[str] = Field(None, description="Additional notes about the item")
+    tags: Optional[str] = Field(None, description="Comma-separated tags for the item")
+    acquired_date: Optional[date] = Field(None, description="Date the item was acquired")
+    folder_id: Optional[int] = Field(None, description="ID of the folder this item belongs to")
+
+class FolderTreeNode(BaseModel):
+    id: Optional[int] = Field(None, description="Unique ID of the folder (None for the inventory root)")
+    name: str = Field(..., description="Name of the folder")
+    description: Optional[str] = Field(None, description="Description of the folder")
+    notes: Optional[str] = Field(None, description="Notes for the folder")
+    tags: Optional[str] = Field(None, description="Tags for the folder, comma-separated")
+    parent_id: Optional[int] = Field(None, description="ID of the parent folder (None for root folders)")
+    item_count: int = Field(0, description="Number of items directly in this folder")
+    subfolder_count: int = Field(0, description="Number of direct subfolders of this folder")
+    # Children are only filled in for folders above the requested max_depth
+    subfolders: List["FolderTreeNode"] = Field(default_factory=list, description="Direct subfolders of this folder")
+    items: List[ItemTreeNode] = Field(default_factory=list, description="Items directly in this folder")
+
+FolderTreeNode.model_rebuild()
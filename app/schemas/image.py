@@ -2,7 +2,7 @@
 # Defines Pydantic schemas for Image.
 
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Dict, Optional
 
 # Base schema for Image attributes
 class ImageBase(BaseModel):
@@ -23,6 +23,10 @@ class ImageUpdate(ImageBase):
 # Schema for reading/responding with Image data
 class ImageResponse(ImageBase):
     id: int = Field(..., description="Unique ID of the image")
+    sha256: Optional[str] = Field(None, description="SHA-256 of the stored file; images with the same content share one file")
+    variants: Optional[Dict[str, str]] = Field(
+        None, description="URLs of downscaled copies by size (thumb, small, medium); null until they have been generated"
+    )
 
     class Config:
         from_attributes = True # Allows Pydantic to read from SQLAlchemy models
@@ -0,0 +1,30 @@
+# app/schemas/imports.py
+# Defines Pydantic schemas for bulk imports of items from CSV or NDJSON.
+
+from pydantic import BaseModel, Field
+from typing import Literal, Optional, List
+
+from .item import ItemBase
+
+# How imported rows are matched against existing items: never (always insert),
+# by item id, or by name within the same folder
+ImportKey = Literal["id", "name"]
+
+# One imported row. Either folder_path or folder_id places the item; folder_path wins.
+class ImportRow(ItemBase):
+    id: Optional[int] = Field(None, description="ID of the item, used when upserting by id")
+    folder_path: Optional[str] = Field(None, description="Folder names from the root joined by '/'; missing folders are created")
+
+# A row that was not imported
+class ImportRejection(BaseModel):
+    line: int = Field(..., description="Line number of the row in the uploaded file")
+    detail: str = Field(..., description="Reason why the row was rejected")
+
+# Schema for responding to an import
+class ImportReport(BaseModel):
+    dry_run: bool = Field(..., description="True if nothing was written")
+    created: int = Field(..., description="Number of items created")
+    updated: int = Field(..., description="Number of existing items updated")
+    rejected: int = Field(..., description="Number of rows rejected")
+    folders_created: int = Field(..., description="Number of folders created for folder paths and exported folders")
+    rejections: List[ImportRejection] = Field(default_factory=list, description="Rejected rows, in file order (the first 1000)")
@@ -34,6 +34,17 @@ class ItemResponse(ItemBase):
     class Config:
         from_attributes = True # Allows Pydantic to read from SQLAlchemy models
 
+# Lean schema for listings that only need to name and count an item (no nested images)
+class ItemSummary(BaseModel):
+    id: int = Field(..., description="Unique ID of the item")
+    name: str = Field(..., description="Name of the item")
+    quantity: Optional[float] = Field(None, description="Quantity of the item")
+    unit: Optional[str] = Field(None, description="Unit of measurement")
+    folder_id: Optional[int] = Field(None, description="ID of the folder this item belongs to")
+
+    class Config:
+        from_attributes = True # Allows Pydantic to read from SQLAlchemy models
+
 # Forward reference for recursive schema definition if needed (e.g., to ImageResponse)
 # ItemResponse.model_rebuild() # Rebuild ItemResponse in case it has forward references (e.g., to ImageResponse)
 # This rebuild is handled by app/schemas/__init__.py for overall consistency.
@@ -0,0 +1,16 @@
+# app/schemas/search.py
+# Defines Pydantic schemas for full-text search results.
+
+from pydantic import BaseModel, Field
+from typing import Literal, Optional
+
+# One item or folder matching a search
+class SearchHit(BaseModel):
+    type: Literal["item", "folder"] = Field(..., description="Whether the hit is an item or a folder")
+    id: int = Field(..., description="ID of the item or folder")
+    name: str = Field(..., description="Name of the item or folder")
+    description: Optional[str] = Field(None, description="Description of the item or folder")
+    tags: Optional[str] = Field(None, description="Comma-separated tags")
+    folder_id: Optional[int] = Field(None, description="Folder holding the item, or parent of the folder (None at the root level)")
+    folder_path: Optional[str] = Field(None, description="Names of that folder and its ancestors joined by '/' (None at the root level)")
+    rank: float = Field(..., description="BM25 relevance score; lower is a better match")
@@ -0,0 +1,12 @@
+# app/schemas/suggest.py
+# Defines Pydantic schemas for name suggestions.
+
+from pydantic import BaseModel, Field
+from typing import Literal
+
+# A distinct item or folder name suggested for typed text
+class NameSuggestion(BaseModel):
+    type: Literal["item", "folder"] = Field(..., description="Whether items or folders use the name")
+    name: str = Field(..., description="The name, in its most recently used spelling")
+    uses: int = Field(..., description="Number of items or folders with this name")
+    fuzzy: bool = Field(..., description="True if the name starts with the typed text with one typo corrected")
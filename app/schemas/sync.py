@@ -0,0 +1,20 @@
+# app/schemas/sync.py
+# Defines Pydantic schemas for the GET /changes delta sync.
+
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Literal, Optional
+
+# One changed row: its latest state, or a tombstone
+class ChangeRecord(BaseModel):
+    seq: int = Field(..., description="Sequence number of the row's latest change")
+    entity: Literal["folder", "item", "image"] = Field(..., description="Kind of row that changed")
+    id: int = Field(..., description="ID of the row that changed")
+    deleted: bool = Field(..., description="True if the row was deleted")
+    data: Optional[Dict[str, Any]] = Field(None, description="Current columns of the row, shaped like its GET /export record (None if deleted)")
+
+# One page of changes
+class ChangeFeed(BaseModel):
+    epoch: str = Field(..., description="Identifies the database; sequence numbers from another epoch are meaningless")
+    changes: List[ChangeRecord] = Field(..., description="Changes in sequence order")
+    next_since: int = Field(..., description="Pass as `since` to get the changes after this page")
+    has_more: bool = Field(..., description="True if more changes follow this page")
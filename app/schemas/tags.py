@@ -0,0 +1,10 @@
+# app/schemas/tags.py
+# Defines Pydantic schemas for the tag index.
+
+from pydantic import BaseModel, Field
+
+# A tag in use, with the number of items and folders carrying it
+class TagUsage(BaseModel):
+    name: str = Field(..., description="Tag name, lowercased")
+    item_count: int = Field(..., description="Number of items with this tag")
+    folder_count: int = Field(..., description="Number of folders with this tag")
@@ -0,0 +1,126 @@
+# benchmarks/bench_serialization.py
+# Compares the two serialization paths of the list endpoints: ORM objects validated through
+# the Pydantic response schemas, and the fast path that builds dicts from Core rows and
+# encodes them with orjson (when installed). Also checks that both produce identical bytes.
+#
+# Usage (from the repository root):
+#   python -m benchmarks.bench_serialization
+#   python -m benchmarks.bench_serialization --sizes 1000 10000 100000 --repeat 3
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+# Point the app at a throwaway database before anything imports app.db.session
+_tmp_dir = tempfile.mkdtemp(prefix="homeorg-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmp_dir}/bench.db"
+
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, insert
+
+import app.api.fields as api_fields
+from app import models
+from app.core import fastjson
+from app.crud import aggregates, hierarchy
+from app.db.session import SessionLocal, create_database_and_tables
+from app.main import app
+
+PAGE_SIZE = 1000 # Largest page the list endpoints accept
+ITEMS_PER_FOLDER = 50
+IMAGE_EVERY = 5 # One image for every fifth item
+
+
+def seed(db, item_count: int):
+    """
+    Replaces the inventory with `item_count` items spread over folders, some with images.
+    """
+    for model in (models.Image, models.Item, models.FolderStats, models.Folder):
+        db.execute(delete(model))
+    folder_count = max(1, item_count // ITEMS_PER_FOLDER)
+    db.execute(insert(models.Folder), [
+        {"id": i, "name": f"Folder {i}", "description": "Benchmark folder", "parent_id": None}
+        for i in range(1, folder_count + 1)
+    ])
+    rng = random.Random(item_count)
+    db.execute(insert(models.Item), [
+        {
+            "id": i,
+            "name": f"Item {i} ünïcode",
+            "description": "A benchmark item with a moderately long description",
+            "quantity": round(rng.uniform(0, 500), 2),
+            "unit": rng.choice(["pcs", "kg", None]),
+            "notes": None if i % 3 else "Some notes",
+            "tags": "bench,item",
+            "acquired_date": date(2020, 1, 1) + timedelta(days=i % 1500),
+            "folder_id": (i % folder_count) + 1,
+        }
+        for i in range(1, item_count + 1)
+    ])
+    db.execute(insert(models.Image), [
+        {"filename": f"item{i}.jpg", "filepath": f"/static_images/item{i}.jpg", "item_id": i}
+        for i in range(1, item_count + 1, IMAGE_EVERY)
+    ])
+    db.commit()
+    hierarchy.rebuild_paths(db)
+    aggregates.repair(db)
+
+def fetch_all(client, url: str) -> list:
+    """
+    Follows the cursor of a list endpoint and returns the raw body of every page.
+    """
+    bodies, cursor = [], None
+    while True:
+        response = client.get(url + (f"&after={cursor}" if cursor else ""))
+        response.raise_for_status()
+        bodies.append(response.content)
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return bodies
+
+def timed(client, url: str, fast: bool, repeat: int):
+    api_fields.FAST_JSON_ENABLED = fast
+    best, bodies = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        bodies = fetch_all(client, url)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, bodies
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark ORM+Pydantic vs Core+fast JSON list serialization")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="Item counts to benchmark")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement, the best one is reported")
+    args = parser.parse_args(argv)
+
+    create_database_and_tables()
+    client = TestClient(app)
+    encoder = "orjson" if fastjson.orjson is not None else "json (orjson not installed)"
+    print(f"Fast path encoder: {encoder}")
+    print(f"{'endpoint':<34}{'items':>8}{'pydantic (s)':>14}{'fast (s)':>10}{'speedup':>9}  identical")
+
+    endpoints = [
+        ("/items/", f"/items/?limit={PAGE_SIZE}"),
+        ("/folders/ (depth=1)", f"/folders/?limit={PAGE_SIZE}&depth=1"),
+    ]
+    for size in args.sizes:
+        db = SessionLocal()
+        try:
+            seed(db, size)
+        finally:
+            db.close()
+        for label, url in endpoints:
+            slow, slow_bodies = timed(client, url, fast=False, repeat=args.repeat)
+            fast, fast_bodies = timed(client, url, fast=True, repeat=args.repeat)
+            identical = slow_bodies == fast_bodies
+            print(f"{label:<34}{size:>8}{slow:>14.3f}{fast:>10.3f}{slow / fast:>8.1f}x  {identical}")
+            if not identical:
+                return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
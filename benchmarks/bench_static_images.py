@@ -0,0 +1,142 @@
+# benchmarks/bench_static_images.py
+# Compares serving the image directory with Starlette's plain StaticFiles mount and with
+# ImageFiles (immutable caching, strong ETags, byte ranges, large-chunk or zero-copy sends).
+# Each scenario replays what a browser requests for a page of images: a first view, a repeat
+# view (StaticFiles files are revalidated, immutable files are not requested at all) and a
+# media player or resumed download asking for a byte range. StaticFiles ignores Range and
+# sends the whole file, so compare that row by MiB sent as well as by time. Requests are sent
+# to the ASGI apps directly, so the numbers are the server-side cost without an HTTP
+# transport. Also checks that both mounts return identical bodies.
+#
+# Usage (from the repository root):
+#   python -m benchmarks.bench_static_images
+#   python -m benchmarks.bench_static_images --thumbnails 500 --originals 20 --repeat 5
+
+import argparse
+import asyncio
+import hashlib
+import os
+import sys
+import tempfile
+import time
+
+from starlette.datastructures import Headers
+from starlette.staticfiles import StaticFiles
+
+from app.core.imagefiles import ImageFiles
+from app.core.uploads import blob_name
+
+THUMBNAIL_BYTES = 20 * 1024
+ORIGINAL_BYTES = 2 * 1024 * 1024
+RANGE_BYTES = 64 * 1024
+
+
+def write_files(directory: str, count: int, size: int) -> list:
+    """
+    Writes `count` random files of `size` bytes under their content-addressed names. Returns their URLs.
+    """
+    urls = []
+    for _ in range(count):
+        data = os.urandom(size)
+        name = blob_name(hashlib.sha256(data).hexdigest(), "image.jpg")
+        os.makedirs(os.path.join(directory, os.path.dirname(name)), exist_ok=True)
+        with open(os.path.join(directory, name), "wb") as file:
+            file.write(data)
+        urls.append(name)
+    return urls
+
+async def get(app: StaticFiles, path: str, headers: dict = None):
+    """
+    Sends a GET straight to an ASGI app. Returns (status, response headers, body).
+    """
+    scope = {
+        "type": "http", "method": "GET", "path": f"/{path}", "root_path": "", "query_string": b"",
+        "headers": [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()],
+    }
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    body = b"".join(message.get("body", b"") for message in messages[1:])
+    return messages[0]["status"], Headers(raw=messages[0]["headers"]), body
+
+async def first_view(app, urls):
+    for url in urls:
+        yield url, await get(app, url)
+
+async def repeat_view(app, urls, etags: dict):
+    for url in urls:
+        if etags[url] is None: # Still fresh in the browser cache, no request made
+            continue
+        yield url, await get(app, url, {"If-None-Match": etags[url]})
+
+async def byte_range(app, urls):
+    for url in urls:
+        yield url, await get(app, url, {"Range": f"bytes=0-{RANGE_BYTES - 1}"})
+
+async def timed(requests, repeat: int):
+    """
+    Runs a scenario `repeat` times. Returns (best seconds, requests made, body bytes received, {url: body}).
+    """
+    best, count, received, bodies = None, 0, 0, {}
+    for _ in range(repeat):
+        count, received, bodies = 0, 0, {}
+        start = time.perf_counter()
+        async for url, (status, _, body) in requests():
+            if status >= 400:
+                raise RuntimeError(f"GET {url} failed with {status}")
+            count += 1
+            received += len(body)
+            bodies[url] = body
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, count, received, bodies
+
+async def run(thumbnails: list, originals: list, mounts: dict, repeat: int) -> int:
+    # What the browser revalidates on a repeat view: None for files it may reuse without asking
+    etags = {}
+    for name, app in mounts.items():
+        etags[name] = {}
+        async for url, (_, headers, _) in first_view(app, thumbnails + originals):
+            etags[name][url] = None if "immutable" in headers.get("cache-control", "") else headers["etag"]
+    scenarios = [
+        ("thumbnails, first view", lambda app, name: first_view(app, thumbnails)),
+        ("originals, first view", lambda app, name: first_view(app, originals)),
+        ("thumbnails, repeat view", lambda app, name: repeat_view(app, thumbnails, etags[name])),
+        # StaticFiles answers with the whole file, ImageFiles with the range
+        (f"originals, {RANGE_BYTES // 1024} KiB range asked", lambda app, name: byte_range(app, originals)),
+    ]
+
+    print(f"{'scenario':<34}{'mount':<13}{'requests':>9}{'MiB sent':>10}{'time (s)':>10}{'req/s':>9}{'MiB/s':>9}")
+    for label, scenario in scenarios:
+        results = {}
+        for name, app in mounts.items():
+            seconds, count, received, bodies = await timed(lambda: scenario(app, name), repeat)
+            results[name] = bodies
+            rate = f"{count / seconds:>9.0f}{received / (1024 * 1024) / seconds:>9.0f}" if count else f"{'-':>9}{'-':>9}"
+            print(f"{label:<34}{name:<13}{count:>9}{received / (1024 * 1024):>10.2f}{seconds:>10.3f}{rate}")
+        if "first view" in label and results["StaticFiles"] != results["ImageFiles"]:
+            print("Bodies differ between the mounts")
+            return 1
+    return 0
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark StaticFiles vs ImageFiles for the image directory")
+    parser.add_argument("--thumbnails", type=int, default=200, help=f"Files of {THUMBNAIL_BYTES // 1024} KiB")
+    parser.add_argument("--originals", type=int, default=10, help=f"Files of {ORIGINAL_BYTES // (1024 * 1024)} MiB")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement, the best one is reported")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="homeorg-bench-images-") as directory:
+        thumbnails = write_files(directory, args.thumbnails, THUMBNAIL_BYTES)
+        originals = write_files(directory, args.originals, ORIGINAL_BYTES)
+        mounts = {"StaticFiles": StaticFiles(directory=directory), "ImageFiles": ImageFiles(directory=directory)}
+        return asyncio.run(run(thumbnails, originals, mounts, args.repeat))
+
+if __name__ == "__main__":
+    sys.exit(main())
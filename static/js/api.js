@@ -11,16 +11,42 @@ async function fetchJson(url) {
     }
 }
 
+// Follows the X-Next-Cursor header of a keyset-paginated list endpoint and returns every page concatenated
+async function fetchAllPages(url) {
+    const results = [];
+    let cursor = null;
+    do {
+        const pageUrl = new URL(url, window.location.origin);
+        if (cursor) pageUrl.searchParams.set('after', cursor);
+        const response = await fetch(pageUrl);
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        results.push(...await response.json());
+        cursor = response.headers.get('X-Next-Cursor');
+    } while (cursor);
+    return results;
+}
+
 export async function getCounts() {
     return await fetchJson('/counts/');
 }
 
 export async function getItems() {
-    return await fetchJson('/items/');
+    return await fetchAllPages('/items/?limit=1000');
 }
 
 export async function getFolders() {
-    return await fetchJson('/folders/');
+    // Folder pickers only need names and parents, so skip nested items and images
+    return await fetchAllPages('/folders/?view=summary&depth=0&limit=1000');
+}
+
+export async function getTree(rootId = null, maxDepth = null) {
+    const params = new URLSearchParams();
+    if (rootId !== null) params.set('root_id', rootId);
+    if (maxDepth !== null) params.set('max_depth', maxDepth);
+    const query = params.toString();
+    return await fetchJson(`/folders/tree${query ? `?${query}` : ''}`);
 }
 
 export async function getItem(id) {
@@ -32,19 +58,67 @@ export async function getFolder(id) {
 }
 
 export async function getSubfolders(folderId) {
-    return await fetchJson(`/folders/${folderId}/folders`);
+    return await fetchAllPages(`/folders/${folderId}/folders`);
 }
 
 export async function getItemsInFolder(folderId) {
-    return await fetchJson(`/folders/${folderId}/items`);
+    return await fetchAllPages(`/folders/${folderId}/items`);
 }
 
 export async function getImagesForItem(itemId) {
-    return await fetchJson(`/images/?item_id=${itemId}`);
+    return await fetchAllPages(`/images/?item_id=${itemId}`);
 }
 
 export async function getImagesForFolder(folderId) {
-    return await fetchJson(`/images/?folder_id=${folderId}`);
+    return await fetchAllPages(`/images/?folder_id=${folderId}`);
+}
+
+// Batch endpoints accept at most this many ids per request
+const BATCH_SIZE = 1000;
+
+// Fetches the images of many items (ownerParam 'item_ids') or folders ('folder_ids')
+// with one request per BATCH_SIZE ids, and returns them grouped as { ownerId: [images] }
+async function getImagesForOwners(ownerParam, ownerKey, ids) {
+    const byOwner = {};
+    ids.forEach(id => { byOwner[id] = []; });
+    for (let start = 0; start < ids.length; start += BATCH_SIZE) {
+        const batch = ids.slice(start, start + BATCH_SIZE);
+        const { images } = await fetchJson(`/images/batch?${ownerParam}=${batch.join(',')}`);
+        images.forEach(image => byOwner[image[ownerKey]].push(image));
+    }
+    return byOwner;
+}
+
+export async function getImagesForItems(itemIds) {
+    return await getImagesForOwners('item_ids', 'item_id', itemIds);
+}
+
+export async function getImagesForFolders(folderIds) {
+    return await getImagesForOwners('folder_ids', 'folder_id', folderIds);
+}
+
+// Fetches many items, or folder summaries with their counts, by id; ids that no longer exist are left out
+export async function getItemsByIds(ids) {
+    const items = [];
+    for (let start = 0; start < ids.length; start += BATCH_SIZE) {
+        const batch = await fetchJson(`/items/batch?ids=${ids.slice(start, start + BATCH_SIZE).join(',')}`);
+        items.push(...batch.items);
+    }
+    return items;
+}
+
+export async function getFolderSummariesByIds(ids) {
+    const folders = [];
+    for (let start = 0; start < ids.length; start += BATCH_SIZE) {
+        const batch = await fetchJson(`/folders/batch?ids=${ids.slice(start, start + BATCH_SIZE).join(',')}&view=summary&depth=0`);
+        folders.push(...batch.folders);
+    }
+    return folders;
+}
+
+export async function getNameSuggestions(prefix, type) {
+    const params = new URLSearchParams({ prefix, type });
+    return await fetchJson(`/suggest?${params}`);
 }
 
 export async function postFormData(url, formData) {
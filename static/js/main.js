@@ -1,10 +1,13 @@
-import { getCounts, getItems, getFolders, postFormData, putFormData, getFolder, getSubfolders, getItemsInFolder } from './api.js';
+import { getCounts, getTree, getItemsByIds, getFolderSummariesByIds, getNameSuggestions, postFormData, putFormData } from './api.js';
 import { displayItems, displayFolders, showMainGrid, switchModalTab, openAddModal, closeAddEditModal, handleFileSelection, showDetails, openFolderSelectionModal, closeFolderSelectionModal, showMessage } from './ui.js';
 
-let allItems = [];
 let currentFolderId = null;
 window.currentFolderId = currentFolderId;
 let moveOperation = { type: null, data: null, selectedFolderId: null };
+// What the main grid shows, kept so that change events can patch it instead of reloading it
+let currentView = { title: "HomeOrg", folders: [], items: [] };
+let changeStream = null;
+let pendingPatch = Promise.resolve(); // Change events are applied one after the other
 
 function handleFolderClick(folderId) {
     currentFolderId = folderId;
@@ -23,6 +26,40 @@ function handleFolderSelected(folderId) {
     moveOperation.selectedFolderId = folderId;
 }
 
+const SUGGEST_DELAY_MS = 150; // Pause in typing before name suggestions are fetched
+
+// Offers existing item or folder names as the user types, through a <datalist> attached to the input
+function attachNameSuggestions(inputId, type) {
+    const input = document.getElementById(inputId);
+    const list = document.createElement('datalist');
+    list.id = `${inputId}Suggestions`;
+    input.after(list);
+    input.setAttribute('list', list.id);
+    input.setAttribute('autocomplete', 'off');
+    let timer = null;
+    let latest = 0; // Responses to older keystrokes are dropped
+    input.addEventListener('input', () => {
+        clearTimeout(timer);
+        const prefix = input.value;
+        if (!prefix.trim()) {
+            list.replaceChildren();
+            return;
+        }
+        timer = setTimeout(async () => {
+            const request = ++latest;
+            try {
+                const suggestions = await getNameSuggestions(prefix, type);
+                if (request !== latest) return;
+                list.replaceChildren(...suggestions
+                    .filter(suggestion => suggestion.name !== prefix)
+                    .map(suggestion => new Option('', suggestion.name)));
+            } catch (error) {
+                list.replaceChildren();
+            }
+        }, SUGGEST_DELAY_MS);
+    });
+}
+
 function initialLoad() {
     const hash = location.hash;
     if (hash) {
@@ -33,7 +70,7 @@ function initialLoad() {
             currentFolderId = parseInt(folderIdPart.split('=')[1]);
             window.currentFolderId = currentFolderId;
             const [type, id] = detailsPart.split('=');
-            showDetails(type, parseInt(id), loadFolderView);
+            showDetails(type, parseInt(id), refreshAfterWrite);
             return;
         } else { // Folder view
             const folderId = parseInt(hash.split('=')[1]);
@@ -56,10 +93,10 @@ async function loadRootView() {
     showMainGrid(currentFolderId);
 
     try {
-        const [folders, items] = await Promise.all([getFolders(), getItems()]);
-        allItems = items;
-        displayFolders(folders.filter(f => f.parent_id === null), handleFolderClick, loadFolderView, handleMoveClick);
-        displayItems(items, currentFolderId, loadFolderView, handleMoveClick);
+        // One level of the tree holds the root folders (with their counts) and the root-level items
+        const tree = await getTree(null, 1);
+        currentView = { title: "HomeOrg", folders: tree.subfolders, items: tree.items };
+        renderView();
         updateCountsUI();
     } catch (error) {
         console.error('Error loading root view:', error);
@@ -75,19 +112,11 @@ async function loadFolderView() {
     showMainGrid(currentFolderId);
 
     try {
-        const folder = await getFolder(currentFolderId);
+        const folder = await getTree(currentFolderId, 1);
+        currentView = { title: folder.name, folders: folder.subfolders, items: folder.items };
         document.getElementById('header-title').textContent = folder.name;
 
-        const [subFolders, itemsInFolder] = await Promise.all([
-            getSubfolders(currentFolderId),
-            getItemsInFolder(currentFolderId)
-        ]);
-
-        const items = await getItems();
-        allItems = items;
-
-        displayFolders(subFolders, handleFolderClick, loadFolderView, handleMoveClick);
-        displayItems(itemsInFolder, currentFolderId, loadFolderView, handleMoveClick);
+        renderView();
         updateCountsUI();
 
     } catch (error) {
@@ -97,20 +126,145 @@ async function loadFolderView() {
     }
 }
 
+function renderView() {
+    displayFolders(currentView.folders, handleFolderClick, refreshAfterWrite, handleMoveClick);
+    displayItems(currentView.items, currentFolderId, refreshAfterWrite, handleMoveClick);
+}
+
+// Returns from the details view to the grid of the current folder
+function showGridView() {
+    showMainGrid(currentFolderId);
+    document.getElementById('header-title').textContent = currentView.title;
+}
+
+function showCounts(counts) {
+    document.getElementById('folder-count').textContent = counts.total_folders;
+    document.getElementById('item-count').textContent = counts.total_items;
+    document.getElementById('total-quantity').textContent = counts.total_quantity;
+}
+
 async function updateCountsUI() {
     try {
-        const counts = await getCounts();
-        document.getElementById('folder-count').textContent = counts.total_folders;
-        document.getElementById('item-count').textContent = counts.total_items;
-        document.getElementById('total-quantity').textContent = counts.total_quantity;
+        showCounts(await getCounts());
     } catch (error) {
         console.error('Error fetching counts:', error);
         showMessage('Failed to fetch counts.', true);
     }
 }
 
+// Called after this page wrote something. While the change stream is connected the write
+// comes back as a change event and patches the view, otherwise the view is reloaded.
+function refreshAfterWrite() {
+    if (changeStream && changeStream.readyState === EventSource.OPEN) {
+        return;
+    }
+    loadFolderView();
+}
+
+function upsertById(list, entry) {
+    const index = list.findIndex(existing => existing.id === entry.id);
+    if (index === -1) {
+        list.push(entry);
+    } else {
+        list[index] = entry;
+    }
+}
+
+function removeById(list, id) {
+    const index = list.findIndex(existing => existing.id === id);
+    if (index !== -1) {
+        list.splice(index, 1);
+    }
+}
+
+// Applies one change message from GET /events to the current view: entries that left the
+// current folder are removed, and the entries that changed or arrived are refetched by id.
+async function applyChanges(message) {
+    if (message.counts) {
+        showCounts(message.counts);
+    }
+    if (message.reload) {
+        await loadFolderView();
+        return;
+    }
+
+    const itemIds = new Set();
+    const folderIds = new Set();
+    let dirty = false;
+    const isShown = id => currentView.folders.some(folder => folder.id === id);
+
+    for (const change of message.changes || []) {
+        if (change.entity === 'folder' && change.id === currentFolderId) {
+            if (change.op === 'delete') {
+                showMessage('This folder was deleted.', true);
+                await loadRootView();
+                return;
+            }
+            await loadFolderView(); // Renamed or moved: the title may have changed
+            return;
+        }
+        if (change.entity === 'image') {
+            // Thumbnails are fetched again when the grid is redrawn
+            dirty = dirty || isShown(change.folder_id) || currentView.items.some(item => item.id === change.item_id);
+            continue;
+        }
+        // Folder cards show counts, so the folders an entry left or entered are refetched
+        [change.folder_id, change.from_folder_id].filter(isShown).forEach(id => folderIds.add(id));
+
+        if (change.op === 'delete' || change.folder_id !== currentFolderId) {
+            const list = change.entity === 'item' ? currentView.items : currentView.folders;
+            dirty = dirty || list.some(entry => entry.id === change.id);
+            removeById(list, change.id);
+            if (change.entity === 'folder') {
+                folderIds.delete(change.id);
+            }
+        } else if (change.entity === 'item') {
+            itemIds.add(change.id);
+        } else {
+            folderIds.add(change.id);
+        }
+    }
+
+    if (itemIds.size > 0) {
+        (await getItemsByIds([...itemIds])).forEach(item => upsertById(currentView.items, item));
+        dirty = true;
+    }
+    if (folderIds.size > 0) {
+        (await getFolderSummariesByIds([...folderIds])).forEach(folder => upsertById(currentView.folders, folder));
+        dirty = true;
+    }
+    if (dirty) {
+        renderView();
+    }
+}
+
+function connectChangeStream() {
+    if (!window.EventSource) {
+        return; // Without the stream every write reloads the view
+    }
+    changeStream = new EventSource('/events');
+    changeStream.addEventListener('change', (event) => {
+        const message = JSON.parse(event.data);
+        pendingPatch = pendingPatch
+            .then(() => applyChanges(message))
+            .catch(error => {
+                console.error('Error applying change event:', error);
+                loadFolderView();
+            });
+    });
+    // EventSource reconnects by itself; writes missed meanwhile are picked up by reloading
+    let connectedBefore = false;
+    changeStream.addEventListener('open', () => {
+        if (connectedBefore) {
+            loadFolderView();
+        }
+        connectedBefore = true;
+    });
+}
+
 document.addEventListener('DOMContentLoaded', () => {
     initialLoad();
+    connectChangeStream();
 
     window.addEventListener('popstate', (event) => {
         if (event.state) {
@@ -176,7 +330,7 @@ document.addEventListener('DOMContentLoaded', () => {
             await postFormData(url, formData);
             showMessage(successMessage);
             closeAddEditModal();
-            loadFolderView();
+            refreshAfterWrite();
         } catch (error) {
             showMessage(`${failureMessage}: ${error.message}`, true);
         }
@@ -207,6 +361,11 @@ document.addEventListener('DOMContentLoaded', () => {
     handleFileSelection('modalFolderImageFile', 'selectedFolderImageName');
     handleFileSelection('modalFolderCameraFile', 'selectedFolderImageName');
 
+    attachNameSuggestions('modalItemName', 'item');
+    attachNameSuggestions('detailsItemName', 'item');
+    attachNameSuggestions('modalFolderName', 'folder');
+    attachNameSuggestions('detailsFolderName', 'folder');
+
     const fab = document.getElementById('add-item-fab');
     window.addEventListener('scroll', () => {
         if (window.scrollY > 0) {
@@ -233,8 +392,8 @@ document.addEventListener('DOMContentLoaded', () => {
         try {
             await putFormData(`/items/${itemId}`, formData);
             showMessage('Item updated successfully!');
-            showMainGrid(currentFolderId);
-            loadFolderView();
+            showGridView();
+            refreshAfterWrite();
         } catch (error) {
             showMessage(`Failed to update item: ${error.message}`, true);
         }
@@ -247,8 +406,8 @@ document.addEventListener('DOMContentLoaded', () => {
         try {
             await putFormData(`/folders/${folderId}`, formData);
             showMessage('Folder updated successfully!');
-            showMainGrid(currentFolderId);
-            loadFolderView();
+            showGridView();
+            refreshAfterWrite();
         } catch (error) {
             showMessage(`Failed to update folder: ${error.message}`, true);
         }
@@ -281,7 +440,7 @@ document.addEventListener('DOMContentLoaded', () => {
             if (response.ok) {
                 showMessage(`${moveOperation.type.charAt(0).toUpperCase() + moveOperation.type.slice(1)} moved successfully.`);
                 closeFolderSelectionModal();
-                loadFolderView();
+                refreshAfterWrite();
             } else {
                 const error = await response.json().catch(() => ({ detail: 'Unknown error' }));
                 showMessage(`Error moving: ${error.detail}`, true);
@@ -1,4 +1,9 @@
-import { getImagesForItem, getImagesForFolder, getSubfolders, getItemsInFolder, getFolder, getItem, getFolders } from './api.js';
+import { getImagesForItem, getImagesForItems, getImagesForFolder, getImagesForFolders, getFolder, getItem, getFolders } from './api.js';
+
+// URL of a downscaled copy of an image, or of the original while its variants are being generated
+function imageVariant(image, size) {
+    return (image.variants && image.variants[size]) || image.filepath;
+}
 
 export function showMessage(message, isError = false) {
     const messageBox = document.getElementById('messageBox');
@@ -18,12 +23,15 @@ export async function displayItems(items, currentFolderId, onViewRefresh, onMove
         currentFolderId === null ? item.folder_id === null : item.folder_id === currentFolderId
     );
 
+    // One request for the images of every card instead of one per item
+    const imagesByItem = await getImagesForItems(filteredItems.map(item => item.id));
+
     for (const item of filteredItems) {
         const itemCard = document.createElement('div');
         itemCard.className = 'item-card';
 
-        const images = await getImagesForItem(item.id);
-        const imageUrl = (images && images.length > 0) ? `/static_images/${images[0].filename}` : 'https://placehold.co/60x60';
+        const images = imagesByItem[item.id];
+        const imageUrl = (images && images.length > 0) ? imageVariant(images[0], 'thumb') : 'https://placehold.co/60x60';
 
         let displayUnit = item.unit || '';
         const match = displayUnit.match(/\(([^)]+)\)/);
@@ -57,18 +65,18 @@ export async function displayFolders(folders, onFolderClick, onViewRefresh, onMo
     folderGrid.innerHTML = '';
 
     const sortedFolders = folders.sort((a, b) => a.name.localeCompare(b.name));
+    const imagesByFolder = await getImagesForFolders(sortedFolders.map(folder => folder.id));
 
     for (const folder of sortedFolders) {
         const folderCard = document.createElement('div');
         folderCard.className = 'folder-card';
 
-        const [subfolderCountData, itemCountData, images] = await Promise.all([
-            getSubfolders(folder.id).then(res => ({ subfolder_count: res.length })),
-            getItemsInFolder(folder.id).then(res => ({ item_count: res.length })),
-            getImagesForFolder(folder.id)
-        ]);
+        // Folder tree nodes already carry their direct subfolder and item counts
+        const subfolderCountData = { subfolder_count: folder.subfolder_count };
+        const itemCountData = { item_count: folder.item_count };
+        const images = imagesByFolder[folder.id];
 
-        const imageUrl = (images && images.length > 0) ? `/static_images/${images[0].filename}` : 'https://placehold.co/60x60';
+        const imageUrl = (images && images.length > 0) ? imageVariant(images[0], 'thumb') : 'https://placehold.co/60x60';
 
         folderCard.innerHTML = `
             <img src="${imageUrl}" alt="${folder.name}" class="thumbnail">
@@ -235,7 +243,7 @@ export async function showDetails(type, id, onViewRefresh) {
         const data = type === 'item' ? await getItem(id) : await getFolder(id);
         const images = type === 'item' ? await getImagesForItem(id) : await getImagesForFolder(id);
 
-        detailsImage.src = (images && images.length > 0) ? `/static_images/${images[0].filename}` : 'https://placehold.co/400x400';
+        detailsImage.src = (images && images.length > 0) ? imageVariant(images[0], 'small') : 'https://placehold.co/400x400';
         document.getElementById('header-title').textContent = data.name;
 
         if (type === 'item') {
@@ -0,0 +1,36 @@
+# tests/conftest.py
+# Shared fixtures. The tests run against a throwaway SQLite database, so the engine's URL
+# is set before anything from the app is imported.
+
+import os
+import tempfile
+
+import pytest
+
+_database_dir = tempfile.TemporaryDirectory(prefix="homeorg-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_database_dir.name}/test.db"
+
+from app import models # Registers the tables with Base.metadata
+from app.db.base import Base
+from app.db.session import SessionLocal, create_database_and_tables, engine
+
+
+def reset_database():
+    """
+    Drops and recreates every table, leaving an empty database.
+    """
+    Base.metadata.drop_all(bind=engine)
+    create_database_and_tables()
+
+@pytest.fixture
+def db():
+    """
+    A session on a freshly created database, dropped again after the test.
+    """
+    create_database_and_tables()
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
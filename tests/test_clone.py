@@ -0,0 +1,39 @@
+# tests/test_clone.py
+# A cloned subtree must hand every copied item the images of its own original, however the
+# ids of the originals and the copies are interleaved with other rows.
+
+from app import models, schemas
+from app.crud import folder as crud_folder
+from app.crud import image as crud_image
+from app.crud import item as crud_item
+from app.crud.clone import CLONE_SUFFIX, clone_subtree
+
+
+def _item_images(db, folder_ids):
+    rows = (
+        db.query(models.Item.name, models.Image.filename)
+        .join(models.Image, models.Image.item_id == models.Item.id)
+        .filter(models.Item.folder_id.in_(folder_ids))
+    )
+    return sorted(tuple(row) for row in rows)
+
+def test_cloned_items_keep_the_images_of_their_originals(db):
+    source = crud_folder.create_folder(db, schemas.FolderCreate(name="Shed"))
+    child = crud_folder.create_folder(db, schemas.FolderCreate(name="Shelf", parent_id=source.id))
+    other = crud_folder.create_folder(db, schemas.FolderCreate(name="Attic"))
+    # Items outside the subtree and deleted items leave gaps between the ids of the originals
+    for index in range(6):
+        folder_id = (source.id, other.id, child.id)[index % 3]
+        item = crud_item.create_item(db, schemas.ItemCreate(name=f"item {index}", folder_id=folder_id))
+        crud_image.create_image(db, schemas.ImageCreate(
+            filename=f"image {index}.png", filepath=f"/static_images/image{index}.png", item_id=item.id,
+        ))
+    crud_item.delete_item(db, crud_item.create_item(db, schemas.ItemCreate(name="gone", folder_id=child.id)).id)
+
+    new_root, copied = clone_subtree(db, source.id)
+
+    new_child = db.query(models.Folder).filter(models.Folder.parent_id == new_root.id).one()
+    expected = [(f"{name}{CLONE_SUFFIX}", filename) for name, filename in _item_images(db, [source.id, child.id])]
+    assert copied["items"] == 4
+    assert _item_images(db, [new_root.id, new_child.id]) == expected
+    assert db.query(models.Item).filter(models.Item.clone_source_id.isnot(None)).count() == 0
@@ -0,0 +1,43 @@
+# tests/test_export.py
+# The NDJSON export pages through each table without holding a read transaction open between pages.
+
+import json
+
+from sqlalchemy import text
+
+from app import schemas
+from app.crud import export
+from app.crud import folder as crud_folder
+from app.crud import item as crud_item
+from app.db.session import engine
+
+
+def _records(chunks) -> list:
+    return [json.loads(line) for chunk in chunks for line in chunk.splitlines()]
+
+
+def test_export_pages_through_every_row(db, monkeypatch):
+    monkeypatch.setattr(export, "EXPORT_BATCH_SIZE", 2)
+    folder = crud_folder.create_folder(db, schemas.FolderCreate(name="Box"))
+    for number in range(5):
+        crud_item.create_item(db, schemas.ItemCreate(name=f"Item {number}", quantity=number, folder_id=folder.id))
+
+    records = _records(export.export_ndjson(db, folder_paths=True))
+    assert [record["type"] for record in records] == ["folder"] + ["item"] * 5
+    assert [record["name"] for record in records[1:]] == [f"Item {number}" for number in range(5)]
+    assert {record["folder_path"] for record in records[1:]} == {"Box"}
+
+def test_writes_commit_while_an_export_is_being_read(db, monkeypatch):
+    monkeypatch.setattr(export, "EXPORT_BATCH_SIZE", 1)
+    for number in range(3):
+        crud_folder.create_folder(db, schemas.FolderCreate(name=f"Folder {number}"))
+
+    chunks = export.export_ndjson(db)
+    first = next(chunks) # The client has read one page and is slow to ask for the next
+    with engine.connect() as connection:
+        connection.execute(text("PRAGMA busy_timeout = 0")) # Fail at once instead of waiting for the lock
+        connection.execute(text("UPDATE folders SET notes = 'written' WHERE name = 'Folder 2'"))
+        connection.commit()
+    records = _records([first, *chunks])
+    assert [record["name"] for record in records] == ["Folder 0", "Folder 1", "Folder 2"]
+    assert records[-1]["notes"] == "written" # Not a snapshot: later pages see the write
@@ -0,0 +1,94 @@
+# tests/test_hierarchy.py
+# The materialized-path ancestry index must match the parent_id chain after any sequence of
+# folder writes. Each test runs a seeded random sequence of moves, bulk moves, clones and
+# deletes, and checks the paths and subtree reads after every step.
+
+import random
+
+import pytest
+from sqlalchemy import text
+
+from app import models, schemas
+from app.crud import folder as crud_folder
+from app.crud import hierarchy
+from app.crud.clone import clone_subtree
+
+STEPS = 150
+MAX_FOLDERS = 120 # Clones double subtrees; past this, deletes are preferred to keep the tree small
+
+
+def _folder_ids(db):
+    return [row[0] for row in db.query(models.Folder.id)]
+
+def _subtree_ids_by_path(db, folder_id):
+    path = hierarchy.get_folder_path(db, folder_id)
+    return {row[0] for row in db.query(models.Folder.id).filter(hierarchy.subtree_filter(models.Folder.path, path))}
+
+def _subtree_ids_by_parent(db, folder_id):
+    # Reference walk of the parent_id chain, independent of the path index
+    return {row[0] for row in db.execute(text(
+        "WITH RECURSIVE subtree(id) AS ("
+        " SELECT :id UNION ALL SELECT f.id FROM folders f JOIN subtree s ON f.parent_id = s.id"
+        ") SELECT id FROM subtree"
+    ), {"id": folder_id})}
+
+def _assert_consistent(db, rng, step):
+    assert hierarchy.check_paths(db) == [], f"paths out of date after step {step}"
+    ids = _folder_ids(db)
+    for folder_id in rng.sample(ids, min(len(ids), 10)):
+        assert _subtree_ids_by_path(db, folder_id) == _subtree_ids_by_parent(db, folder_id), \
+            f"subtree of folder {folder_id} differs after step {step}"
+
+def _target(rng, ids):
+    return rng.choice(ids + [None])
+
+def _random_step(db, rng):
+    ids = _folder_ids(db)
+    operation = rng.choice(["create", "move", "bulk_move", "clone", "delete"])
+    if len(ids) > MAX_FOLDERS:
+        operation = "delete"
+    if not ids:
+        operation = "create"
+
+    if operation == "create":
+        crud_folder.create_folder(db, schemas.FolderCreate(name=f"folder {rng.random():.6f}", parent_id=_target(rng, ids)))
+    elif operation == "move":
+        # Includes invalid moves (into itself or a descendant), which must leave everything unchanged
+        crud_folder.move_folder(db, rng.choice(ids), _target(rng, ids))
+    elif operation == "bulk_move":
+        crud_folder.bulk_move_folders(db, rng.sample(ids, rng.randint(1, min(len(ids), 5))), _target(rng, ids))
+    elif operation == "clone":
+        clone_subtree(db, rng.choice(ids), _target(rng, ids))
+    else:
+        crud_folder.delete_folder(db, rng.choice(ids))
+    return operation
+
+
+@pytest.mark.parametrize("seed", [1, 2, 3])
+def test_paths_stay_consistent_under_random_writes(db, seed):
+    rng = random.Random(seed)
+    for _ in range(20):
+        ids = _folder_ids(db)
+        crud_folder.create_folder(db, schemas.FolderCreate(name="seed", parent_id=_target(rng, ids)))
+    _assert_consistent(db, rng, "setup")
+
+    operations = set()
+    for step in range(STEPS):
+        operations.add(_random_step(db, rng))
+        db.expire_all() # The CRUD functions write with set-based statements
+        _assert_consistent(db, rng, step)
+    assert operations == {"create", "move", "bulk_move", "clone", "delete"}
+
+def test_invalid_moves_leave_paths_unchanged(db):
+    root = crud_folder.create_folder(db, schemas.FolderCreate(name="root"))
+    child = crud_folder.create_folder(db, schemas.FolderCreate(name="child", parent_id=root.id))
+    grandchild = crud_folder.create_folder(db, schemas.FolderCreate(name="grandchild", parent_id=child.id))
+
+    assert crud_folder.move_folder(db, root.id, root.id) is None
+    assert crud_folder.move_folder(db, root.id, grandchild.id) is None
+    result = crud_folder.bulk_move_folders(db, [root.id, child.id], grandchild.id)
+    assert [entry["status"] for entry in result["results"]] == ["cycle", "cycle"]
+
+    db.expire_all()
+    assert hierarchy.check_paths(db) == []
+    assert hierarchy.get_folder_path(db, grandchild.id) == f"/{root.id}/{child.id}/{grandchild.id}/"
@@ -0,0 +1,69 @@
+# tests/test_imports.py
+# An NDJSON export re-imports into an empty database with the same folders and items.
+
+import io
+
+from app import models, schemas
+from app.crud import folder as crud_folder
+from app.crud import hierarchy
+from app.crud import item as crud_item
+from app.crud.export import export_ndjson
+from app.crud.imports import import_items, read_records
+
+from tests.conftest import reset_database
+
+
+def _inventory(db):
+    """
+    Returns the folders as name paths and the items as (folder name path, name, quantity, tags),
+    which do not depend on the ids the database assigned.
+    """
+    names = {row.id: row.name for row in db.query(models.Folder.id, models.Folder.name)}
+    paths = {
+        row.id: "/".join(names[folder_id] for folder_id in hierarchy.ancestor_ids_from_path(row.path) + [row.id])
+        for row in db.query(models.Folder.id, models.Folder.path)
+    }
+    folders = sorted((paths[row.id], row.description or "", row.tags or "") for row in db.query(models.Folder))
+    items = sorted(
+        (paths.get(row.folder_id, ""), row.name, row.quantity, row.tags or "")
+        for row in db.query(models.Item.folder_id, models.Item.name, models.Item.quantity, models.Item.tags)
+    )
+    return folders, items
+
+def _import(db, data: bytes) -> dict:
+    return import_items(db, read_records(io.StringIO(data.decode()), "ndjson"))
+
+
+def test_export_reimports_into_an_empty_database(db):
+    garage = crud_folder.create_folder(db, schemas.FolderCreate(name="Garage", description="Tools", tags="tools"))
+    shelf = crud_folder.create_folder(db, schemas.FolderCreate(name="Shelf", parent_id=garage.id))
+    attic = crud_folder.create_folder(db, schemas.FolderCreate(name="Attic"))
+    # Moved under a newer folder, so the export lists it before its parent
+    crud_folder.move_folder(db, shelf.id, attic.id)
+    crud_item.create_item(db, schemas.ItemCreate(name="Hammer", quantity=2, tags="tools,steel", folder_id=shelf.id))
+    crud_item.create_item(db, schemas.ItemCreate(name="Drill", quantity=1, folder_id=garage.id))
+    crud_item.create_item(db, schemas.ItemCreate(name="Lamp", quantity=1))
+    db.expire_all()
+    expected = _inventory(db)
+    exported = b"".join(export_ndjson(db))
+    db.close()
+
+    reset_database()
+    report = _import(db, exported)
+    assert report["rejected"] == 0, report["rejections"]
+    assert (report["created"], report["folders_created"]) == (3, 3)
+    assert _inventory(db) == expected
+    assert hierarchy.check_paths(db) == []
+
+def test_items_of_an_export_only_use_its_own_folders(db):
+    crud_folder.create_folder(db, schemas.FolderCreate(name="Existing"))
+    data = (
+        b'{"type": "folder", "id": 40, "name": "Box", "parent_id": 41}\n'
+        b'{"type": "item", "id": 1, "name": "In box", "quantity": 1, "folder_id": 40}\n'
+        b'{"type": "item", "id": 2, "name": "Elsewhere", "quantity": 1, "folder_id": 1}\n'
+    )
+    report = _import(db, data)
+    # The folder's parent is not in the file, so neither it nor its item can be placed;
+    # folder_id 1 names a folder of the file, not the existing folder with that id
+    assert sorted(rejection["line"] for rejection in report["rejections"]) == [1, 2, 3]
+    assert report["created"] == 0